@@ -64,6 +64,25 @@ async def get_current_agent(
         raise credentials_exception
 
 
+async def get_agent_by_token(db: AsyncSession, token: str):
+    """
+    Агент по access-токену или None.
+    Для WebSocket / SSE: браузер не даёт передать туда заголовок Authorization,
+    токен приходит в query.
+    """
+    try:
+        payload = jwt_manager.decode_token(token)
+        if payload.get("type") != "access":
+            return None
+        agent = await agent_crud.get_by_id(db, agent_id=int(payload.get("sub")))
+    except Exception:
+        return None
+
+    if agent is None or not agent.is_active:
+        return None
+    return agent
+
+
 async def get_current_active_agent(current_agent=Depends(get_current_agent)):
     """
     Получение текущего активного агента
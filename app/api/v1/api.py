@@ -1,8 +1,14 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, tickets, messages
+from app.api.v1.endpoints import auth, tickets, messages, broadcasts, search, export, stats, events, assignment
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(tickets.router, prefix="/tickets", tags=["tickets"])
+api_router.include_router(broadcasts.router, prefix="/broadcasts", tags=["broadcasts"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(export.router, prefix="/export", tags=["export"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(assignment.router, prefix="/assignment", tags=["assignment"])
 # api_router.include_router(messages.router, prefix="/messages", tags=["messages"])
\ No newline at end of file
@@ -0,0 +1,21 @@
+# app/api/v1/endpoints/assignment.py
+from typing import List
+
+from fastapi import APIRouter
+
+from app.api.deps import require_role
+from app.core.assignment import assignment_engine
+from app.schemas.assignment import AgentLoadOut
+
+router = APIRouter()
+
+
+@router.get("/load", response_model=List[AgentLoadOut])
+async def agents_load(
+        current_agent=require_role("MODERATOR"),
+):
+    """
+    ⚖️ Текущая нагрузка агентов, по которой идёт автоназначение:
+    сначала онлайн, по возрастанию нагрузки.
+    """
+    return assignment_engine.snapshot()
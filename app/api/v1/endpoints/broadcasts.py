@@ -0,0 +1,115 @@
+# app/api/v1/endpoints/broadcasts.py
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import require_role
+from app.core.broadcast import broadcast_service
+from app.core.database import get_db
+from app.models.broadcast import Broadcast, BroadcastStatus
+from app.schemas.broadcast import BroadcastCreate, BroadcastProgress
+
+router = APIRouter()
+
+
+def _progress(obj: Broadcast) -> BroadcastProgress:
+    return BroadcastProgress.model_validate(obj).model_copy(
+        update=broadcast_service.progress(obj)
+    )
+
+
+async def _get_or_404(db: AsyncSession, broadcast_id: int) -> Broadcast:
+    obj = await db.get(Broadcast, broadcast_id)
+    if obj is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return obj
+
+
+@router.post("", response_model=BroadcastProgress)
+async def create_broadcast(
+        body: BroadcastCreate,
+        db: AsyncSession = Depends(get_db),
+        current_agent=require_role("ADMIN"),
+):
+    """
+    📣 Рассылка всем пользователям (или одной платформы).
+    Уходит в фоне с лимитами платформ, прогресс — GET /broadcasts/{id}.
+    """
+    obj = await broadcast_service.create(
+        db, text=body.text, platform=body.platform, created_by=current_agent.id
+    )
+    return _progress(obj)
+
+
+@router.get("", response_model=List[BroadcastProgress])
+async def list_broadcasts(
+        limit: int = 20,
+        db: AsyncSession = Depends(get_db),
+        current_agent=require_role("ADMIN"),
+):
+    res = await db.scalars(
+        select(Broadcast).order_by(Broadcast.id.desc()).limit(min(limit, 100))
+    )
+    return [_progress(obj) for obj in res]
+
+
+@router.get("/{broadcast_id}", response_model=BroadcastProgress)
+async def get_broadcast(
+        broadcast_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_agent=require_role("ADMIN"),
+):
+    """Прогресс: отправлено / ошибок / скорость / ETA."""
+    return _progress(await _get_or_404(db, broadcast_id))
+
+
+async def _transition(db: AsyncSession, broadcast_id: int, allowed, status: BroadcastStatus):
+    obj = await _get_or_404(db, broadcast_id)
+    if obj.status not in allowed:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Broadcast is {obj.status.value}",
+        )
+    obj = await broadcast_service.set_status(db, obj, status)
+    return _progress(obj)
+
+
+@router.post("/{broadcast_id}/pause", response_model=BroadcastProgress)
+async def pause_broadcast(
+        broadcast_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_agent=require_role("ADMIN"),
+):
+    return await _transition(
+        db, broadcast_id,
+        (BroadcastStatus.PENDING, BroadcastStatus.RUNNING),
+        BroadcastStatus.PAUSED,
+    )
+
+
+@router.post("/{broadcast_id}/resume", response_model=BroadcastProgress)
+async def resume_broadcast(
+        broadcast_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_agent=require_role("ADMIN"),
+):
+    return await _transition(
+        db, broadcast_id,
+        (BroadcastStatus.PAUSED, BroadcastStatus.RUNNING),
+        BroadcastStatus.RUNNING,
+    )
+
+
+@router.post("/{broadcast_id}/cancel", response_model=BroadcastProgress)
+async def cancel_broadcast(
+        broadcast_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_agent=require_role("ADMIN"),
+):
+    return await _transition(
+        db, broadcast_id,
+        (BroadcastStatus.PENDING, BroadcastStatus.RUNNING, BroadcastStatus.PAUSED),
+        BroadcastStatus.CANCELLED,
+    )
@@ -0,0 +1,143 @@
+# app/api/v1/endpoints/events.py
+import asyncio
+import json
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.websockets import WebSocketState
+
+from app.api.deps import get_agent_by_token
+from app.core.assignment import assignment_engine
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.events import Subscription, event_hub, valid_topic
+
+router = APIRouter()
+
+PING = json.dumps({"type": "ping"})
+
+
+async def _authenticate(token: str):
+    # сессия только на проверку токена: соединение живёт часами,
+    # держать под него подключение из пула нельзя
+    async with async_session_maker() as db:
+        return await get_agent_by_token(db, token)
+
+
+def _clean_topics(topics: List[str]) -> List[str]:
+    return [t for t in topics if isinstance(t, str) and valid_topic(t)]
+
+
+@router.websocket("/ws")
+async def events_ws(
+        websocket: WebSocket,
+        token: str = Query(...),
+        topic: List[str] = Query([]),
+):
+    """
+    🔔 Push-события по WebSocket.
+    topic — ticket:<id>, queue или queue:<platform>; можно несколько.
+    Подписку меняют сообщениями {"subscribe": [...], "unsubscribe": [...]}.
+    Закрытие с кодом 1013 — клиент не успевал читать: переподключиться
+    и перечитать состояние через REST.
+    """
+    agent = await _authenticate(token)
+    if agent is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    # открытый дашборд = агент онлайн для автоназначения
+    assignment_engine.agent_connected(agent)
+    sub = event_hub.subscribe(_clean_topics(topic))
+    receiver = asyncio.create_task(_receive(websocket, sub))
+    try:
+        while True:
+            payload = await sub.get(settings.push_heartbeat)
+            if payload is None:
+                break
+            try:
+                await asyncio.wait_for(
+                    websocket.send_text(payload or PING), settings.push_send_timeout
+                )
+            except asyncio.TimeoutError:
+                event_hub.drop_slow(sub)
+                break
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        # подписку закрыл не разрыв соединения — значит, отключили как медленного
+        slow = sub.closed and not receiver.done()
+        receiver.cancel()
+        event_hub.unsubscribe(sub)
+        assignment_engine.agent_disconnected(agent.id)
+        if slow and websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="slow consumer")
+            except Exception:
+                pass
+
+
+async def _receive(websocket: WebSocket, sub: Subscription) -> None:
+    """Команды клиента; разрыв соединения будит отправителя через закрытие подписки."""
+    try:
+        while True:
+            try:
+                command = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(command, dict):
+                continue
+            event_hub.update(
+                sub,
+                add=_clean_topics(command.get("subscribe") or []),
+                remove=_clean_topics(command.get("unsubscribe") or []),
+            )
+            sub.offer(json.dumps({"type": "subscribed", "topics": sorted(sub.topics)}))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        event_hub.unsubscribe(sub)
+
+
+@router.get("/stream")
+async def events_sse(
+        token: str = Query(...),
+        topic: List[str] = Query([]),
+):
+    """
+    🔔 Push-события через Server-Sent Events (EventSource).
+    Темы — как у /events/ws; токен в query, т.к. EventSource не шлёт заголовки.
+    Поток обрывается, если клиент не успевает читать, — EventSource
+    переподключится сам.
+    """
+    agent = await _authenticate(token)
+    if agent is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    topics = _clean_topics(topic)
+    if not topics:
+        raise HTTPException(status_code=422, detail="No valid topics")
+
+    async def stream():
+        # подписка — внутри генератора: если поток так и не начался,
+        # finally всё равно отпишет
+        sub = event_hub.subscribe(topics)
+        assignment_engine.agent_connected(agent)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                payload = await sub.get(settings.push_heartbeat)
+                if payload is None:
+                    break
+                # комментарий-пинг держит соединение через прокси
+                yield f"data: {payload}\n\n" if payload else ": ping\n\n"
+        finally:
+            event_hub.unsubscribe(sub)
+            assignment_engine.agent_disconnected(agent.id)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
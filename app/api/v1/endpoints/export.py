@@ -0,0 +1,45 @@
+# app/api/v1/endpoints/export.py
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import require_role
+from app.core.export import ExportFilters, FORMATS, export_stream
+from app.models.ticket import TicketCategory
+from app.models.user import PlatformType
+
+router = APIRouter()
+
+
+@router.get("/{kind}")
+async def export(
+        kind: Literal["tickets", "messages"],
+        format: Literal["csv", "ndjson"] = "csv",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        platform: Optional[PlatformType] = None,
+        category: Optional[TicketCategory] = None,
+        gzip: bool = False,
+        current_agent=require_role("MODERATOR"),
+):
+    """
+    📤 Выгрузка тикетов или сообщений за период (date_from включительно,
+    date_to — нет). Ответ идёт потоком, размер выгрузки не ограничен.
+    """
+    filters = ExportFilters(
+        date_from=date_from, date_to=date_to, platform=platform, category=category
+    )
+
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    media_type = FORMATS[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        export_stream(kind, format, filters, gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,37 @@
+# app/api/v1/endpoints/search.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_active_agent
+from app.core.database import get_read_db
+from app.core.search import message_search
+from app.crud.pagination import InvalidCursor
+from app.schemas.message import MessageSearchPage
+
+router = APIRouter()
+
+
+@router.get("/messages", response_model=MessageSearchPage)
+async def search_messages(
+        q: str = Query(..., min_length=2, max_length=200),
+        ticket_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
+        current_agent = Depends(get_current_active_agent),
+):
+    """
+    🔎 Поиск по переписке: ник, почта, дата платежа...
+    Все слова запроса обязательны, новые сообщения сверху,
+    следующая страница — тот же запрос с cursor=next_cursor.
+    """
+    try:
+        items, next_cursor = await message_search.search(
+            db, q, ticket_id=ticket_id, user_id=user_id, cursor=cursor, limit=limit
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,100 @@
+# app/api/v1/endpoints/stats.py
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_active_agent
+from app.core.database import get_read_db
+from app.models.stats import TicketRollup
+from app.models.ticket import TicketCategory
+from app.models.user import PlatformType
+from app.schemas.stats import StatsSummary
+
+router = APIRouter()
+
+SUMS = (
+    "tickets_created", "tickets_escalated", "tickets_closed",
+    "first_responses", "first_response_seconds", "messages_in", "messages_out",
+)
+DEFAULT_RANGE = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+
+def _values(row) -> dict:
+    values = {name: int(getattr(row, name) or 0) for name in SUMS}
+    created = values["tickets_created"]
+    responses = values["first_responses"]
+    values["escalations_per_created"] = values["tickets_escalated"] / created if created else None
+    seconds = values.pop("first_response_seconds")
+    values["avg_first_response_seconds"] = seconds / responses if responses else None
+    return values
+
+
+@router.get("/summary", response_model=StatsSummary)
+async def stats_summary(
+        period: Literal["hour", "day"] = "day",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        platform: Optional[PlatformType] = None,
+        category: Optional[TicketCategory] = None,
+        intent: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
+        current_agent = Depends(get_current_active_agent),
+):
+    """
+    📊 Статистика для дашборда: ряд по часам/дням, итоги и разрезы.
+    Читает только ticket_rollups (app.core.rollups) — цена запроса
+    зависит от длины периода, а не от числа тикетов.
+    """
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or date_to - DEFAULT_RANGE[period]
+    # бакет, в который попадает date_from, берём целиком
+    date_from = date_from.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        date_from = date_from.replace(hour=0)
+    if date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+
+    where = [
+        TicketRollup.period == period,
+        TicketRollup.bucket >= date_from,
+        TicketRollup.bucket < date_to,
+    ]
+    if platform is not None:
+        where.append(TicketRollup.platform == platform.value)
+    if category is not None:
+        where.append(TicketRollup.category == category.value)
+    if intent is not None:
+        where.append(TicketRollup.intent == intent)
+
+    sums = [func.sum(getattr(TicketRollup, name)).label(name) for name in SUMS]
+
+    totals = (await db.execute(select(*sums).where(*where))).one()
+    series = (await db.execute(
+        select(TicketRollup.bucket, *sums)
+        .where(*where)
+        .group_by(TicketRollup.bucket)
+        .order_by(TicketRollup.bucket)
+    )).all()
+
+    async def shares(column):
+        rows = (await db.execute(
+            select(column.label("key"), func.sum(TicketRollup.tickets_created).label("n"))
+            .where(*where)
+            .group_by(column)
+            .order_by(func.sum(TicketRollup.tickets_created).desc())
+        )).all()
+        return [{"key": r.key, "tickets_created": int(r.n or 0)} for r in rows]
+
+    return {
+        "period": period,
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": _values(totals),
+        "series": [{"bucket": r.bucket, **_values(r)} for r in series],
+        "intents": await shares(TicketRollup.intent),
+        "platforms": await shares(TicketRollup.platform),
+        "categories": await shares(TicketRollup.category),
+    }
@@ -1,49 +1,158 @@
-from fastapi import Depends, HTTPException
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_active_agent
-from app.api.v1.endpoints.auth import router
-from app.core.database import get_db
-from app.core.processor import processor
-from app.models.ticket import TicketStatus
+from app.core.assignment import assignment_engine
+from app.core.database import get_db, get_read_db
+from app.core.events import event_hub
+from app.core.outbox import outbox_worker
+from app.crud.message import message_crud
+from app.crud.pagination import InvalidCursor
+from app.crud.ticket import ticket_crud
+from app.models.ticket import Ticket, TicketStatus, TicketPriority
+from app.models.user import PlatformType
+from app.schemas.message import MessagePage
+from app.schemas.ticket import TicketListItem, TicketPage
+
+router = APIRouter()
+
+
+@router.get("", response_model=TicketPage)
+async def list_tickets(
+        status: Optional[TicketStatus] = None,
+        platform: Optional[PlatformType] = None,
+        priority: Optional[TicketPriority] = None,
+        assigned_to: Optional[int] = None,
+        limit: int = Query(50, ge=1, le=100),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
+        current_agent = Depends(get_current_active_agent),
+):
+    """
+    Список тикетов, новые сверху.
+    Следующая страница — тот же запрос с cursor=next_cursor.
+    """
+    try:
+        items, next_cursor = await ticket_crud.list_page(
+            db,
+            status=status,
+            platform=platform,
+            priority=priority,
+            assigned_to=assigned_to,
+            cursor=cursor,
+            limit=limit,
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/{ticket_id}", response_model=TicketListItem)
+async def get_ticket(
+        ticket_id: int,
+        db: AsyncSession = Depends(get_read_db),
+        current_agent = Depends(get_current_active_agent),
+):
+    ticket_obj = await ticket_crud.get_with_user(db, ticket_id)
+    if not ticket_obj:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket_obj
+
+
+@router.get("/{ticket_id}/messages", response_model=MessagePage)
+async def list_ticket_messages(
+        ticket_id: int,
+        limit: int = Query(50, ge=1, le=100),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
+        current_agent = Depends(get_current_active_agent),
+):
+    """Переписка тикета по порядку, постранично (cursor=next_cursor)."""
+    if not await ticket_crud.get(db, ticket_id):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    try:
+        items, next_cursor = await message_crud.list_page_by_ticket(
+            db, ticket_id, cursor=cursor, limit=limit
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
 
 
 class AgentReply(BaseModel):
-    text: str
+    text: str = Field(..., min_length=1, max_length=4096)
 
-@router.post("/{ticket_id}/reply")
+@router.post("/{ticket_id}/reply", status_code=202)
 async def agent_reply(
         ticket_id: int,
         body: AgentReply,
         db: AsyncSession = Depends(get_db),
-        current_agent = Depends(get_current_active_agent)
-, ticket_crud=None):
+        current_agent = Depends(get_current_active_agent),
+):
     # Получаем тикет
-    ticket_obj = await ticket_crud.get(db, id=ticket_id)
+    ticket_obj = await ticket_crud.get(db, ticket_id)
     if not ticket_obj:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    if ticket_obj.status == TicketStatus.CLOSED:
+        raise HTTPException(status_code=409, detail="Ticket is closed")
 
     # Назначаем на текущего агента, если ещё не назначен
+    # (автоназначенный тикет остаётся за своим агентом). Условным UPDATE:
+    # между чтением и записью движок назначения мог отдать тикет другому.
+    assigned = False
     if ticket_obj.assigned_to is None:
-        ticket_obj.assigned_to = current_agent.id
+        res = await db.execute(
+            update(Ticket)
+            .where(Ticket.id == ticket_obj.id, Ticket.assigned_to.is_(None))
+            .values(assigned_to=current_agent.id)
+            .execution_options(synchronize_session=False)
+        )
+        assigned = res.rowcount == 1
+        await db.refresh(ticket_obj, attribute_names=["assigned_to"])
+    status_changed = ticket_obj.status == TicketStatus.OPEN
+    if status_changed:
         ticket_obj.status = TicketStatus.IN_PROGRESS
-        db.add(ticket_obj)
-        await db.commit()
-        await db.refresh(ticket_obj)
-
-    # Отправляем сообщение пользователю через processor
-    # Определяем платформу и platform_id (юзер.platform, user.platform_id)
-    user_obj = ticket_obj.user
-    platform = user_obj.platform
-    platform_id = user_obj.platform_id
-
-    # Отправляем
-    result = await processor.send_message_as_agent(
-        platform=platform,
-        user_id=platform_id,
-        text=body.text,
-        ticket_id=ticket_obj.id
+    if ticket_obj.first_response_at is None:
+        ticket_obj.first_response_at = datetime.utcnow()
+
+    # Ответ пишем в outbox (OUTGOING + PENDING) в той же транзакции, что и тикет:
+    # либо сохранилось всё, либо ничего. Отправляет фоновый воркер.
+    msg = message_crud.add_outgoing(db, ticket=ticket_obj, text=body.text)
+    await db.commit()
+    outbox_worker.notify()
+    assignment_engine.note_reply(current_agent.id, claimed=assigned)
+
+    event_hub.publish(
+        "message.created",
+        ticket_id=ticket_obj.id,
+        platform=ticket_obj.platform,
+        data={
+            "id": msg.id,
+            "user_id": msg.user_id,
+            "direction": msg.direction,
+            "status": msg.status,
+            "content": msg.content,
+            "is_ai_response": False,
+            "agent_id": current_agent.id,
+        },
     )
+    if assigned or status_changed:
+        event_hub.publish(
+            "ticket.updated",
+            ticket_id=ticket_obj.id,
+            platform=ticket_obj.platform,
+            data={"status": ticket_obj.status, "assigned_to": ticket_obj.assigned_to},
+        )
 
-    return {"sent": result, "ticket": ticket_obj}
\ No newline at end of file
+    return {
+        "message_id": msg.id,
+        "status": msg.status.value,
+        "ticket_id": ticket_obj.id,
+        "ticket_status": ticket_obj.status.value,
+        "assigned_to": ticket_obj.assigned_to,
+    }
\ No newline at end of file
@@ -0,0 +1,240 @@
+# app/bot/bm25.py
+"""
+BM25 по инвертированному индексу — лексический поиск по FAQ и готовым ответам.
+
+Hash-эмбеддинг не знает, что «пароль» и «пароля» — одно слово, и одинаково
+весит «сервер» и «totp». Здесь:
+• лёгкий стемминг русских окончаний («пароль» / «пароля» / «паролем» → «парол»);
+• IDF — редкие слова весят больше частых;
+• постинги лежат в array('I') / array('f') и считаются numpy без копирования;
+• документы добавляются и удаляются по одному, без полной пересборки:
+  удалённые помечаются, а постинги терма поджимаются, когда мусора в них
+  становится больше половины.
+"""
+import math
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-zа-яё0-9]+")
+
+# окончания от длинных к коротким; снимаем одно, самое длинное подходящее
+_ENDINGS = tuple(sorted({
+    # прилагательные / причастия
+    "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя", "ое", "ее", "ой", "ый", "ий",
+    "ые", "ие", "ую", "юю", "ых", "их", "ым", "им",
+    # глаголы
+    "ить", "ать", "ять", "еть", "уть", "ешь", "ишь", "ете", "ите", "ет", "ит", "ют", "ут",
+    "ла", "ло", "ли", "ть", "ся", "сь",
+    # существительные
+    "ами", "ями", "ов", "ев", "ей", "ам", "ям", "ах", "ях", "ом", "ем", "ию", "ью", "ия",
+    "ья", "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+}, key=len, reverse=True))
+
+MIN_STEM = 3
+
+STOPWORDS = frozenset({
+    "и", "в", "во", "на", "не", "что", "как", "а", "с", "со", "по", "я", "ты", "мне",
+    "меня", "у", "к", "за", "из", "о", "об", "же", "то", "это", "бы", "ли", "но", "да",
+    "мой", "моя", "мое", "мои", "ну", "вот", "там", "тут", "до", "от", "для",
+})
+
+
+@lru_cache(maxsize=50_000)
+def light_stem(word: str) -> str:
+    """Снимаем одно окончание, не оставляя основу короче MIN_STEM."""
+    word = word.replace("ё", "е")
+    if len(word) <= MIN_STEM or not ("а" <= word[0] <= "я"):
+        return word
+    # возвратные глаголы: «сменится» → «смени» → «смен»
+    if word.endswith(("ся", "сь")) and len(word) - 2 >= MIN_STEM:
+        word = word[:-2]
+    for end in _ENDINGS:
+        if word.endswith(end) and len(word) - len(end) >= MIN_STEM:
+            return word[:-len(end)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        light_stem(tok)
+        for tok in _TOKEN_RE.findall((text or "").lower())
+        if tok not in STOPWORDS
+    ]
+
+
+class _Postings:
+    __slots__ = ("ids", "tfs", "dead")
+
+    def __init__(self):
+        self.ids = array("I")
+        self.tfs = array("f")
+        self.dead = 0
+
+
+class BM25Index:
+    """
+    Инвертированный индекс с BM25 (Okapi).
+
+    Документ адресуется внешним ключом (любой hashable), внутри получает
+    возрастающий doc_id — поэтому постинги всегда отсортированы и add()
+    просто дописывает в конец массивов.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, _Postings] = {}
+        self._df: Counter = Counter()              # только живые документы
+
+        self._doc_len = array("f")                 # doc_id → длина (0 у удалённых)
+        self._alive = bytearray()                  # doc_id → 1/0
+        self._doc_terms: List[Optional[Tuple[str, ...]]] = []
+        self._keys: List[Optional[Hashable]] = []
+        self._ids: Dict[Hashable, int] = {}
+
+        self._total_len = 0
+        self._n_docs = 0
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], **kwargs) -> "BM25Index":
+        """Ключи — позиции текстов (0, 1, 2, ...)."""
+        index = cls(**kwargs)
+        for i, text in enumerate(texts):
+            index.add(i, text)
+        return index
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ids
+
+    # ------------------------------------
+    # ИЗМЕНЕНИЕ
+    # ------------------------------------
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Добавляет документ; существующий ключ перезаписывается."""
+        if key in self._ids:
+            self.remove(key)
+
+        doc_id = len(self._keys)
+        tf = Counter(tokenize(text))
+
+        for term, count in tf.items():
+            post = self._postings.get(term)
+            if post is None:
+                post = self._postings[term] = _Postings()
+            post.ids.append(doc_id)
+            post.tfs.append(count)
+            self._df[term] += 1
+
+        length = sum(tf.values())
+        self._doc_len.append(length)
+        self._alive.append(1)
+        self._doc_terms.append(tuple(tf))
+        self._keys.append(key)
+        self._ids[key] = doc_id
+
+        self._total_len += length
+        self._n_docs += 1
+
+    def remove(self, key: Hashable) -> bool:
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return False
+
+        for term in self._doc_terms[doc_id]:
+            self._df[term] -= 1
+            if self._df[term] <= 0:
+                del self._df[term]
+                del self._postings[term]
+                continue
+            post = self._postings[term]
+            post.dead += 1
+            if post.dead * 2 > len(post.ids):
+                self._compact(post)
+
+        self._total_len -= int(self._doc_len[doc_id])
+        self._n_docs -= 1
+        self._doc_len[doc_id] = 0
+        self._alive[doc_id] = 0
+        self._doc_terms[doc_id] = None
+        self._keys[doc_id] = None
+        return True
+
+    def _compact(self, post: _Postings) -> None:
+        alive = self._alive
+        keep = [i for i, doc_id in enumerate(post.ids) if alive[doc_id]]
+        post.ids = array("I", (post.ids[i] for i in keep))
+        post.tfs = array("f", (post.tfs[i] for i in keep))
+        post.dead = 0
+
+    # ------------------------------------
+    # ПОИСК
+    # ------------------------------------
+
+    def idf(self, term: str) -> float:
+        df = self._df.get(term, 0)
+        return math.log(1.0 + (self._n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, text: str, top_k: int = 5, normalize: bool = False) -> List[Tuple[Hashable, float]]:
+        """
+        Топ-k (ключ, score) по убыванию.
+
+        normalize=True делит score на сумму IDF всех слов запроса — это примерно
+        score документа средней длины, в котором есть каждое слово запроса ровно
+        один раз. Шкала 0..1 (с обрезкой сверху), сопоставимая с косинусом эмбеддингов;
+        незнакомые индексу слова запроса тянут оценку вниз.
+        """
+        terms = set(tokenize(text))
+        if not terms or not self._n_docs:
+            return []
+
+        avgdl = self._total_len / self._n_docs or 1.0
+        doc_len = np.frombuffer(self._doc_len, dtype=np.float32)
+
+        # считаем только документы из постингов запроса, а не весь корпус
+        id_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        idf_sum = 0.0
+        for term in terms:
+            idf = self.idf(term)
+            idf_sum += idf
+            post = self._postings.get(term)
+            if post is None:
+                continue
+            ids = np.frombuffer(post.ids, dtype=np.uint32)
+            tfs = np.frombuffer(post.tfs, dtype=np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len[ids] / avgdl)
+            id_parts.append(ids)
+            score_parts.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+
+        if not id_parts:
+            return []
+
+        if len(id_parts) == 1:
+            cand, scores = id_parts[0], score_parts[0]
+        else:
+            cand, inverse = np.unique(np.concatenate(id_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        # удалённые, но ещё не выметенные из постингов
+        alive = np.frombuffer(self._alive, dtype=np.uint8)[cand].astype(bool)
+        cand, scores = cand[alive], scores[alive]
+
+        k = min(top_k, len(cand))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(cand) else np.arange(len(cand))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        if normalize and idf_sum > 0:
+            return [(self._keys[cand[i]], min(1.0, float(scores[i]) / idf_sum)) for i in top]
+        return [(self._keys[cand[i]], float(scores[i])) for i in top]
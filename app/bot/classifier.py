@@ -0,0 +1,326 @@
+# app/bot/classifier.py
+"""
+Многоступенчатый классификатор интентов с ранним выходом.
+
+Ступени идут от дешёвой к дорогой и останавливаются на первой уверенной:
+    exact      — словарь точных фраз (одна хэш-таблица)
+    automaton  — Ахо–Корасик по всем триггерам и мат-корням за один проход
+    fuzzy      — прежний полный fuzzy-перебор (intents.detect_intent)
+    embedding  — ближайший триггер по hash-эмбеддингу (по умолчанию выключен)
+
+Каждая ступень считает вызовы, попадания и суммарное время, так что видно,
+куда уходит CPU. Порядок и набор ступеней задаётся строкой в конфиге
+(settings.intent_stages), например "exact,automaton,fuzzy".
+"""
+import abc
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.bot.embeddings import embed, embed_batch, normalize_text, tokenize
+from app.bot.intents import (
+    TRIGGERS,
+    TOXIC_WORDS,
+    INTENT_IDIOTIC,
+    INTENT_UNKNOWN,
+    INTENT_THRESHOLD,
+    fuzzy_intent,
+    has_toxic_word,
+)
+
+# embedding по умолчанию выключен: на бенчмарке (benchmarks.nlp_bench) он не
+# добавляет попаданий, а на каждое нераспознанное сообщение тратит ~60 мкс
+DEFAULT_STAGES = ("exact", "automaton", "fuzzy")
+
+# порог косинуса для embedding-ступени
+EMBEDDING_THRESHOLD = 0.8
+# и сколько настоящих (не совпавших по хэшу) слов должно быть общих с триггером:
+# в 256 корзинах однословные сообщения часто коллидируют с однословными
+# триггерами и дают косинус 1.0 («здравствуйте» → MEDIA)
+EMBEDDING_MIN_SHARED = 2
+
+# порядок интентов в TRIGGERS — он же приоритет при равных совпадениях
+_INTENT_ORDER = {intent: i for i, intent in enumerate(TRIGGERS)}
+
+
+@dataclass(frozen=True)
+class StageResult:
+    intent: str
+    confidence: float   # 0..1
+    confident: bool     # можно ли остановиться на этой ступени
+
+
+@dataclass
+class PipelineResult:
+    intent: str
+    stage: Optional[str]                    # какая ступень дала ответ (None → никто)
+    confidence: float
+    timings: Dict[str, float] = field(default_factory=dict)   # stage → сек
+
+
+class StageStats:
+    __slots__ = ("calls", "hits", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+
+# ======================================================
+#  АХО–КОРАСИК
+# ======================================================
+
+class PhraseAutomaton:
+    """
+    Автомат Ахо–Корасик: находит все вхождения всех фраз за один проход
+    по тексту, независимо от количества фраз.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+
+        for phrase, payload in phrases:
+            self._insert(phrase, payload)
+        self._build()
+
+    def _insert(self, phrase: str, payload: str) -> None:
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((phrase, payload))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fallback = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fallback if fallback != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[str, str]]:
+        """Все (фраза, payload), встретившиеся в тексте."""
+        found: List[Tuple[str, str]] = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+# ======================================================
+#  СТУПЕНИ
+# ======================================================
+
+class Stage(abc.ABC):
+    name = "stage"
+
+    @abc.abstractmethod
+    def run(self, text: str) -> Optional[StageResult]:
+        """Интент с уверенностью или None — решение за следующей ступенью."""
+
+
+class ExactPhraseStage(Stage):
+    """Сообщение целиком совпало с триггером — самый частый и дешёвый случай."""
+
+    name = "exact"
+
+    def __init__(self):
+        self._phrases: Dict[str, str] = {}
+        for intent, words in TRIGGERS.items():
+            for w in words:
+                self._phrases.setdefault(normalize_text(w), intent)
+
+    def run(self, text: str) -> Optional[StageResult]:
+        intent = self._phrases.get(text)
+        if intent is None:
+            return None
+        return StageResult(intent, 1.0, True)
+
+
+class AutomatonStage(Stage):
+    """
+    Триггер или мат-корень встретился в тексте дословно.
+    Короткий триггер внутри длинного текста (та же эвристика, что в fuzzy)
+    уверенным не считается — решение отдаём следующей ступени.
+    """
+
+    name = "automaton"
+
+    def __init__(self):
+        phrases = [(w, INTENT_IDIOTIC) for w in TOXIC_WORDS]
+        for intent, words in TRIGGERS.items():
+            phrases.extend((normalize_text(w), intent) for w in words)
+        self._automaton = PhraseAutomaton(phrases)
+        self._toxic = set(TOXIC_WORDS)
+
+    def run(self, text: str) -> Optional[StageResult]:
+        matches = self._automaton.find(text)
+        if not matches:
+            return None
+
+        best: Optional[Tuple[int, int, str]] = None
+        for phrase, intent in matches:
+            if phrase in self._toxic:
+                return StageResult(INTENT_IDIOTIC, 1.0, True)
+            weak = len(phrase) <= 4 and len(text) > 10
+            rank = (int(weak), _INTENT_ORDER.get(intent, len(_INTENT_ORDER)))
+            if best is None or rank < best[:2]:
+                best = (rank[0], rank[1], intent)
+
+        weak, _, intent = best
+        return StageResult(intent, 0.8 if weak else 1.0, not weak)
+
+
+class FuzzyStage(Stage):
+    """Прежний классификатор: мат-корни + fuzzy partial_ratio по всем триггерам."""
+
+    name = "fuzzy"
+
+    def run(self, text: str) -> Optional[StageResult]:
+        if has_toxic_word(text):
+            return StageResult(INTENT_IDIOTIC, 1.0, True)
+
+        intent, score = fuzzy_intent(text)
+        if intent is None:
+            return None
+        return StageResult(intent, score / 100.0, score >= INTENT_THRESHOLD)
+
+
+class EmbeddingStage(Stage):
+    """Ближайший триггер по косинусу hash-эмбеддингов."""
+
+    name = "embedding"
+
+    def __init__(self, threshold: float = EMBEDDING_THRESHOLD, min_shared: int = EMBEDDING_MIN_SHARED):
+        self.threshold = threshold
+        self.min_shared = min_shared
+        self._intents: List[str] = []
+        self._tokens: List[frozenset] = []
+        phrases: List[str] = []
+        for intent, words in TRIGGERS.items():
+            for w in words:
+                self._intents.append(intent)
+                self._tokens.append(frozenset(tokenize(w)))
+                phrases.append(w)
+        self._matrix = embed_batch(phrases)
+
+    def run(self, text: str) -> Optional[StageResult]:
+        q = embed(text)
+        if not q.any():
+            return None
+        sims = self._matrix @ q
+        best = int(np.argmax(sims))
+        score = float(sims[best])
+        shared = len(self._tokens[best].intersection(tokenize(text)))
+        confident = score >= self.threshold and shared >= self.min_shared
+        return StageResult(self._intents[best], score, confident)
+
+
+STAGES = {
+    ExactPhraseStage.name: ExactPhraseStage,
+    AutomatonStage.name: AutomatonStage,
+    FuzzyStage.name: FuzzyStage,
+    EmbeddingStage.name: EmbeddingStage,
+}
+
+
+# ======================================================
+#  ПАЙПЛАЙН
+# ======================================================
+
+class IntentPipeline:
+    def __init__(self, stages: Sequence[Stage]):
+        self.stages = list(stages)
+        self.total_calls = 0
+        self.stats: Dict[str, StageStats] = {s.name: StageStats() for s in self.stages}
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [s.name for s in self.stages]
+
+    def classify(self, text: str) -> PipelineResult:
+        text = normalize_text(text)
+        if not text:
+            return PipelineResult(INTENT_UNKNOWN, None, 0.0)
+
+        self.total_calls += 1
+        timings: Dict[str, float] = {}
+
+        for stage in self.stages:
+            t0 = time.perf_counter()
+            res = stage.run(text)
+            elapsed = time.perf_counter() - t0
+
+            st = self.stats[stage.name]
+            st.calls += 1
+            st.seconds += elapsed
+            timings[stage.name] = elapsed
+
+            if res is not None and res.confident:
+                st.hits += 1
+                return PipelineResult(res.intent, stage.name, res.confidence, timings)
+
+        return PipelineResult(INTENT_UNKNOWN, None, 0.0, timings)
+
+    def detect_intent(self, text: str) -> str:
+        return self.classify(text).intent
+
+    def report(self) -> List[dict]:
+        """Доля попаданий и время по ступеням (для логов / бенчмарков)."""
+        rows = []
+        for name, st in self.stats.items():
+            rows.append({
+                "stage": name,
+                "calls": st.calls,
+                "hits": st.hits,
+                "hit_share": st.hits / self.total_calls if self.total_calls else 0.0,
+                "avg_us": st.seconds / st.calls * 1e6 if st.calls else 0.0,
+                "total_ms": st.seconds * 1000,
+            })
+        return rows
+
+
+def parse_stages(spec) -> List[str]:
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    names = [n.strip().lower() for n in spec if n and n.strip()]
+    unknown = [n for n in names if n not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown intent stages: {unknown}. Available: {list(STAGES)}")
+    return names
+
+
+def build_pipeline(spec=DEFAULT_STAGES) -> IntentPipeline:
+    return IntentPipeline([STAGES[name]() for name in parse_stages(spec)])
+
+
+# Глобальный пайплайн процесса (в воркерах пересобирается по конфигу)
+pipeline = build_pipeline()
+
+
+def configure(spec) -> IntentPipeline:
+    global pipeline
+    pipeline = build_pipeline(spec)
+    return pipeline
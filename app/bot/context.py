@@ -1,9 +1,39 @@
-from typing import Optional, List
-from dataclasses import dataclass, field
+import json
+import logging
+import sys
 import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from app.bot.context_backend import ContextBackend
+from app.core.batching import MicroBatcher
+from app.core.metrics import metrics
+from app.core.timer_wheel import TimerWheel
+
+logger = logging.getLogger("bot.context")
+
+HISTORY_LIMIT = 20
+
+# версия компактного формата UserContext.dump()
+_DUMP_VERSION = 2
 
+CONTEXTS_RESIDENT = metrics.gauge(
+    "user_contexts_resident", "UserContext objects currently kept in memory"
+)
+CONTEXTS_BYTES = metrics.gauge(
+    "user_contexts_bytes", "Approximate memory held by resident UserContext objects"
+)
+CONTEXTS_EVICTED = metrics.counter(
+    "user_contexts_evicted_total", "UserContext objects dropped from memory"
+)
+CONTEXTS_LOADS = metrics.counter(
+    "user_contexts_loads_total", "UserContext lookups by near-cache outcome"
+)
 
-@dataclass
+
+@dataclass(slots=True)
 class UserContext:
     """
     Глобальный контекст пользователя:
@@ -13,6 +43,9 @@ class UserContext:
     • флаг необходимости вызвать специалиста
     • история сообщений
     • буфер данных для многошаговых сценариев
+
+    __slots__ + deque фиксированной длины: контекстов в памяти десятки тысяч,
+    а у большинства из них буфер так и остаётся пустым.
     """
 
     # FSM состояние
@@ -28,23 +61,27 @@ class UserContext:
     need_specialist: bool = False
 
     # история сообщений (mini-LLM память)
-    history: List[str] = field(default_factory=list)
-
-    # временный буфер для многошаговых процессов
-    data_buffer: dict = field(default_factory=dict)
+    history: Deque[str] = field(default_factory=lambda: deque(maxlen=HISTORY_LIMIT))
 
     # время последней активности пользователя
     last_interaction: float = field(default_factory=time.time)
 
+    # временный буфер для многошаговых процессов (создаётся по требованию)
+    _buffer: Optional[dict] = None
+
     # ============================================================
     #                   Х Е Л П Е Р Ы
     # ============================================================
 
+    @property
+    def data_buffer(self) -> dict:
+        if self._buffer is None:
+            self._buffer = {}
+        return self._buffer
+
     def push_history(self, text: str):
-        """Добавляет текст в историю сообщений (до 20 элементов)."""
+        """Добавляет текст в историю сообщений (до HISTORY_LIMIT элементов)."""
         self.history.append(text)
-        if len(self.history) > 20:
-            self.history.pop(0)
 
     def reset(self):
         """Полный сброс состояния в начальное (idle)."""
@@ -53,5 +90,228 @@ class UserContext:
         self.operator_mode = False
         self.need_specialist = False
         self.history.clear()
-        self.data_buffer.clear()
+        self._buffer = None
         self.last_interaction = time.time()
+
+    def dump(self) -> bytes:
+        """
+        Компактная сериализация для общего хранилища: позиционный JSON без
+        имён полей, пустой буфер не пишется.
+        """
+        return json.dumps(
+            [
+                _DUMP_VERSION,
+                self.state,
+                self.last_intent,
+                int(self.operator_mode),
+                int(self.need_specialist),
+                list(self.history),
+                round(self.last_interaction, 3),
+                self._buffer or None,
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    @classmethod
+    def load(cls, blob: bytes) -> "UserContext":
+        fields = json.loads(blob)
+        if fields[0] == 1:
+            # v1 ещё хранил состояние антифлуда — теперь оно в app.bot.flood
+            fields = [_DUMP_VERSION] + fields[1:7] + fields[9:]
+        (
+            version, state, last_intent, operator_mode, need_specialist,
+            history, last_interaction, buffer,
+        ) = fields
+        if version != _DUMP_VERSION:
+            raise ValueError(f"Unsupported UserContext format: {version}")
+        return cls(
+            state=state,
+            last_intent=last_intent,
+            operator_mode=bool(operator_mode),
+            need_specialist=bool(need_specialist),
+            history=deque(history, maxlen=HISTORY_LIMIT),
+            last_interaction=last_interaction,
+            _buffer=buffer,
+        )
+
+    def approx_size(self) -> int:
+        """Грубая оценка занимаемой памяти в байтах (для метрик)."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.history)
+        size += sum(sys.getsizeof(s) for s in self.history)
+        if self._buffer is not None:
+            size += sys.getsizeof(self._buffer)
+        return size
+
+
+# ======================================================
+#  ХРАНИЛИЩЕ КОНТЕКСТОВ
+# ======================================================
+
+class ContextStore:
+    """
+    Контексты пользователей в памяти процесса (или near-cache общего хранилища).
+
+    • idle-TTL: контекст, к которому не обращались ttl секунд, выгружается;
+      дедлайны живут в колесе таймеров, продление — O(1);
+    • пользователи в режиме оператора живут дольше (operator_ttl), чтобы
+      бот не начал отвечать посреди долгого разговора с оператором;
+    • max_resident: при превышении выгружается самый давно неактивный.
+
+    С бэкендом (attach) контексты общие для всех процессов бота:
+    load() читает из бэкенда то, чего нет в near-cache, save() пишет обратно
+    и рассылает инвалидацию. Конкурентные чтения и записи собираются
+    микро-батчером в один MGET / один pipeline.
+    """
+
+    def __init__(
+            self,
+            ttl: float = 1800.0,
+            operator_ttl: float = 86400.0,
+            max_resident: int = 100_000,
+            tick: float = 1.0,
+    ):
+        self.ttl = ttl
+        self.operator_ttl = operator_ttl
+        self.max_resident = max_resident
+        self._contexts: "OrderedDict[int, UserContext]" = OrderedDict()
+        self._wheel = TimerWheel(tick=tick, slots=max(64, int(ttl / tick) + 1))
+
+        self.backend: Optional[ContextBackend] = None
+        self.origin = uuid.uuid4().hex[:12]
+        self._reader: Optional[MicroBatcher] = None
+        self._writer: Optional[MicroBatcher] = None
+
+        CONTEXTS_RESIDENT.set_function(lambda: len(self._contexts))
+        CONTEXTS_BYTES.set_function(self.resident_bytes)
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._contexts
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._contexts)
+
+    def peek(self, user_id: int) -> Optional[UserContext]:
+        """Контекст без создания и без продления TTL."""
+        return self._contexts.get(user_id)
+
+    def get(self, user_id: int) -> UserContext:
+        """Достаём (или создаём) контекст и продлеваем ему жизнь."""
+        self.expire()
+
+        ctx = self._contexts.get(user_id)
+        if ctx is None:
+            ctx = UserContext()
+            self._contexts[user_id] = ctx
+            self._enforce_cap()
+        else:
+            self._contexts.move_to_end(user_id)
+
+        ctx.last_interaction = time.time()
+        self._wheel.schedule(user_id, time.monotonic() + self.ttl)
+        return ctx
+
+    # ------------------------------------
+    # ОБЩЕЕ ХРАНИЛИЩЕ
+    # ------------------------------------
+
+    async def attach(self, backend: ContextBackend, max_batch: int = 64, max_wait: float = 0.002) -> None:
+        self.backend = backend
+        self._reader = MicroBatcher(self._load_batch, max_batch=max_batch, max_wait=max_wait, name="ctx-load")
+        self._writer = MicroBatcher(self._save_batch, max_batch=max_batch, max_wait=max_wait, name="ctx-save")
+        self._contexts.clear()
+        await backend.subscribe(self.origin, self.invalidate)
+        logger.info("Context store attached to %s (origin=%s)", type(backend).__name__, self.origin)
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+        self.backend = None
+        self._reader = self._writer = None
+
+    def invalidate(self, user_id: Optional[int]) -> None:
+        """Контекст поменял другой процесс → при следующем load() перечитаем."""
+        if user_id is None:
+            for uid in list(self._contexts):
+                self.drop(uid)
+            return
+        self.drop(user_id)
+
+    async def _load_batch(self, user_ids: List[int]) -> List[Optional[bytes]]:
+        unique = list(dict.fromkeys(user_ids))
+        blobs = dict(zip(unique, await self.backend.load_many(unique)))
+        return [blobs[uid] for uid in user_ids]
+
+    async def _save_batch(self, items: List[Tuple[int, bytes]]) -> List[None]:
+        # несколько сохранений одного пользователя в пачке → пишем последнее
+        await self.backend.save_many(dict(items), self.origin)
+        return [None] * len(items)
+
+    async def load(self, user_id: int) -> UserContext:
+        """get() с подгрузкой из общего хранилища, если в near-cache контекста нет."""
+        if self._reader is None or user_id in self._contexts:
+            CONTEXTS_LOADS.inc(result="hit")
+            return self.get(user_id)
+
+        CONTEXTS_LOADS.inc(result="miss")
+        try:
+            blob = await self._reader.submit(user_id)
+        except Exception as e:
+            # хранилище недоступно — работаем на локальном контексте
+            logger.warning(f"[CTX] load failed for {user_id}: {e!r}")
+            blob = None
+
+        # пока ждали, контекст мог появиться (соседняя корутина того же юзера)
+        if blob is not None and user_id not in self._contexts:
+            try:
+                self._contexts[user_id] = UserContext.load(blob)
+                self._enforce_cap()
+            except (ValueError, TypeError) as e:
+                logger.warning(f"[CTX] broken context for {user_id}: {e!r}")
+
+        return self.get(user_id)
+
+    async def save(self, user_id: int, ctx: UserContext) -> None:
+        """Публикует контекст пользователя для остальных процессов."""
+        if self._writer is None:
+            return
+        try:
+            await self._writer.submit((user_id, ctx.dump()))
+        except Exception as e:
+            logger.warning(f"[CTX] save failed for {user_id}: {e!r}")
+
+    def drop(self, user_id: int) -> bool:
+        self._wheel.cancel(user_id)
+        return self._contexts.pop(user_id, None) is not None
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Выгружает контексты с истёкшим TTL. Дёшево, можно звать на каждом сообщении."""
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        for user_id in self._wheel.advance(now):
+            ctx = self._contexts.get(user_id)
+            if ctx is None:
+                continue
+            if ctx.operator_mode:
+                idle = time.time() - ctx.last_interaction
+                if idle < self.operator_ttl:
+                    self._wheel.schedule(user_id, now + self.operator_ttl - idle)
+                    continue
+            del self._contexts[user_id]
+            evicted += 1
+
+        if evicted:
+            CONTEXTS_EVICTED.inc(evicted, reason="ttl")
+        return evicted
+
+    def _enforce_cap(self) -> None:
+        while len(self._contexts) > self.max_resident:
+            user_id, _ = self._contexts.popitem(last=False)
+            self._wheel.cancel(user_id)
+            CONTEXTS_EVICTED.inc(reason="cap")
+
+    def resident_bytes(self) -> int:
+        return sum(ctx.approx_size() for ctx in self._contexts.values())
@@ -0,0 +1,174 @@
+# app/bot/context_backend.py
+"""
+Общее хранилище контекстов пользователей для нескольких процессов бота.
+
+ContextStore (app.bot.context) остаётся локальным near-cache, а бэкенд — это
+то место, где контекст живёт между процессами:
+
+    LocalContextBackend  — словарь + шина в памяти; несколько ContextStore
+                           в одном процессе ведут себя как разные воркеры
+                           (локальная отладка и проверки без Redis)
+    RedisContextBackend  — SET/MGET в Redis одним pipeline на пачку,
+                           инвалидация near-cache через pub/sub
+
+Контекст хранится в компактном виде (UserContext.dump → bytes).
+После записи бэкенд публикует «origin:user_id», остальные процессы
+выбрасывают этот контекст из своего near-cache.
+"""
+import abc
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("bot.context")
+
+# вызывается с user_id, когда контекст поменял другой процесс;
+# None — «могли что-то пропустить, сбросьте near-cache целиком»
+InvalidateCallback = Callable[[Optional[int]], None]
+
+
+class ContextBackend(abc.ABC):
+    @abc.abstractmethod
+    async def load_many(self, user_ids: Sequence[int]) -> List[Optional[bytes]]:
+        """Сжатые контексты в порядке user_ids; None — контекста нет."""
+
+    @abc.abstractmethod
+    async def save_many(self, items: Dict[int, bytes], origin: str) -> None:
+        """Сохраняет контексты и оповещает остальные процессы."""
+
+    @abc.abstractmethod
+    async def delete(self, user_id: int, origin: str) -> None:
+        """Удаляет контекст и оповещает остальные процессы."""
+
+    @abc.abstractmethod
+    async def subscribe(self, origin: str, callback: InvalidateCallback) -> None:
+        """Начинает доставлять инвалидации от других origin."""
+
+    async def close(self) -> None:
+        pass
+
+
+# ======================================================
+#  LOCAL (в памяти процесса)
+# ======================================================
+
+class LocalContextBackend(ContextBackend):
+    def __init__(self):
+        self.data: Dict[int, bytes] = {}
+        self._subscribers: Dict[str, InvalidateCallback] = {}
+
+    async def load_many(self, user_ids: Sequence[int]) -> List[Optional[bytes]]:
+        return [self.data.get(uid) for uid in user_ids]
+
+    def _publish(self, user_ids, origin: str) -> None:
+        for sub_origin, callback in list(self._subscribers.items()):
+            if sub_origin == origin:
+                continue
+            for uid in user_ids:
+                callback(uid)
+
+    async def save_many(self, items: Dict[int, bytes], origin: str) -> None:
+        self.data.update(items)
+        self._publish(items, origin)
+
+    async def delete(self, user_id: int, origin: str) -> None:
+        self.data.pop(user_id, None)
+        self._publish([user_id], origin)
+
+    async def subscribe(self, origin: str, callback: InvalidateCallback) -> None:
+        self._subscribers[origin] = callback
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+
+
+# ======================================================
+#  REDIS
+# ======================================================
+
+class RedisContextBackend(ContextBackend):
+    """
+    redis — клиент redis.asyncio (или совместимый, например fakeredis.aioredis).
+    ttl — сколько Redis держит контекст без обращений.
+    """
+
+    def __init__(
+            self,
+            redis,
+            prefix: str = "ctx:",
+            ttl: int = 86400,
+            channel: str = "ctx:invalidate",
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def load_many(self, user_ids: Sequence[int]) -> List[Optional[bytes]]:
+        if not user_ids:
+            return []
+        return list(await self.redis.mget([self._key(uid) for uid in user_ids]))
+
+    async def save_many(self, items: Dict[int, bytes], origin: str) -> None:
+        if not items:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for uid, blob in items.items():
+            pipe.set(self._key(uid), blob, ex=self.ttl)
+        for uid in items:
+            pipe.publish(self.channel, f"{origin}:{uid}")
+        await pipe.execute()
+
+    async def delete(self, user_id: int, origin: str) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self._key(user_id))
+        pipe.publish(self.channel, f"{origin}:{user_id}")
+        await pipe.execute()
+
+    async def subscribe(self, origin: str, callback: InvalidateCallback) -> None:
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(
+            self._listen(origin, callback), name="ctx-invalidate"
+        )
+
+    async def _listen(self, origin: str, callback: InvalidateCallback) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    data = message.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    if not isinstance(data, str):
+                        continue
+                    sender, _, uid = data.rpartition(":")
+                    if sender != origin and uid.lstrip("-").isdigit():
+                        callback(int(uid))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # соединение порвалось — near-cache мог пропустить инвалидации,
+                # callback(None) просит сбросить его целиком
+                logger.warning(f"[CTX] invalidation listener failed: {e!r}")
+                callback(None)
+                await asyncio.sleep(1.0)
+
+    async def close(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+        try:
+            await self.redis.aclose()
+        except Exception:
+            pass
@@ -0,0 +1,63 @@
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+# ======================================================
+#  НАСТРОЙКИ ЭМБЕДДИНГОВ
+# ======================================================
+
+EMB_DIM = 256  # оптимальное значение для hash-embedding
+
+_TOKEN_RE = re.compile(r"[a-zа-яё0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    text = (text or "").lower().strip()
+    text = re.sub(r"\s+", " ", text)
+    return text
+
+
+def _bucket(token: str) -> int:
+    """
+    Стабильный хэш токена.
+    Встроенный hash() солится на каждый процесс (PYTHONHASHSEED),
+    поэтому индекс, сохранённый на диск, в другом процессе был бы мусором.
+    """
+    return zlib.crc32(token.encode("utf-8")) % EMB_DIM
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def embed(text: str) -> np.ndarray:
+    """
+    Простой, но быстрый hash-bag-of-words embedding.
+    """
+    vec = np.zeros(EMB_DIM, dtype="float32")
+
+    for tok in tokenize(text):
+        vec[_bucket(tok)] += 1.0
+
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+
+    return vec
+
+
+def embed_batch(texts: Iterable[str], batch_size: int = 256) -> np.ndarray:
+    """
+    Эмбеддинги пачками → матрица (n, EMB_DIM), готовая для index.add().
+    """
+    texts = list(texts)
+    out = np.zeros((len(texts), EMB_DIM), dtype="float32")
+
+    for start in range(0, len(texts), batch_size):
+        chunk: List[str] = texts[start:start + batch_size]
+        for offset, text in enumerate(chunk):
+            out[start + offset] = embed(text)
+
+    return out
@@ -0,0 +1,168 @@
+# app/bot/flood.py
+"""
+Единый анти-флуд и мут для всех платформ.
+
+• на пользователя — token bucket фиксированного размера (__slots__: токены,
+  время, счётчик «страйков»), без списков таймстемпов;
+• каждое сообщение списывает токен, ведро может уйти «в долг» (не глубже
+  burst); сообщение, после которого ведро в минусе, — «страйк». Долг гасится
+  только паузой, поэтому ровный поток чуть быстрее rate копит страйки,
+  а не проскакивает через раз;
+• на заданных страйках — предупреждение, после mute_after страйков подряд —
+  мут на mute_seconds;
+• муты снимаются колесом таймеров, там же выметаются ведра, которые
+  успели наполниться доверху (их состояние ничем не отличается от нового);
+• пороги задаются для каждой платформы отдельно (FloodPolicy).
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import metrics
+from app.core.timer_wheel import TimerWheel
+
+FLOOD_ACTIONS = metrics.counter(
+    "flood_actions_total", "Flood engine verdicts other than ok"
+)
+FLOOD_TRACKED = metrics.gauge(
+    "flood_tracked_users", "Users with live flood state in memory"
+)
+FLOOD_MUTED = metrics.gauge(
+    "flood_muted_users", "Users currently muted by the flood engine"
+)
+
+# вердикты
+FLOOD_OK = "ok"
+FLOOD_WARN = "warn"
+FLOOD_MUTED_NOW = "muted_now"
+FLOOD_MUTE = "mute"
+
+
+@dataclass(frozen=True)
+class FloodPolicy:
+    rate: float = 1.25                 # токенов в секунду (1 / минимальный интервал)
+    burst: float = 1.0                 # ёмкость ведра
+    warn_at: Tuple[int, ...] = (2, 4, 6)   # страйки, на которых предупреждаем (с последнего — всегда)
+    mute_after: int = 0                # страйков до мута, 0 — не мутить
+    mute_seconds: float = 20.0
+
+
+@dataclass(frozen=True)
+class FloodVerdict:
+    action: str                        # ok / warn / muted_now / mute
+    level: int = 0                     # номер предупреждения (индекс в warn_at)
+    retry_after: float = 0.0           # сколько осталось мута, сек
+
+
+class _Bucket:
+    __slots__ = ("tokens", "stamp", "strikes")
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+        self.strikes = 0
+
+
+class FloodEngine:
+    def __init__(self, tick: float = 1.0):
+        self._policies: Dict[str, FloodPolicy] = {}
+        self._buckets: Dict[Tuple[str, Hashable], _Bucket] = {}
+        self._mutes: Dict[Tuple[str, Hashable], float] = {}
+        # ключи колеса: ("b", key) — ведро, ("m", key) — мут
+        self._wheel = TimerWheel(tick=tick, slots=256, now=time.monotonic())
+
+        FLOOD_TRACKED.set_function(lambda: len(self._buckets))
+        FLOOD_MUTED.set_function(lambda: len(self._mutes))
+
+    def set_policy(self, platform: str, policy: FloodPolicy) -> None:
+        self._policies[platform] = policy
+
+    def policy(self, platform: str) -> FloodPolicy:
+        return self._policies.get(platform) or FloodPolicy()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    # ------------------------------------
+    # ОЧИСТКА
+    # ------------------------------------
+
+    def expire(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        for kind, key in self._wheel.advance(now):
+            if kind == "m":
+                self._mutes.pop(key, None)
+            else:
+                self._buckets.pop(key, None)
+
+    # ------------------------------------
+    # ПРОВЕРКИ
+    # ------------------------------------
+
+    def muted_for(self, platform: str, user_id: Hashable, now: Optional[float] = None) -> float:
+        """Сколько секунд осталось мута (0 — не в муте)."""
+        now = time.monotonic() if now is None else now
+        until = self._mutes.get((platform, user_id))
+        return max(0.0, until - now) if until else 0.0
+
+    def is_muted(self, platform: str, user_id: Hashable) -> bool:
+        return self.muted_for(platform, user_id) > 0
+
+    def unmute(self, platform: str, user_id: Hashable) -> bool:
+        key = (platform, user_id)
+        self._wheel.cancel(("m", key))
+        return self._mutes.pop(key, None) is not None
+
+    def hit(self, platform: str, user_id: Hashable, now: Optional[float] = None) -> FloodVerdict:
+        """Учитывает одно входящее сообщение и возвращает вердикт."""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+
+        key = (platform, user_id)
+        policy = self.policy(platform)
+
+        left = self.muted_for(platform, user_id, now)
+        if left > 0:
+            FLOOD_ACTIONS.inc(platform=platform, action=FLOOD_MUTE)
+            return FloodVerdict(FLOOD_MUTE, retry_after=left)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(policy.burst, now)
+        else:
+            bucket.tokens = min(policy.burst, bucket.tokens + (now - bucket.stamp) * policy.rate)
+            bucket.stamp = now
+
+        bucket.tokens = max(-policy.burst, bucket.tokens - 1.0)
+
+        # к этому моменту ведро наполнится целиком — дальше хранить его незачем
+        self._wheel.schedule(("b", key), now + (policy.burst - bucket.tokens) / policy.rate)
+
+        if bucket.tokens >= 0.0:
+            bucket.strikes = 0
+            return FloodVerdict(FLOOD_OK)
+
+        bucket.strikes += 1
+        strikes = bucket.strikes
+
+        if policy.mute_after and strikes >= policy.mute_after:
+            bucket.strikes = 0
+            self._mutes[key] = now + policy.mute_seconds
+            self._wheel.schedule(("m", key), now + policy.mute_seconds)
+            FLOOD_ACTIONS.inc(platform=platform, action=FLOOD_MUTED_NOW)
+            return FloodVerdict(FLOOD_MUTED_NOW, retry_after=policy.mute_seconds)
+
+        warn_at = policy.warn_at
+        if warn_at and strikes >= warn_at[-1]:
+            level = len(warn_at) - 1
+        elif strikes in warn_at:
+            level = warn_at.index(strikes)
+        else:
+            return FloodVerdict(FLOOD_OK)
+
+        FLOOD_ACTIONS.inc(platform=platform, action=FLOOD_WARN)
+        return FloodVerdict(FLOOD_WARN, level=level)
+
+
+# Один движок на процесс; политики платформ регистрируют сами боты
+flood_engine = FloodEngine()
@@ -1,3 +1,5 @@
+from typing import Optional, Tuple
+
 from rapidfuzz import fuzz
 
 # ================================
@@ -148,17 +150,19 @@ TRIGGERS = {
 # ================================
 #  КЛАССИФИКАТОР
 # ================================
-def detect_intent(text: str) -> str:
-    text = (text or "").lower().strip()
-    if not text:
-        return INTENT_UNKNOWN
+INTENT_THRESHOLD = 72
 
-    # ===== сначала проверяем жёсткую токсичность =====
-    for bad in TOXIC_WORDS:
-        if bad in text:
-            return INTENT_IDIOTIC
 
-    # ===== fuzzy-классификация =====
+def has_toxic_word(text: str) -> bool:
+    return any(bad in text for bad in TOXIC_WORDS)
+
+
+def fuzzy_intent(text: str) -> Tuple[Optional[str], int]:
+    """
+    Полный fuzzy-перебор всех триггеров.
+    Возвращает (лучший интент, его score) без применения порога.
+    text должен быть уже в нижнем регистре.
+    """
     best_intent = None
     best_score = 0
 
@@ -174,8 +178,23 @@ def detect_intent(text: str) -> str:
                 best_score = score
                 best_intent = intent
 
+    return best_intent, best_score
+
+
+def detect_intent(text: str) -> str:
+    text = (text or "").lower().strip()
+    if not text:
+        return INTENT_UNKNOWN
+
+    # ===== сначала проверяем жёсткую токсичность =====
+    if has_toxic_word(text):
+        return INTENT_IDIOTIC
+
+    # ===== fuzzy-классификация =====
+    best_intent, best_score = fuzzy_intent(text)
+
     # ===== порог =====
-    if best_score < 72:
+    if best_score < INTENT_THRESHOLD:
         return INTENT_UNKNOWN
 
     return best_intent
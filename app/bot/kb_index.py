@@ -0,0 +1,412 @@
+# app/bot/kb_index.py
+"""
+База знаний mini-LLM:
+• ингест FAQ + документов с правилами (чанкинг)
+• батчевые эмбеддинги
+• версионированный FAISS-индекс + метаданные на диске
+• атомарная горячая подмена индекса без рестарта бота
+• рядом с FAISS — BM25 по тем же документам (лексический сигнал)
+
+Сборка вручную:
+    python -m app.bot.kb_index --docs data/kb_docs --out data/kb_index
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from app.bot.bm25 import BM25Index
+from app.bot.embeddings import EMB_DIM, embed_batch
+from app.bot.knowledge import FAQ_DATA, SMALLTALK_ITEMS
+
+logger = logging.getLogger("bot.kb")
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+META_FILE = "meta.json"
+
+DOC_EXTENSIONS = (".txt", ".md")
+
+# до скольких документов держим точный перебор, с какого — HNSW
+FLAT_MAX_DOCS = 5_000
+HNSW_MIN_DOCS = 100_000
+
+# сколько старых версий индекса оставлять на диске (для отката)
+KEEP_VERSIONS = 3
+
+# сборок в одну секунду (--force поверх watch-цикла) — суффикс 00..99
+MAX_BUILDS_PER_SECOND = 100
+
+
+# ======================================================
+#  ДОКУМЕНТЫ
+# ======================================================
+
+@dataclass(frozen=True)
+class KBDocument:
+    text: str     # что эмбеддим
+    answer: str   # что отдаём пользователю
+    source: str   # smalltalk / faq / имя файла
+
+
+def chunk_text(text: str, max_chars: int = 500) -> List[str]:
+    """
+    Режем документ на куски ~max_chars: сначала по абзацам,
+    слишком длинные абзацы — по предложениям.
+    """
+    pieces: List[str] = []
+    for para in re.split(r"\n\s*\n", text or ""):
+        para = " ".join(para.split())
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            pieces.append(para)
+        else:
+            pieces.extend(s for s in re.split(r"(?<=[.!?…])\s+", para) if s)
+
+    chunks: List[str] = []
+    buf = ""
+    for piece in pieces:
+        if buf and len(buf) + 1 + len(piece) > max_chars:
+            chunks.append(buf)
+            buf = piece
+        else:
+            buf = f"{buf} {piece}" if buf else piece
+    if buf:
+        chunks.append(buf)
+
+    return chunks
+
+
+def collect_documents(docs_dir: Optional[str] = None, max_chars: int = 500) -> List[KBDocument]:
+    """
+    Собирает все источники знаний в один список:
+    small-talk, FAQ_DATA и (опционально) *.txt / *.md из docs_dir.
+    """
+    docs = [KBDocument(q, a, "smalltalk") for q, a in SMALLTALK_ITEMS]
+
+    for item in FAQ_DATA:
+        docs.extend(KBDocument(c, c, "faq") for c in chunk_text(item, max_chars))
+
+    if docs_dir and os.path.isdir(docs_dir):
+        for path in sorted(Path(docs_dir).rglob("*")):
+            if path.suffix.lower() not in DOC_EXTENSIONS:
+                continue
+            text = path.read_text(encoding="utf-8")
+            docs.extend(
+                KBDocument(c, c, path.name) for c in chunk_text(text, max_chars)
+            )
+
+    return docs
+
+
+def fingerprint(docs: Sequence[KBDocument]) -> str:
+    h = hashlib.sha256()
+    for d in docs:
+        h.update(json.dumps(asdict(d), ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+# ======================================================
+#  СБОРКА ИНДЕКСА
+# ======================================================
+
+def make_index(
+        vecs: np.ndarray,
+        flat_max: int = FLAT_MAX_DOCS,
+        hnsw_min: int = HNSW_MIN_DOCS,
+) -> Tuple[faiss.Index, str]:
+    """
+    Тип индекса выбирается по размеру базы:
+      < flat_max  → Flat (точный перебор, быстрее всего на малых объёмах)
+      < hnsw_min  → IVF (кластеризация, nprobe ~ 10% списков)
+      иначе       → HNSW (граф, не требует обучения)
+    """
+    n = len(vecs)
+
+    if n < flat_max:
+        index = faiss.IndexFlatIP(EMB_DIM)
+        kind = "flat"
+
+    elif n < hnsw_min:
+        nlist = max(1, int(math.sqrt(n)))
+        quantizer = faiss.IndexFlatIP(EMB_DIM)
+        index = faiss.IndexIVFFlat(quantizer, EMB_DIM, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vecs)
+        index.nprobe = max(8, nlist // 10)
+        kind = "ivf"
+
+    else:
+        index = faiss.IndexHNSWFlat(EMB_DIM, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 80
+        index.hnsw.efSearch = 64
+        kind = "hnsw"
+
+    if n:
+        index.add(vecs)
+    return index, kind
+
+
+def read_current_version(index_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _read_meta(version_dir: str) -> dict:
+    with open(os.path.join(version_dir, META_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_current(index_dir: str, version: str) -> None:
+    """CURRENT переписывается через rename → читатели видят старую или новую версию, не кашу."""
+    fd, tmp = tempfile.mkstemp(dir=index_dir, prefix=".current-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(index_dir, CURRENT_FILE))
+
+
+def _prune_versions(index_dir: str, keep: int) -> None:
+    current = read_current_version(index_dir)
+    versions = sorted(
+        p for p in os.listdir(index_dir)
+        if p.startswith("v") and os.path.isdir(os.path.join(index_dir, p))
+    )
+    for old in versions[:-keep]:
+        if old != current:
+            shutil.rmtree(os.path.join(index_dir, old), ignore_errors=True)
+
+
+def _claim_version_dir(index_dir: str, fp: str) -> str:
+    """
+    Занимает каталог новой версии: v<timestamp><seq>-<hash>.
+    mkdir без exist_ok атомарен, поэтому две сборки в одну секунду
+    получают разные seq, а не пишут в один каталог. Имена сортируются
+    в порядке сборки — на это опирается _prune_versions.
+    """
+    stamp = time.strftime('%Y%m%d%H%M%S')
+    prefix = f"v{stamp}"
+    # seq не переиспользуем даже после _prune_versions — иначе новая версия
+    # отсортировалась бы раньше старых
+    taken = re.compile(re.escape(prefix) + r"(\d{2})-")
+    start = max(
+        (int(m.group(1)) + 1 for m in map(taken.match, os.listdir(index_dir)) if m),
+        default=0,
+    )
+    for seq in range(start, MAX_BUILDS_PER_SECOND):
+        version = f"{prefix}{seq:02d}-{fp[:8]}"
+        try:
+            os.mkdir(os.path.join(index_dir, version))
+            return version
+        except FileExistsError:
+            continue
+    raise RuntimeError(f"too many KB index builds in {stamp}")
+
+
+def build_index(
+        docs: Sequence[KBDocument],
+        index_dir: str,
+        *,
+        batch_size: int = 256,
+        flat_max: int = FLAT_MAX_DOCS,
+        hnsw_min: int = HNSW_MIN_DOCS,
+        force: bool = False,
+) -> str:
+    """
+    Эмбеддит документы пачками и пишет новую версию индекса:
+        index_dir/v<timestamp><seq>-<hash>/index.faiss + meta.json
+    после чего переключает CURRENT. Если набор документов не изменился —
+    ничего не пересобирает и возвращает текущую версию.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    fp = fingerprint(docs)
+
+    current = read_current_version(index_dir)
+    if current and not force:
+        try:
+            if _read_meta(os.path.join(index_dir, current)).get("fingerprint") == fp:
+                logger.info("KB index %s is up to date (%d docs)", current, len(docs))
+                return current
+        except (OSError, ValueError):
+            pass
+
+    started = time.perf_counter()
+    vecs = embed_batch([d.text for d in docs], batch_size=batch_size)
+    index, kind = make_index(vecs, flat_max=flat_max, hnsw_min=hnsw_min)
+
+    version = _claim_version_dir(index_dir, fp)
+    version_dir = os.path.join(index_dir, version)
+    try:
+        # каталог ещё не в CURRENT — читатели его не видят, пока пишем
+        faiss.write_index(index, os.path.join(version_dir, INDEX_FILE))
+        meta = {
+            "version": version,
+            "kind": kind,
+            "dim": EMB_DIM,
+            "count": len(docs),
+            "fingerprint": fp,
+            "created_at": time.time(),
+            "docs": [asdict(d) for d in docs],
+        }
+        with open(os.path.join(version_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+    except Exception:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+    _write_current(index_dir, version)
+    _prune_versions(index_dir, KEEP_VERSIONS)
+
+    logger.info(
+        "KB index %s built: %d docs, kind=%s, %.1f ms",
+        version, len(docs), kind, (time.perf_counter() - started) * 1000,
+    )
+    return version
+
+
+# ======================================================
+#  СЕРВИНГ
+# ======================================================
+
+@dataclass(frozen=True)
+class KBSnapshot:
+    """Индексы и документы одной версии — всегда меняются вместе."""
+    version: str
+    kind: str
+    index: faiss.Index
+    docs: Tuple[KBDocument, ...]
+    lexical: BM25Index   # ключи — позиции в docs
+
+    @classmethod
+    def create(cls, version: str, kind: str, index: faiss.Index, docs: Sequence[KBDocument]) -> "KBSnapshot":
+        docs = tuple(docs)
+        return cls(version, kind, index, docs, BM25Index.from_texts(d.text for d in docs))
+
+
+class KnowledgeBase:
+    """
+    Обёртка над текущим снимком индекса.
+    Подмена — одно присваивание ссылки, поэтому поиск, начавшийся
+    на старой версии, спокойно доживает на ней.
+    """
+
+    def __init__(self, snapshot: KBSnapshot):
+        self._snapshot = snapshot
+        self._current_mtime: Optional[float] = None
+
+    @classmethod
+    def from_documents(cls, docs: Sequence[KBDocument], version: str = "builtin") -> "KnowledgeBase":
+        vecs = embed_batch([d.text for d in docs])
+        index, kind = make_index(vecs)
+        return cls(KBSnapshot.create(version, kind, index, docs))
+
+    @property
+    def snapshot(self) -> KBSnapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    def __len__(self) -> int:
+        return len(self._snapshot.docs)
+
+    def search(self, queries: np.ndarray, top_k: int = 1) -> Tuple[np.ndarray, np.ndarray, KBSnapshot]:
+        """
+        queries: матрица (n, EMB_DIM). Возвращает (scores, idxs, snapshot),
+        где idxs ссылаются на snapshot.docs.
+        """
+        snap = self._snapshot
+        if snap.index.ntotal == 0:
+            shape = (len(queries), top_k)
+            return np.zeros(shape, dtype="float32"), np.full(shape, -1, dtype="int64"), snap
+
+        scores, idxs = snap.index.search(queries, min(top_k, snap.index.ntotal))
+        return scores, idxs, snap
+
+    # ------------------------------------
+    # HOT SWAP
+    # ------------------------------------
+
+    def load_latest(self, index_dir: str) -> bool:
+        """Подгружает версию из CURRENT, если она отличается от текущей."""
+        version = read_current_version(index_dir)
+        if not version or version == self._snapshot.version:
+            return False
+
+        version_dir = os.path.join(index_dir, version)
+        meta = _read_meta(version_dir)
+        index = faiss.read_index(os.path.join(version_dir, INDEX_FILE))
+        docs = tuple(KBDocument(**d) for d in meta["docs"])
+
+        if index.ntotal != len(docs):
+            logger.error("KB index %s is corrupted: %d vectors vs %d docs", version, index.ntotal, len(docs))
+            return False
+
+        self._snapshot = KBSnapshot.create(version, meta.get("kind", "flat"), index, docs)
+        logger.info("KB index swapped to %s (%d docs, %s)", version, len(docs), self._snapshot.kind)
+        return True
+
+    def maybe_reload(self, index_dir: str) -> bool:
+        """Дешёвая проверка по mtime файла CURRENT — можно дёргать часто."""
+        try:
+            mtime = os.stat(os.path.join(index_dir, CURRENT_FILE)).st_mtime
+        except FileNotFoundError:
+            return False
+
+        if mtime == self._current_mtime:
+            return False
+
+        try:
+            swapped = self.load_latest(index_dir)
+        except Exception:
+            # битая версия — попробуем ещё раз на следующей проверке
+            self._current_mtime = None
+            raise
+        self._current_mtime = mtime
+        return swapped
+
+    async def watch(self, index_dir: str, interval: float = 30.0) -> None:
+        """Фоновая задача: следит за CURRENT и подменяет индекс на лету."""
+        while True:
+            try:
+                await asyncio.to_thread(self.maybe_reload, index_dir)
+            except Exception as e:
+                logger.exception(f"KB reload failed: {e}")
+            await asyncio.sleep(interval)
+
+
+# Глобальный экземпляр: до загрузки с диска работает на встроенных данных
+knowledge_base = KnowledgeBase.from_documents(collect_documents())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build versioned KB FAISS index")
+    parser.add_argument("--docs", default=None, help="каталог с *.txt / *.md")
+    parser.add_argument("--out", default="data/kb_index")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(build_index(
+        collect_documents(args.docs),
+        args.out,
+        batch_size=args.batch_size,
+        force=args.force,
+    ))
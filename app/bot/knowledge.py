@@ -13,3 +13,14 @@ FAQ_DATA = [
     "Обжалования блокировок — vk.com/cubeworldj",
     "Новости проекта — @cubeworld_pro",
 ]
+
+# короткие реплики «вопрос → готовый ответ» (small-talk для mini-LLM)
+SMALLTALK_ITEMS = [
+    ("как дела", "Работаю как всегда 🤖💪"),
+    ("ты кто", "Я бот поддержки CubeWorld, всегда на связи 😊"),
+    ("что можешь", "Помогаю с поддержкой, платежами и отвечаю на вопросы 😎"),
+    ("помоги", "Конечно, бро! Рассказывай, что случилось?"),
+    ("привет", "Привет-привет! 👋 Чем помочь?"),
+    ("здрасте", "Приветствую 👋 Что случилось?"),
+    ("здравствуйте", "Здравствуйте! 👋 Как я могу помочь?"),
+]
@@ -1,59 +1,19 @@
-import re
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence
 
 import numpy as np
-import faiss
 from rapidfuzz import fuzz
 
-# ======================================================
-#  НАСТРОЙКИ ЭМБЕДДИНГОВ
-# ======================================================
-
-EMB_DIM = 256  # оптимальное значение для hash-embedding
-
-
-def _normalize(text: str) -> str:
-    text = (text or "").lower().strip()
-    text = re.sub(r"\s+", " ", text)
-    return text
-
-
-def _embed(text: str) -> np.ndarray:
-    """
-    Простой, но быстрый hash-bag-of-words embedding.
-    """
-    text = _normalize(text)
-    tokens = re.findall(r"[a-zа-я0-9]+", text)
-    vec = np.zeros(EMB_DIM, dtype="float32")
-
-    for tok in tokens:
-        h = hash(tok) % EMB_DIM
-        vec[h] += 1.0
-
-    norm = np.linalg.norm(vec)
-    if norm > 0:
-        vec /= norm
-
-    return vec
-
+from app.bot.embeddings import EMB_DIM, embed as _embed, normalize_text as _normalize
+from app.bot.kb_index import knowledge_base
+from app.bot.knowledge import SMALLTALK_ITEMS
 
 # ======================================================
 #  ГЛОБАЛЬНОЕ ЗНАНИЕ (FAQ → mini-LLM)
 # ======================================================
 
-_KNOWLEDGE_ITEMS: List[Tuple[str, str]] = [
-    ("как дела", "Работаю как всегда 🤖💪"),
-    ("ты кто", "Я бот поддержки CubeWorld, всегда на связи 😊"),
-    ("что можешь", "Помогаю с поддержкой, платежами и отвечаю на вопросы 😎"),
-    ("помоги", "Конечно, бро! Рассказывай, что случилось?"),
-    ("привет", "Привет-привет! 👋 Чем помочь?"),
-    ("здрасте", "Приветствую 👋 Что случилось?"),
-    ("здравствуйте", "Здравствуйте! 👋 Как я могу помочь?"),
-]
-
-_KB_VECS = np.stack([_embed(q) for q, _ in _KNOWLEDGE_ITEMS])
-_KB_INDEX = faiss.IndexFlatIP(EMB_DIM)
-_KB_INDEX.add(_KB_VECS)
+# small-talk + FAQ_DATA + документы с правилами живут в версионированном
+# индексе app.bot.kb_index, он же подменяется на лету при пересборке
+_KNOWLEDGE_ITEMS: List[Tuple[str, str]] = SMALLTALK_ITEMS
 
 
 # ======================================================
@@ -62,30 +22,38 @@ _KB_INDEX.add(_KB_VECS)
 
 class UserMemory:
     """
-    Личная FAISS-память пользователя.
+    Личная память пользователя.
+    Векторы хранятся один раз — в матрице с запасом по строкам (ёмкость
+    удваивается). По ней идёт и поиск (точное скалярное произведение, как
+    у IndexFlatIP), и пакетный _memory_top1: matrix() отдаёт view, память
+    пользователя не копируется.
     """
 
     def __init__(self):
-        self.index = faiss.IndexFlatIP(EMB_DIM)
         self.texts: List[str] = []
-        self.vectors: List[np.ndarray] = []
-
-    def add(self, text: str):
-        vec = _embed(text)
+        self._vectors = np.empty((0, EMB_DIM), dtype=np.float32)
+
+    def add(self, text: str, vec: Optional[np.ndarray] = None):
+        if vec is None:
+            vec = _embed(text)
+        n = len(self.texts)
+        if n == len(self._vectors):
+            grown = np.empty((max(4, n * 2), EMB_DIM), dtype=np.float32)
+            grown[:n] = self._vectors[:n]
+            self._vectors = grown
+        self._vectors[n] = vec
         self.texts.append(text)
-        self.vectors.append(vec)
-        self.index.add(vec.reshape(1, -1))
+
+    def matrix(self) -> np.ndarray:
+        """Все векторы памяти одной матрицей (view, без копирования)."""
+        return self._vectors[:len(self.texts)]
 
     def search(self, text: str, top_k=3) -> List[Tuple[str, float]]:
         if not self.texts:
             return []
-        q = _embed(text).reshape(1, -1)
-        scores, idxs = self.index.search(q, min(top_k, len(self.texts)))
-        out = []
-        for score, idx in zip(scores[0], idxs[0]):
-            if idx >= 0:
-                out.append((self.texts[idx], float(score)))
-        return out
+        scores = self.matrix() @ _embed(text)
+        idxs = np.argsort(-scores)[:top_k]
+        return [(self.texts[i], float(scores[i])) for i in idxs]
 
 
 _USER_MEMORIES: Dict[int, UserMemory] = {}
@@ -114,15 +82,40 @@ def _router_score(mem: float, kb: float, hist: float) -> float:
 
 
 # ======================================================
-#  ОСНОВНОЙ mini-LLM
+#  ПАКЕТНЫЙ ПОИСК
 # ======================================================
 
-def mini_llm_answer(
-        user_id: int,
-        history: List[str],
-        text: str,
-) -> Optional[str]:
+def _memory_top1(mems: Sequence[UserMemory], queries: np.ndarray) -> List[Tuple[Optional[str], float]]:
+    """
+    Лучшее совпадение в личной памяти для каждого запроса пачки.
+    Запросы группируются по памяти: на каждого пользователя одно
+    умножение его запросов на его матрицу (Q_u @ M_u.T), т.е. та же
+    работа, что у поиска по одному, но без FAISS и копий памяти.
+    """
+    out: List[Tuple[Optional[str], float]] = [(None, 0.0)] * len(mems)
+
+    rows_of: Dict[int, List[int]] = {}
+    by_id: Dict[int, UserMemory] = {}
+    for row, mem in enumerate(mems):
+        if mem.texts:
+            rows_of.setdefault(id(mem), []).append(row)
+            by_id[id(mem)] = mem
+
+    for key, rows in rows_of.items():
+        mem = by_id[key]
+        sims = queries[rows] @ mem.matrix().T
+        best = sims.argmax(axis=1)
+        for row, col, seg in zip(rows, best, sims):
+            out[row] = (mem.texts[col], float(seg[col]))
 
+    return out
+
+
+# ======================================================
+#  ОСНОВНОЙ mini-LLM
+# ======================================================
+
+def _prepare(text: str) -> Optional[str]:
     text_norm = _normalize(text)
     if not text_norm:
         return None
@@ -135,20 +128,19 @@ def mini_llm_answer(
     if len(text_norm.split()) > 20:  # слишком длинная простыня = оператор
         return None
 
-    mem = _get_user_memory(user_id)
+    return text_norm
 
-    # ----------------------------- 1) ЛИЧНАЯ ПАМЯТЬ -----------------------------
-    mem_score = 0.0
-    mem_text = None
-    similar = mem.search(text_norm, top_k=1)
-    if similar:
-        mem_text, mem_score = similar[0]
 
-    # ----------------------------- 2) ГЛОБАЛЬНОЕ Q/A -----------------------------
-    q_vec = _embed(text_norm).reshape(1, -1)
-    kb_scores, kb_idxs = _KB_INDEX.search(q_vec, 1)
-    kb_score = float(kb_scores[0][0])
-    kb_idx = int(kb_idxs[0][0]) if kb_idxs[0][0] >= 0 else -1
+def _route(
+        mem: UserMemory,
+        history: List[str],
+        text_norm: str,
+        q_vec: np.ndarray,
+        mem_text: Optional[str],
+        mem_score: float,
+        kb_answer: Optional[str],
+        kb_score: float,
+) -> Optional[str]:
 
     # ----------------------------- 3) HISTORY MATCH ------------------------------
     hist_score = 0.0
@@ -160,7 +152,7 @@ def mini_llm_answer(
     lam = _router_score(mem_score, kb_score, hist_score)
 
     # Записываем текст в память всегда
-    mem.add(text_norm)
+    mem.add(text_norm, vec=q_vec)
 
     # Модель недостаточно уверена → отдаём оператору
     if lam < 0.75:
@@ -177,9 +169,8 @@ def mini_llm_answer(
         )
 
     # B) попали в FAQ
-    if kb_idx >= 0 and kb_score >= 0.82:
-        _, answer = _KNOWLEDGE_ITEMS[kb_idx]
-        return answer
+    if kb_answer is not None and kb_score >= 0.82:
+        return kb_answer
 
     # C) продолжаем прошлый диалог
     if hist_score >= 0.85:
@@ -187,3 +178,69 @@ def mini_llm_answer(
 
     # fallback на случай глупых срабатываний
     return None
+
+
+def mini_llm_answer_batch(
+        requests: Sequence[Tuple[int, List[str], str]],
+) -> List[Optional[str]]:
+    """
+    Пачка запросов (user_id, history, text) от разных пользователей:
+    один эмбеддинг-проход, один поиск по базе знаний на всю матрицу
+    запросов и одно умножение для личной памяти.
+
+    Память читается до записи новых сообщений пачки, поэтому два
+    сообщения одного пользователя в одной пачке друг друга не «помнят».
+    """
+    answers: List[Optional[str]] = [None] * len(requests)
+
+    live = []
+    for i, (user_id, history, text) in enumerate(requests):
+        text_norm = _prepare(text)
+        if text_norm:
+            live.append((i, user_id, history, text_norm))
+
+    if not live:
+        return answers
+
+    queries = np.stack([_embed(text_norm) for *_, text_norm in live])
+    mems = [_get_user_memory(user_id) for _, user_id, _, _ in live]
+
+    # ----------------------------- 1) ЛИЧНАЯ ПАМЯТЬ -----------------------------
+    mem_hits = _memory_top1(mems, queries)
+
+    # ----------------------------- 2) ГЛОБАЛЬНОЕ Q/A -----------------------------
+    kb_scores, kb_idxs, kb_snap = knowledge_base.search(queries, 1)
+
+    for row, (i, _, history, text_norm) in enumerate(live):
+        mem_text, mem_score = mem_hits[row]
+        kb_idx = int(kb_idxs[row][0])
+        kb_score = float(kb_scores[row][0])
+
+        # BM25 ловит словоформы и редкие слова, которые hash-эмбеддинг теряет;
+        # берём тот сигнал, который увереннее
+        lex = kb_snap.lexical.search(text_norm, top_k=1, normalize=True)
+        if lex and lex[0][1] > kb_score:
+            kb_idx, kb_score = lex[0]
+
+        kb_answer = kb_snap.docs[kb_idx].answer if kb_idx >= 0 else None
+
+        answers[i] = _route(
+            mems[row],
+            history,
+            text_norm,
+            queries[row],
+            mem_text,
+            mem_score,
+            kb_answer,
+            kb_score,
+        )
+
+    return answers
+
+
+def mini_llm_answer(
+        user_id: int,
+        history: List[str],
+        text: str,
+) -> Optional[str]:
+    return mini_llm_answer_batch([(user_id, history, text)])[0]
@@ -1,4 +1,3 @@
-import time
 from rapidfuzz import fuzz
 
 
@@ -22,61 +21,7 @@ SOFT_WORDS = [
 # ==========================
 # АНТИ-ФЛУД
 # ==========================
-
-USER_TIMERS = {}      # user_id -> last_message_timestamp
-USER_FLOOD_COUNT = {} # user_id -> spam counter
-
-FLOOD_INTERVAL = 1.2      # если пишет сообщения чаще чем раз в 1.2 сек → флуд
-FLOOD_MAX = 4             # после 4 флуда подряд → мут на время
-FLOOD_MUTE_TIME = 20      # время мута в сек
-
-
-USER_MUTES = {}           # user_id -> mute_until_timestamp
-
-
-
-def is_muted(user_id: int) -> bool:
-    now = time.time()
-    mute_until = USER_MUTES.get(user_id, 0)
-    return now < mute_until
-
-
-
-def register_message(user_id: int) -> str | None:
-    """
-    Возвращает:
-      None → всё ок
-      "mute" → чел в муте
-      "flood" → предупреждение
-      "muted_now" → его только что замутили
-    """
-
-    now = time.time()
-
-    # проверяем, не в муте ли он
-    if is_muted(user_id):
-        return "mute"
-
-    last = USER_TIMERS.get(user_id, 0)
-    diff = now - last
-
-    USER_TIMERS[user_id] = now
-
-    # если пишет слишком часто → flood
-    if diff < FLOOD_INTERVAL:
-        USER_FLOOD_COUNT[user_id] = USER_FLOOD_COUNT.get(user_id, 0) + 1
-    else:
-        USER_FLOOD_COUNT[user_id] = 0
-
-    if USER_FLOOD_COUNT[user_id] >= FLOOD_MAX:
-        USER_MUTES[user_id] = now + FLOOD_MUTE_TIME
-        USER_FLOOD_COUNT[user_id] = 0
-        return "muted_now"
-
-    if diff < FLOOD_INTERVAL:
-        return "flood"
-
-    return None
+# живёт в app.bot.flood (общий движок для Telegram и VK)
 
 
 # ==========================
@@ -97,6 +42,30 @@ def toxicity_level(text: str) -> int:
     return min(score, 100)
 
 
+# корни матов для быстрой проверки подстрокой (до интент-классификатора)
+TOXIC_STEMS = [
+    "бля",
+    "сука",
+    "пизд",
+    "хуй",
+    "еба",
+    "нах",
+    "уеб",
+    "мраз",
+    "пидор",
+    "пидр",
+    "еблан",
+    "даун",
+    "долбаеб",
+    "долбоеб",
+]
+
+
+def is_toxic(text: str) -> bool:
+    t = (text or "").lower()
+    return any(w in t for w in TOXIC_STEMS)
+
+
 def is_soft_text(text: str) -> bool:
     t = text.lower()
     for w in SOFT_WORDS:
@@ -0,0 +1,273 @@
+# app/bot/nlp_service.py
+"""
+NLP-сервис: токсичность, интенты и mini-LLM в тёплом пуле процессов.
+
+CPU-тяжёлые шаги (rapidfuzz, numpy, FAISS) не должны крутиться на том же
+event loop, что polling Telegram, FastAPI и очередь. Поэтому:
+• N однопроцессных пулов («шардов»), пользователь всегда попадает в свой шард
+  по user_id — личная FAISS-память mini-LLM живёт в одном процессе;
+• индекс базы знаний грузится в инициализаторе процесса и подменяется на лету;
+• на каждый вызов — таймаут, при таймауте отдаём fallback «позвать оператора»;
+• метрики: ожидание в очереди пула отдельно от чистого времени вычисления;
+• запросы к mini-LLM от разных пользователей одного шарда собираются
+  микро-батчером и уходят в процесс одной пачкой (один поиск по матрице).
+
+nlp_workers = 0 → всё выполняется inline (удобно для локальной отладки).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import faiss
+
+from app.bot import classifier
+from app.bot.intents import INTENT_UNKNOWN
+from app.bot.kb_index import knowledge_base
+from app.bot.mini_llm import mini_llm_answer_batch
+from app.bot.moderation import is_toxic
+from app.core.batching import MicroBatcher
+from app.core.metrics import metrics
+
+logger = logging.getLogger("bot.nlp")
+
+NLP_QUEUE_WAIT = metrics.histogram(
+    "nlp_queue_wait_seconds", "Time an NLP call waited for a pool worker"
+)
+NLP_COMPUTE = metrics.histogram(
+    "nlp_compute_seconds", "Pure compute time of an NLP call inside a worker"
+)
+NLP_TIMEOUTS = metrics.counter(
+    "nlp_timeouts_total", "NLP calls that hit the per-call timeout"
+)
+NLP_ERRORS = metrics.counter(
+    "nlp_errors_total", "NLP calls that failed in the worker"
+)
+INTENT_STAGE_SECONDS = metrics.histogram(
+    "intent_stage_seconds", "Latency of a single intent pipeline stage"
+)
+INTENT_STAGE_HITS = metrics.counter(
+    "intent_stage_hits_total", "Messages resolved by an intent pipeline stage"
+)
+
+# как часто процесс-воркер проверяет, не сменилась ли версия индекса
+KB_CHECK_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class Classification:
+    toxic: bool
+    intent: str
+    timed_out: bool = False
+
+
+# ======================================================
+#  СТОРОНА ВОРКЕРА (выполняется в дочернем процессе)
+# ======================================================
+
+_KB_DIR: Optional[str] = None
+_KB_CHECKED_AT: float = 0.0
+
+
+def _worker_init(kb_index_dir: Optional[str], intent_stages: Sequence[str]) -> None:
+    """Прогрев процесса: один поток для FAISS, пайплайн интентов и индекс с диска."""
+    global _KB_DIR
+    faiss.omp_set_num_threads(1)
+    classifier.configure(intent_stages)
+    _KB_DIR = kb_index_dir
+    _maybe_reload_kb(force=True)
+
+
+def _maybe_reload_kb(force: bool = False) -> None:
+    global _KB_CHECKED_AT
+    if not _KB_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _KB_CHECKED_AT < KB_CHECK_INTERVAL:
+        return
+    _KB_CHECKED_AT = now
+    try:
+        knowledge_base.maybe_reload(_KB_DIR)
+    except Exception as e:
+        logger.warning(f"[NLP worker {os.getpid()}] KB reload failed: {e!r}")
+
+
+def _timed(fn: Callable, submitted_at: float, *args):
+    """Возвращает (результат, ожидание в очереди, время вычисления)."""
+    started_at = time.time()
+    t0 = time.perf_counter()
+    _maybe_reload_kb()
+    result = fn(*args)
+    return result, max(0.0, started_at - submitted_at), time.perf_counter() - t0
+
+
+def _classify(text: str) -> Tuple[bool, Optional[classifier.PipelineResult]]:
+    if is_toxic(text):
+        return True, None
+    return False, classifier.pipeline.classify(text)
+
+
+def _answer_batch(requests: List[Tuple[int, List[str], str]]) -> List[Optional[str]]:
+    return mini_llm_answer_batch(requests)
+
+
+# ======================================================
+#  СТОРОНА EVENT LOOP
+# ======================================================
+
+class NLPService:
+    def __init__(self, workers: int = 2, timeout: float = 2.0):
+        self.workers = workers
+        self.timeout = timeout
+        self._kb_index_dir: Optional[str] = None
+        self._intent_stages: List[str] = list(classifier.DEFAULT_STAGES)
+        self._shards: List[Optional[ProcessPoolExecutor]] = []
+        self._batchers: List[MicroBatcher] = [self._new_batcher(0, 32, 0.003)]
+
+    # ------------------------------------
+    # START / STOP
+    # ------------------------------------
+
+    def start(
+            self,
+            workers: int,
+            timeout: float,
+            kb_index_dir: Optional[str] = None,
+            batch_max_size: int = 32,
+            batch_max_wait: float = 0.003,
+            intent_stages: Sequence[str] = classifier.DEFAULT_STAGES,
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self._kb_index_dir = kb_index_dir
+        self._intent_stages = classifier.parse_stages(intent_stages)
+        # inline-режим (workers=0) использует пайплайн текущего процесса
+        classifier.configure(self._intent_stages)
+        self._shards = [self._new_shard() for _ in range(max(0, workers))]
+        self._batchers = [
+            self._new_batcher(shard_no, batch_max_size, batch_max_wait)
+            for shard_no in range(max(1, len(self._shards)))
+        ]
+
+        # прогреваем процессы сразу, а не на первом сообщении пользователя
+        for shard in self._shards:
+            shard.submit(_maybe_reload_kb)
+
+        logger.info("NLP service started: %d worker(s), timeout=%.2fs", len(self._shards), timeout)
+
+    def stop(self) -> None:
+        for shard in self._shards:
+            if shard:
+                shard.shutdown(wait=False, cancel_futures=True)
+        self._shards = []
+
+    def _new_shard(self) -> ProcessPoolExecutor:
+        # spawn, а не fork: в родителе уже живут потоки (asyncio, OpenMP у FAISS)
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(self._kb_index_dir, self._intent_stages),
+        )
+
+    def _restart_shard(self, shard_no: int, broken: ProcessPoolExecutor) -> None:
+        """
+        Процесс упал (OOM / segfault в нативном коде) — поднимаем новый.
+        Одновременно упавших вызовов несколько: заменяет только первый,
+        остальные видят, что шард уже другой.
+        """
+        if shard_no >= len(self._shards) or self._shards[shard_no] is not broken:
+            return
+        logger.error("[NLP] shard %d is broken, restarting", shard_no)
+        self._shards[shard_no] = self._new_shard()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _new_batcher(self, shard_no: int, max_batch: int, max_wait: float) -> MicroBatcher:
+        async def handler(requests):
+            return await self._call("answer", shard_no, _answer_batch, requests)
+
+        return MicroBatcher(handler, max_batch=max_batch, max_wait=max_wait, name=f"nlp-answer-{shard_no}")
+
+    def _shard_no(self, user_id: int) -> int:
+        return user_id % len(self._shards) if self._shards else 0
+
+    # ------------------------------------
+    # ВЫЗОВЫ
+    # ------------------------------------
+
+    async def _call(self, stage: str, shard_no: int, fn: Callable, *args):
+        """
+        Запуск fn(*args) в шарде shard_no.
+        Бросает asyncio.TimeoutError, если не уложились в self.timeout.
+        """
+        submitted_at = time.time()
+
+        if not self._shards:
+            result, wait, compute = _timed(fn, submitted_at, *args)
+            NLP_QUEUE_WAIT.observe(wait, stage=stage)
+            NLP_COMPUTE.observe(compute, stage=stage)
+            return result
+
+        shard = self._shards[shard_no]
+        future = None
+        try:
+            # процесс мог упасть, пока шард простаивал, — тогда submit()
+            # бросает BrokenProcessPool сразу, и шард тоже надо поднять
+            future = shard.submit(_timed, fn, submitted_at, *args)
+            result, wait, compute = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            NLP_TIMEOUTS.inc(stage=stage)
+            raise
+        except BrokenProcessPool:
+            NLP_ERRORS.inc(stage=stage)
+            self._restart_shard(shard_no, shard)
+            raise
+
+        NLP_QUEUE_WAIT.observe(wait, stage=stage)
+        NLP_COMPUTE.observe(compute, stage=stage)
+        return result
+
+    async def classify(self, user_id: int, text: str) -> Classification:
+        """Токсичность + интент. При таймауте → timed_out=True (зовём оператора)."""
+        try:
+            toxic, result = await self._call("classify", self._shard_no(user_id), _classify, text)
+        except asyncio.TimeoutError:
+            logger.warning(f"[NLP] classify timeout for user {user_id}")
+            return Classification(toxic=False, intent=INTENT_UNKNOWN, timed_out=True)
+        except Exception as e:
+            logger.exception(f"[NLP] classify failed: {e}")
+            return Classification(toxic=False, intent=INTENT_UNKNOWN, timed_out=True)
+
+        if toxic:
+            return Classification(toxic=True, intent=INTENT_UNKNOWN)
+
+        for stage, seconds in result.timings.items():
+            INTENT_STAGE_SECONDS.observe(seconds, stage=stage)
+        INTENT_STAGE_HITS.inc(stage=result.stage or "none")
+        return Classification(toxic=False, intent=result.intent)
+
+    async def answer(self, user_id: int, history: List[str], text: str) -> Optional[str]:
+        """Ответ mini-LLM. Таймаут / ошибка → None (дальше предложим оператора)."""
+        batcher = self._batchers[self._shard_no(user_id)]
+        try:
+            return await asyncio.wait_for(
+                batcher.submit((user_id, list(history), text)),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"[NLP] answer timeout for user {user_id}")
+        except Exception as e:
+            logger.exception(f"[NLP] answer failed: {e}")
+        return None
+
+
+# Глобальный экземпляр (запускается в MessageProcessor.start)
+nlp_service = NLPService()
@@ -0,0 +1,288 @@
+# app/bot/outbound.py
+"""
+Планировщик исходящих сообщений с учётом лимитов платформы.
+
+• глобальный token bucket (Telegram — ~30 msg/s на бота, VK — ~20 req/s на группу);
+• темп на чат: следующее сообщение в тот же чат не раньше, чем через
+  per_chat_interval, и не пока предыдущее ещё в полёте — порядок в чате
+  сохраняется;
+• приоритеты: ответ оператора обгоняет авто-ответы, те — рассылки;
+• 429 / flood control: задача бросает RetryAfter(сек), чат ставится на паузу
+  ровно на столько, сообщение возвращается в голову очереди чата. Лимит
+  Telegram (и VK error 6) общий на бота, поэтому по умолчанию на паузу
+  встаёт и общий token bucket — иначе остальные чаты продолжат получать 429.
+
+Внутри: у каждого чата своя FIFO-очередь; готовые чаты лежат в куче
+по (приоритет головы, порядковый номер), чаты на паузе — в куче по времени.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger("bot.outbound")
+
+PRIORITY_OPERATOR = 0
+PRIORITY_AUTO = 1
+PRIORITY_BULK = 2
+
+OUTBOUND_QUEUED = metrics.gauge(
+    "outbound_queued_messages", "Outgoing messages waiting in the send scheduler"
+)
+OUTBOUND_WAIT = metrics.histogram(
+    "outbound_queue_wait_seconds", "Time an outgoing message spent in the send scheduler"
+)
+OUTBOUND_RETRIES = metrics.counter(
+    "outbound_retries_total", "Outgoing messages re-queued after a rate-limit answer"
+)
+OUTBOUND_FAILED = metrics.counter(
+    "outbound_failed_total", "Outgoing messages that could not be delivered"
+)
+
+
+class RetryAfter(Exception):
+    """
+    Платформа попросила подождать: задача бросает это с числом секунд.
+    whole_bot=False — лимит касается только этого чата.
+    """
+
+    def __init__(self, delay: float, whole_bot: bool = True):
+        super().__init__(f"retry after {delay:.2f}s")
+        self.delay = max(0.0, float(delay))
+        self.whole_bot = whole_bot
+
+
+@dataclass
+class _Job:
+    priority: int
+    seq: int
+    fn: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class _Chat:
+    __slots__ = ("jobs", "next_at", "busy", "scheduled")
+
+    def __init__(self):
+        self.jobs: Deque[_Job] = deque()
+        self.next_at = 0.0      # раньше этого момента в чат не пишем
+        self.busy = False       # сообщение в полёте
+        self.scheduled = False  # чат уже лежит в ready- или delayed-куче
+
+
+class OutboundScheduler:
+    def __init__(
+            self,
+            name: str,
+            rate: float = 30.0,
+            burst: float = 30.0,
+            per_chat_interval: float = 1.0,
+            max_retries: int = 5,
+            max_in_flight: int = 32,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0    # глобальная пауза после 429
+
+        self._chats: Dict[Hashable, _Chat] = {}
+        self._ready: List[Tuple[int, int, Hashable]] = []      # (priority, seq, chat)
+        self._delayed: List[Tuple[float, int, Hashable]] = []  # (next_at, seq, chat)
+        self._seq = itertools.count()
+        self._queued = 0
+        self._in_flight: Set[asyncio.Task] = set()
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+
+        OUTBOUND_QUEUED.set_function(lambda: self._queued, scheduler=name)
+
+    def configure(self, rate: float, per_chat_interval: float, max_retries: int) -> None:
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+
+    # ------------------------------------
+    # ПУБЛИЧНОЕ API
+    # ------------------------------------
+
+    async def send(
+            self,
+            chat_id: Hashable,
+            fn: Callable[[], Awaitable[Any]],
+            priority: int = PRIORITY_AUTO,
+    ) -> Any:
+        """Ставит отправку в очередь и ждёт её результата."""
+        self._ensure_running()
+
+        job = _Job(priority, next(self._seq), fn, asyncio.get_running_loop().create_future())
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat()
+
+        # более приоритетное сообщение встаёт перед менее приоритетными этого же чата
+        pos = len(chat.jobs)
+        while pos > 0 and chat.jobs[pos - 1].priority > priority and chat.jobs[pos - 1].attempts == 0:
+            pos -= 1
+        chat.jobs.insert(pos, job)
+        self._queued += 1
+
+        self._schedule(chat_id, chat)
+        self._wakeup.set()
+        return await job.future
+
+    async def stop(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+        for task in list(self._in_flight):
+            task.cancel()
+        for chat in self._chats.values():
+            for job in chat.jobs:
+                if not job.future.done():
+                    job.future.cancel()
+        self._chats.clear()
+        self._ready.clear()
+        self._delayed.clear()
+        self._queued = 0
+
+    # ------------------------------------
+    # ВНУТРЕННОСТИ
+    # ------------------------------------
+
+    def _ensure_running(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run(), name=f"outbound-{self.name}")
+
+    def _schedule(self, chat_id: Hashable, chat: _Chat) -> None:
+        if chat.scheduled or chat.busy or not chat.jobs:
+            return
+        chat.scheduled = True
+        if chat.next_at > time.monotonic():
+            heapq.heappush(self._delayed, (chat.next_at, next(self._seq), chat_id))
+        else:
+            head = chat.jobs[0]
+            heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + max(0.0, now - self._stamp) * self.rate)
+        self._stamp = max(self._stamp, now)
+
+    def _pause(self, delay: float) -> None:
+        """Вся отправка стоит delay секунд, после паузы bucket копится с нуля."""
+        until = time.monotonic() + delay
+        if until > self._paused_until:
+            self._paused_until = until
+            self._tokens = 0.0
+            self._stamp = until
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+
+            # чаты, у которых кончилась пауза, → в готовые
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._delayed)
+                chat = self._chats.get(chat_id)
+                if chat is None:
+                    continue
+                if chat.jobs:
+                    head = chat.jobs[0]
+                    heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+                else:
+                    del self._chats[chat_id]
+
+            sleep_for: Optional[float] = None
+            if self._ready and now < self._paused_until:
+                sleep_for = self._paused_until - now
+            elif self._ready and len(self._in_flight) < self.max_in_flight:
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    _, _, chat_id = heapq.heappop(self._ready)
+                    self._dispatch(chat_id)
+                    continue
+                sleep_for = (1.0 - self._tokens) / self.rate
+
+            if self._delayed:
+                until_delayed = max(0.0, self._delayed[0][0] - now)
+                sleep_for = until_delayed if sleep_for is None else min(sleep_for, until_delayed)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, chat_id: Hashable) -> None:
+        chat = self._chats[chat_id]
+        chat.scheduled = False
+        chat.busy = True
+        job = chat.jobs.popleft()
+        self._queued -= 1
+
+        task = asyncio.create_task(self._execute(chat_id, chat, job))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _execute(self, chat_id: Hashable, chat: _Chat, job: _Job) -> None:
+        started = time.monotonic()
+        job.attempts += 1
+        next_at = started + self.per_chat_interval
+
+        try:
+            result = await job.fn()
+        except RetryAfter as e:
+            next_at = max(next_at, time.monotonic() + e.delay)
+            if e.whole_bot:
+                self._pause(e.delay)
+            if job.attempts <= self.max_retries:
+                OUTBOUND_RETRIES.inc(scheduler=self.name)
+                logger.warning(f"[OUT:{self.name}] chat {chat_id}: retry in {e.delay:.1f}s")
+                chat.jobs.appendleft(job)
+                self._queued += 1
+            else:
+                OUTBOUND_FAILED.inc(scheduler=self.name)
+                if not job.future.done():
+                    job.future.set_exception(e)
+        except asyncio.CancelledError:
+            if not job.future.done():
+                job.future.cancel()
+            raise
+        except Exception as e:
+            OUTBOUND_FAILED.inc(scheduler=self.name)
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            OUTBOUND_WAIT.observe(started - job.enqueued_at, scheduler=self.name)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            chat.busy = False
+            chat.next_at = next_at
+            if chat.jobs:
+                self._schedule(chat_id, chat)
+            elif self._chats.get(chat_id) is chat and chat.next_at <= time.monotonic():
+                del self._chats[chat_id]
+            elif self._chats.get(chat_id) is chat:
+                # пустой чат держим до конца паузы, чтобы не сбросить темп
+                chat.scheduled = True
+                heapq.heappush(self._delayed, (chat.next_at, next(self._seq), chat_id))
+            if self._wakeup is not None:
+                self._wakeup.set()
@@ -1,9 +1,9 @@
 # app/bot/telegram_bot.py
 
+import asyncio
 import logging
-import time
 import re
-from typing import List, Dict, Optional
+from typing import List, Optional, Set
 
 from aiogram.client.default import DefaultBotProperties
 from aiogram import Bot, Dispatcher, Router
@@ -23,6 +23,8 @@ from aiogram.types import (
 )
 from aiogram.enums import ParseMode
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramRetryAfter
+from redis.asyncio import Redis
 
 from app.core.config import settings
 from app.bot.base import BaseBot
@@ -57,11 +59,24 @@ from app.bot.intents import (
     INTENT_UNKNOWN,
 )
 
-# MINI LLM + FAISS MEMORY
-from app.bot.mini_llm import mini_llm_answer
+# NLP (токсичность / интенты / mini-LLM) — в пуле процессов
+from app.bot.nlp_service import nlp_service
+
+# АНТИФЛУД (общий для всех платформ)
+from app.bot.flood import (
+    flood_engine,
+    FloodPolicy,
+    FLOOD_WARN,
+    FLOOD_MUTED_NOW,
+    FLOOD_MUTE,
+)
 
 # КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ
-from app.bot.context import UserContext
+from app.bot.context import ContextStore, UserContext
+from app.bot.context_backend import RedisContextBackend
+
+# ИСХОДЯЩИЕ (лимиты Telegram, приоритет оператора)
+from app.bot.outbound import OutboundScheduler, RetryAfter, PRIORITY_AUTO, PRIORITY_OPERATOR
 
 logger = logging.getLogger("telegram.bot")
 router = Router()
@@ -70,12 +85,12 @@ router = Router()
 #  ГЛОБАЛЬНЫЕ СТРУКТУРЫ СОСТОЯНИЯ
 # ======================================================
 
-# антифлуд
-USER_LAST_MESSAGE: Dict[int, float] = {}
-USER_FLOOD_SCORE: Dict[int, int] = {}
-
-# контексты (FSM + история + флаги)
-USER_CONTEXTS: Dict[int, UserContext] = {}
+# контексты (FSM + история + флаги + антифлуд), выгружаются по idle-TTL
+USER_CONTEXTS = ContextStore(
+    ttl=settings.context_ttl,
+    operator_ttl=settings.context_operator_ttl,
+    max_resident=settings.context_max_resident,
+)
 
 FLOOD_WARNINGS = [
     "✋ Полегче, бро. Я всё вижу 😄",
@@ -83,44 +98,85 @@ FLOOD_WARNINGS = [
     "🧠 Я не успеваю читать, ты слишком быстрый 💨",
 ]
 
+flood_engine.set_policy(
+    PlatformType.TELEGRAM.value,
+    FloodPolicy(
+        rate=settings.flood_tg_rate,
+        burst=settings.flood_tg_burst,
+        mute_after=settings.flood_tg_mute_after,
+        mute_seconds=settings.flood_tg_mute_seconds,
+    ),
+)
+
+
+# все исходящие бота идут через один планировщик: 30 msg/s на бота, 1 msg/s в чат
+send_scheduler = OutboundScheduler(
+    "telegram",
+    rate=settings.tg_send_rate,
+    burst=settings.tg_send_rate,
+    per_chat_interval=settings.tg_send_per_chat_interval,
+    max_retries=settings.send_max_retries,
+)
+
+# автоответы в полёте (reply_text) — чтобы задачи не собрал GC и их можно было снять в stop()
+_reply_tasks: Set[asyncio.Task] = set()
 
-def get_ctx(user_id: int) -> UserContext:
+
+async def send_text(bot: Bot, chat_id: int, text: str, priority: int = PRIORITY_AUTO, **kwargs):
+    """
+    Отправка через планировщик. 429 от Telegram превращается в RetryAfter —
+    лимит общий на бота, поэтому на паузу встаёт вся отправка, сообщение
+    уходит повторно.
+    """
+    async def job():
+        try:
+            return await bot.send_message(chat_id, text, **kwargs)
+        except TelegramRetryAfter as e:
+            raise RetryAfter(e.retry_after)
+
+    return await send_scheduler.send(chat_id, job, priority)
+
+
+def reply_text(bot: Bot, chat_id: int, text: str, priority: int = PRIORITY_AUTO, **kwargs) -> None:
+    """
+    Автоответ из хендлера — без ожидания отправки. Сообщение игрока должно
+    попасть в очередь сразу, а не после темпа чата и пауз по 429;
+    ошибка отправки автоответа только логируется. Порядок ответов в чате
+    сохраняет планировщик (задачи встают в очередь в порядке создания).
+    """
+    task = asyncio.create_task(_reply(bot, chat_id, text, priority, **kwargs))
+    _reply_tasks.add(task)
+    task.add_done_callback(_reply_tasks.discard)
+
+
+async def _reply(bot: Bot, chat_id: int, text: str, priority: int, **kwargs) -> None:
+    try:
+        await send_text(bot, chat_id, text, priority, **kwargs)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"[TG] auto-reply to {chat_id} failed: {e!r}")
+
+
+async def get_ctx(user_id: int) -> UserContext:
     """
     Достаём (или создаём) контекст пользователя.
     """
-    ctx = USER_CONTEXTS.get(user_id)
-    if ctx is None:
-        ctx = UserContext()
-        USER_CONTEXTS[user_id] = ctx
-    ctx.last_interaction = time.time()
-    return ctx
+    return await USER_CONTEXTS.load(user_id)
+
+
+async def save_ctx(user_id: int, ctx: UserContext) -> None:
+    """
+    Публикуем изменения контекста для остальных процессов бота
+    (без общего хранилища — no-op).
+    """
+    await USER_CONTEXTS.save(user_id, ctx)
 
 
 # ======================================================
 #  ТОКСИЧНОСТЬ / АНТИФЛУД
 # ======================================================
 
-def is_toxic(text: str) -> bool:
-    bad_words = [
-        "бля",
-        "сука",
-        "пизд",
-        "хуй",
-        "еба",
-        "нах",
-        "уеб",
-        "мраз",
-        "пидор",
-        "пидр",
-        "еблан",
-        "даун",
-        "долбаеб",
-        "долбоеб",
-    ]
-    t = (text or "").lower()
-    return any(w in t for w in bad_words)
-
-
 def toxic_reply() -> str:
     return (
         "🔥 Понимаю, эмоции — это сила 😅\n\n"
@@ -130,26 +186,17 @@ def toxic_reply() -> str:
 
 def check_flood(user_id: int) -> Optional[str]:
     """
-    Простая модель анти-флуда.
+    Анти-флуд через общий движок (app.bot.flood).
     """
-    now = time.time()
-    last = USER_LAST_MESSAGE.get(user_id, 0.0)
-
-    # чаще, чем раз в ~0.8 сек — подозрительно
-    if now - last < 0.8:
-        USER_FLOOD_SCORE[user_id] = USER_FLOOD_SCORE.get(user_id, 0) + 1
-    else:
-        USER_FLOOD_SCORE[user_id] = 0
-
-    USER_LAST_MESSAGE[user_id] = now
+    verdict = flood_engine.hit(PlatformType.TELEGRAM.value, user_id)
 
-    score = USER_FLOOD_SCORE[user_id]
-    if score == 2:
-        return FLOOD_WARNINGS[0]
-    if score == 4:
-        return FLOOD_WARNINGS[1]
-    if score >= 6:
-        return FLOOD_WARNINGS[2]
+    if verdict.action == FLOOD_WARN:
+        return FLOOD_WARNINGS[min(verdict.level, len(FLOOD_WARNINGS) - 1)]
+    if verdict.action == FLOOD_MUTED_NOW:
+        return f"🔇 Слишком много сообщений. Подожди {int(verdict.retry_after)} сек."
+    if verdict.action == FLOOD_MUTE:
+        # уже предупредили при муте — дальше молчим
+        return ""
 
     return None
 
@@ -255,14 +302,15 @@ def looks_like_payment_data(msg: Message, text_lower: str) -> bool:
 #  АВТО-ОТВЕТЫ (до передачи в очередь)
 # ======================================================
 
-async def try_autoreply(bot: Bot, msg: Message):
+async def try_autoreply(bot: Bot, msg: Message) -> Optional[str]:
+    """Автоответ; возвращает распознанный интент (None — до NLP не дошли)."""
     text = msg.text or msg.caption
     if not text:
         return
 
     chat_id = msg.chat.id
     user_id = msg.from_user.id
-    ctx = get_ctx(user_id)
+    ctx = await get_ctx(user_id)
 
     text_stripped = text.strip()
     text_lower = text_stripped.lower()
@@ -273,22 +321,37 @@ async def try_autoreply(bot: Bot, msg: Message):
 
     # ===== АНТИФЛУД =====
     flood_msg = check_flood(user_id)
-    if flood_msg:
-        await bot.send_message(chat_id, flood_msg)
+    if flood_msg is not None:
+        if flood_msg:
+            reply_text(bot, chat_id, flood_msg)
         return
 
     # ===== ИСТОРИЯ =====
     ctx.push_history(text_stripped)
     history = ctx.history
 
+    # ===== ТОКСИЧНОСТЬ + INTENT DETECTION (пул процессов) =====
+    nlp = await nlp_service.classify(user_id, text_stripped)
+
+    # NLP не успел ответить — не держим человека, сразу предлагаем оператора
+    if nlp.timed_out:
+        reply_text(
+            bot,
+            chat_id,
+            "⏳ Секунду, я сейчас немного перегружен.\n"
+            "Могу сразу позвать оператора 👇",
+            reply_markup=kb_inline_operator(),
+        )
+        return
+
     # ===== ТОКСИЧНОСТЬ =====
-    if is_toxic(text_stripped):
-        await bot.send_message(chat_id, toxic_reply())
+    if nlp.toxic:
+        reply_text(bot, chat_id, toxic_reply())
         return
 
-    # ===== INTENT DETECTION =====
+    # ===== INTENT =====
     prev_intent = ctx.last_intent or INTENT_UNKNOWN
-    intent = detect_intent(text_stripped)
+    intent = nlp.intent
     ctx.last_intent = intent
 
     # ===== ПОСТ-ФЛОУ ДЛЯ ОТВЯЗКИ АККАУНТА =====
@@ -297,13 +360,14 @@ async def try_autoreply(bot: Bot, msg: Message):
             ctx.operator_mode = True
             ctx.need_specialist = True
             ctx.state = "operator"
-            await bot.send_message(
+            reply_text(
+                bot,
                 chat_id,
                 "✅ Принял согласие на отвязку аккаунта.\n"
                 "Передаю запрос оператору, он продолжит с тобой диалог 👨‍💼",
                 reply_markup=kb_operator_panel(),
             )
-            return
+            return intent
 
     # ===== ПОСТ-ФЛОУ ДЛЯ ПРОБЛЕМЫ ОПЛАТЫ (не пришёл товар/донат) =====
     if prev_intent == INTENT_PAYMENT_PROBLEM and intent == INTENT_UNKNOWN:
@@ -312,13 +376,14 @@ async def try_autoreply(bot: Bot, msg: Message):
             ctx.operator_mode = True
             ctx.need_specialist = True
             ctx.state = "operator"
-            await bot.send_message(
+            reply_text(
+                bot,
                 chat_id,
                 "✅ Принял данные по оплате. Передаю их оператору.\n"
                 "Он вернётся с ответом, как только проверит информацию 👨‍💼",
                 reply_markup=kb_operator_panel(),
             )
-            return
+            return intent
 
     # ===== ПОСТ-ФЛОУ ДЛЯ ВЗЛОМА (INTENT_HACKED) =====
     if prev_intent == INTENT_HACKED and intent == INTENT_UNKNOWN:
@@ -326,60 +391,66 @@ async def try_autoreply(bot: Bot, msg: Message):
         ctx.operator_mode = True
         ctx.need_specialist = True
         ctx.state = "operator"
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "📞 Подключаю оператора, чтобы детально проверить безопасность аккаунта.\n"
             "Он продолжит с тобой диалог в этом чате.",
             reply_markup=kb_operator_panel(),
         )
-        return
+        return intent
 
     # =======================
     #  ОТВЕТЫ ПО ИНТЕНТАМ
     # =======================
 
     if intent == INTENT_RULES:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "📘 <b>Правила проекта</b>:\nhttps://vk.com/topic-213058175_49087108",
             reply_markup=kb_url(
                 "https://vk.com/topic-213058175_49087108", "Открыть правила"
             ),
         )
-        return
+        return intent
 
     if intent == INTENT_MEDIA:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🎥 <b>Набор в Media:</b>\nhttps://vk.com/topic-213058175_48919352",
             reply_markup=kb_url(
                 "https://vk.com/topic-213058175_48919352", "Открыть набор"
             ),
         )
-        return
+        return intent
 
     if intent == INTENT_TEAM:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "👥 <b>Набор в Команду:</b>\nhttps://vk.com/topic-213058175_48975272",
             reply_markup=kb_url(
                 "https://vk.com/topic-213058175_48975272", "Условия"
             ),
         )
-        return
+        return intent
 
     if intent == INTENT_UNLINK:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🔓 <b>Отвязка аккаунта</b>:\n"
             "Отмена привязки сопровождается <b>перманентной блокировкой</b> аккаунта.\n\n"
             "Если вы согласны на такой исход, напишите сюда:\n"
             "<i>я согласен на отмену привязки аккаунта ВАШНИК и его перманентную блокировку</i>.",
         )
-        return
+        return intent
 
     if intent == INTENT_TRANSFER_PRIV:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "💎 <b>Перенос привилегии</b>\n"
             "Переносится только привилегия. Условия:\n"
@@ -387,49 +458,54 @@ async def try_autoreply(bot: Bot, msg: Message):
             "• оба аккаунта не должны иметь активных блокировок.\n"
             "Если всё подходит — сообщите оператору, он продолжит оформление.",
         )
-        return
+        return intent
 
     if intent == INTENT_TRANSFER_BIND:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🔗 <b>Перенос привязки аккаунта</b>\n"
             "Заполните форму: https://vk.cc/czfKhH",
             reply_markup=kb_url("https://vk.cc/czfKhH", "Открыть форму"),
         )
-        return
+        return intent
 
     if intent == INTENT_PASSWORD_RESET:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🔐 <b>Сброс / смена пароля</b>\n"
             "Нажмите кнопку <b>«Сброс пароля»</b> в панели бота VK.\n"
             "Если панели нет — отправьте команду <b>МоиАккаунты</b> "
             "и выберите нужный аккаунт.",
         )
-        return
+        return intent
 
     if intent == INTENT_TOTP:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🔑 <b>Инструкция по TOTP</b>:\nhttps://vk.com/@cubeworldpro-totp",
             reply_markup=kb_url(
                 "https://vk.com/@cubeworldpro-totp", "Открыть инструкцию"
             ),
         )
-        return
+        return intent
 
     if intent == INTENT_REFUND:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "💵 <b>Возврат средств</b>\n"
             "Нам нужны: получатель (ник/клан), товар, дата и время оплаты,\n"
             "адрес электронной почты и PDF-квитанция. Возврат возможен только,\n"
             "если товар ещё не был использован и с момента оплаты прошло не более 14 дней.",
         )
-        return
+        return intent
 
     if intent == INTENT_ITEM_TRANSFER:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "📦 <b>Перенос товара</b>\n"
             "Если вы оплатили на неправильный аккаунт — напишите:\n"
@@ -440,10 +516,11 @@ async def try_autoreply(bot: Bot, msg: Message):
             "5) Email и PDF-квитанция.\n\n"
             "Перенос возможен только если первичный получатель не успел им воспользоваться.",
         )
-        return
+        return intent
 
     if intent == INTENT_PAYMENT_PROBLEM:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🧾 <b>Не пришёл донат / товар</b>\n"
             "Для решения проблемы нам нужно получить от вас информацию:\n\n"
@@ -462,45 +539,50 @@ async def try_autoreply(bot: Bot, msg: Message):
             "5. Квитанция: приложенный PDF-файл.",
         )
         # дальше пользователь отправит данные → сработает блок prev_intent == INTENT_PAYMENT_PROBLEM
-        return
+        return intent
 
     if intent == INTENT_FORCE_BIND:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🔒 <b>Принудительная привязка</b>\n"
             "После выполнения привязки отправьте команду <b>/refresh</b> боту VK,\n"
             "чтобы аккаунт появился среди привязанных.",
         )
-        return
+        return intent
 
     if intent == INTENT_AGENT_INFO:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "👨‍💼 <b>Агенты поддержки</b> — не высшая администрация.\n"
             "Они передают заявки наверх, и ожидание ответа может занимать до 48 часов.",
         )
-        return
+        return intent
 
     if intent == INTENT_APPEAL:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "⚖️ <b>Обжалование блокировок / жалобы</b>\n"
             "Сообщество для апелляций: https://vk.com/cubeworldj",
             reply_markup=kb_url("https://vk.com/cubeworldj", "Перейти"),
         )
-        return
+        return intent
 
     if intent == INTENT_WIPE:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🗑 <b>Вайп</b>\n"
             "Точные дата и время вайпа заранее не сообщаются.\n"
             "Следите за новостями в основном сообществе и TG-канале проекта.",
         )
-        return
+        return intent
 
     if intent == INTENT_NEWS:
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "📰 <b>Новости проекта</b>",
             reply_markup=InlineKeyboardMarkup(
@@ -518,51 +600,55 @@ async def try_autoreply(bot: Bot, msg: Message):
                 ]
             ),
         )
-        return
+        return intent
 
     if intent == INTENT_HACKED:
         ctx.operator_mode = True
         ctx.need_specialist = True
         ctx.state = "operator"
 
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "🚨 <b>Похоже, ваш аккаунт могли скомпрометировать.</b>\n"
             "Срочно смените пароль и включите двухфакторную защиту.\n"
             "Опишите проблему подробнее, оператор поможет разобраться.",
             reply_markup=kb_operator_panel(),
         )
-        return
+        return intent
 
     if intent == INTENT_IDIOTIC:
-        await bot.send_message(chat_id, toxic_reply())
-        return
+        reply_text(bot, chat_id, toxic_reply())
+        return intent
 
     if intent == INTENT_OPERATOR:
         ctx.operator_mode = True
         ctx.need_specialist = True
         ctx.state = "operator"
-        await bot.send_message(
+        reply_text(
+            bot,
             chat_id,
             "📞 Зову оператора. Он подключится, как только освободится.\n"
             "Пока что можешь дополнительно описать проблему.",
             reply_markup=kb_operator_panel(),
         )
-        return
+        return intent
 
     # ===== ИНТЕНТ НЕ НАЙДЕН → mini-LLM (FAISS + память) =====
-    answer = mini_llm_answer(user_id=user_id, history=history, text=text_stripped)
+    answer = await nlp_service.answer(user_id, history, text_stripped)
     if answer:
-        await bot.send_message(chat_id, answer)
-        return
+        reply_text(bot, chat_id, answer)
+        return intent
 
     # ===== НИЧЕГО НЕ ПОНЯТО → inline-кнопка оператора =====
-    await bot.send_message(
+    reply_text(
+        bot,
         chat_id,
         "🤔 Я не совсем понял запрос.\n"
         "Хочешь — позову оператора 👇",
         reply_markup=kb_inline_operator(),
     )
+    return intent
 
 
 # ======================================================
@@ -572,10 +658,13 @@ async def try_autoreply(bot: Bot, msg: Message):
 @router.message(Command("start"))
 async def handle_start(msg: Message):
     user_id = msg.from_user.id
-    ctx = get_ctx(user_id)
+    ctx = await get_ctx(user_id)
     ctx.reset()
+    await save_ctx(user_id, ctx)
 
-    await msg.answer(
+    reply_text(
+        msg.bot,
+        msg.chat.id,
         "👋 Привет! Я бот умной поддержки CubeWorld.\n"
         "Напиши свой вопрос — я попробую помочь.\n",
         reply_markup=KB_REMOVE,
@@ -588,13 +677,16 @@ async def handle_start(msg: Message):
 @router.message(Command("operator"))
 async def handle_operator(msg: Message):
     user_id = msg.from_user.id
-    ctx = get_ctx(user_id)
+    ctx = await get_ctx(user_id)
     ctx.operator_mode = True
     ctx.last_intent = INTENT_OPERATOR
     ctx.need_specialist = True
     ctx.state = "operator"
+    await save_ctx(user_id, ctx)
 
-    await msg.answer(
+    reply_text(
+        msg.bot,
+        msg.chat.id,
         "📨 Оператор уведомлён. Опиши проблему как можно подробнее.",
         reply_markup=kb_operator_panel(),
     )
@@ -606,7 +698,7 @@ async def handle_operator(msg: Message):
 @router.message()
 async def handle_all(msg: Message):
     user_id = msg.from_user.id
-    ctx = get_ctx(user_id)
+    ctx = await get_ctx(user_id)
     text_raw = msg.text or msg.caption or ""
     text = text_raw.strip().lower()
 
@@ -615,7 +707,10 @@ async def handle_all(msg: Message):
         if text == "подтвердить":
             # реально закрываем тикет
             ctx.reset()
-            await msg.answer(
+            await save_ctx(user_id, ctx)
+            reply_text(
+                msg.bot,
+                msg.chat.id,
                 "✅ Обращение закрыто. Если что — напиши ещё раз.",
                 reply_markup=ReplyKeyboardRemove(),
             )
@@ -627,7 +722,10 @@ async def handle_all(msg: Message):
             # отменяем закрытие, возвращаемся в оператор-режим
             ctx.state = "operator"
             ctx.operator_mode = True
-            await msg.answer(
+            await save_ctx(user_id, ctx)
+            reply_text(
+                msg.bot,
+                msg.chat.id,
                 "👌 Окей, обращение оставляю открытым.",
                 reply_markup=kb_operator_panel(),
             )
@@ -640,7 +738,10 @@ async def handle_all(msg: Message):
     if text == "закрыть обращение":
         if ctx.operator_mode:
             ctx.state = "waiting_close_confirm"
-            await msg.answer(
+            await save_ctx(user_id, ctx)
+            reply_text(
+                msg.bot,
+                msg.chat.id,
                 "❓ Точно закрываем обращение?\n"
                 "После закрытия продолжить диалог в этом тикете будет нельзя.",
                 reply_markup=kb_close_confirm_panel(),
@@ -653,10 +754,13 @@ async def handle_all(msg: Message):
     logger.info(f"[TG] message from {msg.from_user.id}: {msg.text!r}")
 
     # автоответ (если не оператор-режим / не флудаем / не токс)
-    await try_autoreply(msg.bot, msg)
+    intent = await try_autoreply(msg.bot, msg)
 
     # подготовка payload для очереди
     payload = msg.model_dump()
+    if intent:
+        # интент первого сообщения попадёт в тикет (разрезы статистики)
+        payload["intent"] = intent
 
     # если во время try_autoreply мы решили, что нужен оператор
     if ctx.need_specialist:
@@ -664,6 +768,7 @@ async def handle_all(msg: Message):
         # сбросим флаг, чтобы не дублировать
         ctx.need_specialist = False
 
+    await save_ctx(user_id, ctx)
     await message_queue.put(("telegram", payload))
 
 
@@ -691,6 +796,16 @@ class TelegramBot(BaseBot):
         self.dp = Dispatcher()
         self.dp.include_router(router)
 
+        # несколько процессов бота → контексты в Redis, локально только near-cache
+        if settings.context_backend == "redis":
+            await USER_CONTEXTS.attach(
+                RedisContextBackend(
+                    Redis.from_url(settings.redis_url),
+                    prefix=settings.context_redis_prefix,
+                    ttl=settings.context_operator_ttl,
+                )
+            )
+
         try:
             await self.bot.delete_webhook(drop_pending_updates=True)
         except Exception as e:
@@ -700,8 +815,12 @@ class TelegramBot(BaseBot):
         await self.dp.start_polling(self.bot)
 
     async def stop(self):
+        for task in list(_reply_tasks):
+            task.cancel()
+        await send_scheduler.stop()
         if self.bot:
             await self.bot.session.close()
+        await USER_CONTEXTS.close()
 
     async def process_message(self, data: dict) -> MessageCreate:
         msg = Message(**data)
@@ -714,15 +833,16 @@ class TelegramBot(BaseBot):
             is_ai_response=False,
         )
 
-    async def send_message(self, user_id: str, text: str, **kwargs):
+    async def send_message(self, user_id: str, text: str, priority: int = PRIORITY_OPERATOR, **kwargs):
         """
         Отправка сообщения пользователю (реализация BaseBot).
+        По умолчанию — с приоритетом оператора: обгоняет авто-ответы в очереди.
         """
         if not self.bot:
             return {"success": False, "error": "Telegram bot is not running"}
 
         try:
-            m = await self.bot.send_message(user_id, text, **kwargs)
+            m = await send_text(self.bot, int(user_id), text, priority=priority, **kwargs)
             return {"success": True, "message_id": m.message_id}
         except Exception as e:
             logger.exception(f"[TG] send_message error: {e}")
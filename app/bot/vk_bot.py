@@ -1,19 +1,65 @@
 from aiohttp import web
+import aiohttp
 import json
 import logging
 import hmac
 import hashlib
+import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
 from app.bot.base import BaseBot
+from app.bot.flood import flood_engine, FloodPolicy, FLOOD_MUTE, FLOOD_MUTED_NOW
+from app.bot.outbound import OutboundScheduler, RetryAfter, PRIORITY_AUTO, PRIORITY_OPERATOR
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.models.user import PlatformType
 from app.schemas.message import MessageCreate, MessageDirection
 from app.schemas.attachment import AttachmentCreate
 
 logger = logging.getLogger(__name__)
 
+VK_API_URL = 'https://api.vk.com/method/'
+VK_API_VERSION = '5.199'
+
+# коды ошибок VK, после которых запрос стоит повторить позже (сек паузы):
+# 6 — слишком много запросов в секунду, 9 — flood control на однотипные сообщения
+VK_RETRY_ERRORS = {6: 1.0, 9: 5.0}
+# 6 — лимит запросов в секунду на всё сообщество, 9 — флуд-контроль одного диалога
+VK_CHAT_ONLY_ERRORS = {9}
+
+VK_API_LATENCY = metrics.histogram(
+    "vk_api_request_seconds", "Latency of VK API calls"
+)
+VK_HTTP_IN_FLIGHT = metrics.gauge(
+    "vk_http_requests_in_flight", "VK API requests currently holding a pooled connection"
+)
+VK_HTTP_POOL_LIMIT = metrics.gauge(
+    "vk_http_pool_limit", "Max connections in the VK HTTP pool"
+)
+VK_HTTP_CONNECTIONS = metrics.counter(
+    "vk_http_connections_total", "VK HTTP connections by outcome (new / reused)"
+)
+
+flood_engine.set_policy(
+    PlatformType.VK.value,
+    FloodPolicy(
+        rate=settings.flood_vk_rate,
+        burst=settings.flood_vk_burst,
+        mute_after=settings.flood_vk_mute_after,
+        mute_seconds=settings.flood_vk_mute_seconds,
+    ),
+)
+
+# исходящие сообщения сообщества: ~20 запросов/сек, паузы по ошибкам 6/9
+send_scheduler = OutboundScheduler(
+    "vk",
+    rate=settings.vk_send_rate,
+    burst=settings.vk_send_rate,
+    per_chat_interval=settings.vk_send_per_chat_interval,
+    max_retries=settings.send_max_retries,
+)
+
 class VKBot(BaseBot):
     def __init__(self):
         super().__init__(PlatformType.VK)
@@ -21,6 +67,7 @@ class VKBot(BaseBot):
         self.secret_key = settings.vk_secret_key
         self.confirmation_code = settings.vk_confirmation_code
         self.group_id = settings.vk_group_id
+        self._session: Optional[aiohttp.ClientSession] = None
 
     async def start(self):
         if not all([settings.vk_bot_token, settings.vk_group_id, settings.vk_confirmation_code]):
@@ -39,9 +86,65 @@ class VKBot(BaseBot):
         return self.app
 
     async def stop(self):
+        await send_scheduler.stop()
         if self.app:
             await self.app.shutdown()
             await self.app.cleanup()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ===============================
+    # HTTP-пул для VK API
+    # ===============================
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Одна долгоживущая сессия на бота: keep-alive соединения к api.vk.com
+        переиспользуются, TLS-рукопожатие — только на новое соединение.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.vk_http_pool_size,
+                limit_per_host=settings.vk_http_pool_size,
+                ttl_dns_cache=settings.vk_http_dns_ttl,
+                keepalive_timeout=settings.vk_http_keepalive,
+            )
+
+            trace = aiohttp.TraceConfig()
+
+            async def on_create(session, ctx, params):
+                VK_HTTP_CONNECTIONS.inc(kind="new")
+
+            async def on_reuse(session, ctx, params):
+                VK_HTTP_CONNECTIONS.inc(kind="reused")
+
+            trace.on_connection_create_end.append(on_create)
+            trace.on_connection_reuseconn.append(on_reuse)
+
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.vk_http_timeout),
+                trace_configs=[trace],
+            )
+            VK_HTTP_POOL_LIMIT.set(settings.vk_http_pool_size)
+        return self._session
+
+    async def _api_call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Вызов метода VK API через общий пул соединений."""
+        params = {**params, 'access_token': settings.vk_bot_token, 'v': VK_API_VERSION}
+
+        status = "error"
+        started = time.perf_counter()
+        VK_HTTP_IN_FLIGHT.inc()
+        try:
+            async with self._get_session().post(VK_API_URL + method, params=params) as response:
+                result = await response.json(content_type=None)
+                status = "api_error" if 'error' in result else "ok"
+                return result
+        finally:
+            VK_HTTP_IN_FLIGHT.dec()
+            VK_API_LATENCY.observe(time.perf_counter() - started, method=method, status=status)
 
     def _setup_routes(self):
         self.app.router.add_post('/vk/callback', self._handle_callback)
@@ -105,20 +208,33 @@ class VKBot(BaseBot):
         """Обработка нового сообщения"""
         logger.info(f"Received VK message: {message_data}")
 
-        # Добавляем в очередь для обработки
+        # Добавляем в очередь для обработки — до автоответа: отправка может
+        # ждать темпа чата и пауз по лимитам VK, сообщение игрока — нет
         from app.core.queue import message_queue
         await message_queue.put(("vk", message_data))
 
-    async def send_message(self, user_id: str, text: str, **kwargs) -> Dict[str, Any]:
-        """Отправка сообщения через VK API"""
-        import aiohttp
-
+        # Анти-флуд глушит только ответы бота: само сообщение игрока
+        # всё равно сохраняется в тикет (как и в Telegram)
+        from_id = message_data.get('from_id')
+        if from_id is not None:
+            verdict = flood_engine.hit(PlatformType.VK.value, from_id)
+            if verdict.action == FLOOD_MUTE:
+                logger.info(f"VK user {from_id} is muted, reply suppressed")
+            elif verdict.action == FLOOD_MUTED_NOW:
+                await self.send_message(
+                    str(from_id),
+                    f"🔇 Слишком много сообщений. Подожди {int(verdict.retry_after)} сек.",
+                    priority=PRIORITY_AUTO,
+                )
+
+    async def send_message(
+            self, user_id: str, text: str, priority: int = PRIORITY_OPERATOR, **kwargs
+    ) -> Dict[str, Any]:
+        """Отправка сообщения через VK API (через планировщик исходящих)"""
         params = {
             'user_id': user_id,
             'message': text,
             'random_id': int(datetime.now().timestamp() * 1000),
-            'access_token': settings.vk_bot_token,
-            'v': '5.199'
         }
 
         # Добавляем дополнительные параметры
@@ -128,26 +244,29 @@ class VKBot(BaseBot):
         if 'attachment' in kwargs:
             params['attachment'] = kwargs['attachment']
 
+        async def job():
+            # random_id один на все попытки — VK не задублирует сообщение
+            result = await self._api_call('messages.send', params)
+            code = (result.get('error') or {}).get('error_code')
+            if code in VK_RETRY_ERRORS:
+                raise RetryAfter(VK_RETRY_ERRORS[code], whole_bot=code not in VK_CHAT_ONLY_ERRORS)
+            return result
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                        'https://api.vk.com/method/messages.send',
-                        params=params
-                ) as response:
-                    result = await response.json()
-
-                    if 'error' in result:
-                        logger.error(f"VK API error: {result['error']}")
-                        return {
-                            "success": False,
-                            "error": result['error']
-                        }
-
-                    return {
-                        "success": True,
-                        "message_id": str(result['response']),
-                        "result": result
-                    }
+            result = await send_scheduler.send(user_id, job, priority)
+
+            if 'error' in result:
+                logger.error(f"VK API error: {result['error']}")
+                return {
+                    "success": False,
+                    "error": result['error']
+                }
+
+            return {
+                "success": True,
+                "message_id": str(result['response']),
+                "result": result
+            }
 
         except Exception as e:
             logger.error(f"Error sending VK message: {e}")
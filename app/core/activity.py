@@ -0,0 +1,120 @@
+# app/core/activity.py
+"""
+Write-behind для users.last_active.
+
+На каждое входящее сообщение раньше шёл UPDATE users + commit. Точность
+до секунды никому не нужна, поэтому:
+
+• touch() только запоминает в памяти последнее время активности юзера;
+• раз в last_active_flush_interval секунд всё накопленное уходит одним
+  UPDATE ... SET last_active = CASE id WHEN ... END WHERE id IN (...)
+  (пачками по last_active_flush_batch);
+• на shutdown буфер сбрасывается;
+• last_active_writes_saved_total — сколько одиночных UPDATE не понадобилось.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import case, update
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.metrics import metrics
+from app.models.user import User
+
+logger = logging.getLogger("activity")
+
+ACTIVITY_PENDING = metrics.gauge(
+    "last_active_pending_users", "Users with a last_active timestamp waiting to be flushed"
+)
+ACTIVITY_TOUCHES = metrics.counter(
+    "last_active_touches_total", "last_active updates requested"
+)
+ACTIVITY_FLUSHED = metrics.counter(
+    "last_active_rows_flushed_total", "Users rows written by last_active flushes"
+)
+ACTIVITY_SAVED = metrics.counter(
+    "last_active_writes_saved_total", "Per-message UPDATEs avoided by coalescing last_active"
+)
+
+
+class LastActiveBuffer:
+    def __init__(self):
+        self._pending: Dict[int, datetime] = {}
+        self._touches = 0          # touch() с прошлого сброса
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        ACTIVITY_PENDING.set_function(lambda: len(self._pending))
+
+    def touch(self, user_id: int, at: Optional[datetime] = None) -> None:
+        at = at or datetime.utcnow()
+        prev = self._pending.get(user_id)
+        if prev is None or at > prev:
+            self._pending[user_id] = at
+        self._touches += 1
+        ACTIVITY_TOUCHES.inc()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="last-active-flush")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.last_active_flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[ACTIVITY] flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Пишет накопленное; возвращает число обновлённых пользователей."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            touches, self._touches = self._touches, 0
+
+            items = sorted(pending.items())   # по id — одинаковый порядок блокировок
+            batch = settings.last_active_flush_batch
+            try:
+                async with async_session_maker() as db:
+                    for i in range(0, len(items), batch):
+                        chunk = dict(items[i:i + batch])
+                        await db.execute(
+                            update(User)
+                            .where(User.id.in_(list(chunk)))
+                            # updated_at пинится явно, иначе onupdate из
+                            # TimestampMixin отметил бы смену профиля
+                            .values(last_active=case(chunk, value=User.id), updated_at=User.updated_at)
+                            .execution_options(synchronize_session=False)
+                        )
+                    await db.commit()
+            except Exception:
+                # не потерять активность: вернуть в буфер, не затирая более свежие
+                for user_id, at in pending.items():
+                    if user_id not in self._pending or self._pending[user_id] < at:
+                        self._pending[user_id] = at
+                self._touches += touches
+                raise
+
+            ACTIVITY_FLUSHED.inc(len(items))
+            ACTIVITY_SAVED.inc(max(0, touches - len(items)))
+            return len(items)
+
+
+activity_buffer = LastActiveBuffer()
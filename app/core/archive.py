@@ -0,0 +1,233 @@
+# app/core/archive.py
+"""
+Архив переписки: messages / attachments → messages_archive / attachments_archive.
+
+Переносятся сообщения тикетов, закрытых больше archive_after_days назад:
+
+• пачками по archive_batch_size сообщений в порядке id; на пачку — одна
+  короткая транзакция INSERT ... SELECT в архив + DELETE из горячих таблиц,
+  блокируются только строки этой пачки; между пачками — пауза
+  archive_batch_pause, чтобы не забивать репликацию и буферный пул;
+• на MySQL перед пачкой от pmax отрезаются недостающие помесячные
+  партиции архива (pYYYYMM) — старые месяцы потом можно DROP PARTITION;
+• читать историю тикета можно как раньше через message_crud —
+  горячие и архивные строки склеиваются там; поиск (app.core.search)
+  тоже смотрит в архив.
+
+Строки уезжают в архив с теми же id, поэтому счётчик AUTO_INCREMENT горячих
+таблиц не должен откатываться. До MySQL 8.0 (и MariaDB 10.2.4) InnoDB после
+рестарта ставит его в MAX(id) + 1 — id архивированных строк достались бы
+новым сообщениям. На таких серверах архиватор не запускается.
+"""
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker, engine
+from app.core.metrics import metrics
+from app.core.search import message_search
+from app.models.archive import ArchivedAttachment, ArchivedMessage
+from app.models.attachment import Attachment
+from app.models.message import Message
+from app.models.ticket import Ticket, TicketStatus
+
+logger = logging.getLogger("archive")
+
+ARCHIVE_MOVED = metrics.counter(
+    "archive_rows_moved_total", "Rows moved from hot tables to the archive"
+)
+ARCHIVE_RUN = metrics.histogram(
+    "archive_run_seconds", "Duration of one archive pass",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+MESSAGE_COLUMNS = [c.name for c in Message.__table__.columns]
+ATTACHMENT_COLUMNS = [c.name for c in Attachment.__table__.columns]
+ARCHIVE_TABLES = (ArchivedMessage.__tablename__, ArchivedAttachment.__tablename__)
+
+
+def persistent_auto_increment(version: str) -> bool:
+    """Сервер хранит счётчик AUTO_INCREMENT между рестартами (по SELECT VERSION())."""
+    m = re.match(r"(\d+)\.(\d+)\.(\d+)", version)
+    if m is None:
+        return False
+    release = tuple(int(part) for part in m.groups())
+    if "mariadb" in version.lower():
+        return release >= (10, 2, 4)
+    return release >= (8, 0, 0)
+
+
+def _month(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def _next_month(dt: datetime) -> datetime:
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+
+
+class MessageArchiver:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._supported: Optional[bool] = None
+
+    def start(self) -> None:
+        if settings.archive_after_days <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="message-archiver")
+
+    async def stop(self) -> None:
+        # прерванная пачка откатится целиком — это одна транзакция
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[ARCHIVE] pass failed: {e}")
+            await asyncio.sleep(settings.archive_interval)
+
+    async def run_once(self) -> int:
+        """Один проход по всем подходящим тикетам; возвращает число перенесённых сообщений."""
+        if not await self._check_server():
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(days=settings.archive_after_days)
+        batch = settings.archive_batch_size
+        started = time.perf_counter()
+        moved = 0
+
+        while not self._stopping:
+            async with async_session_maker() as db:
+                rows = (await db.execute(
+                    select(Message.id, Message.created_at)
+                    .join(Ticket, Ticket.id == Message.ticket_id)
+                    .where(Ticket.status == TicketStatus.CLOSED, Ticket.closed_at < cutoff)
+                    .order_by(Message.id)
+                    .limit(batch)
+                )).all()
+                if not rows:
+                    break
+
+                ids = [r.id for r in rows]
+                if engine.dialect.name == "mysql":
+                    await self._ensure_partitions(
+                        min(r.created_at for r in rows), max(r.created_at for r in rows)
+                    )
+                await self._move(db, ids)
+                await db.commit()
+
+            moved += len(ids)
+            if len(ids) < batch:
+                break
+            await asyncio.sleep(settings.archive_batch_pause)
+
+        ARCHIVE_RUN.observe(time.perf_counter() - started)
+        if moved:
+            logger.info(f"[ARCHIVE] moved {moved} messages older than {cutoff:%Y-%m-%d}")
+        return moved
+
+    async def _check_server(self) -> bool:
+        if self._supported is None:
+            self._supported = True
+            if engine.dialect.name == "mysql":
+                async with engine.connect() as conn:
+                    version = (await conn.execute(text("SELECT VERSION()"))).scalar_one()
+                self._supported = persistent_auto_increment(version)
+                if not self._supported:
+                    logger.error(
+                        f"[ARCHIVE] disabled: server {version} resets AUTO_INCREMENT on restart, "
+                        f"archived ids would be reused (needs MySQL 8.0+ / MariaDB 10.2.4+)"
+                    )
+        return self._supported
+
+    async def _move(self, db: AsyncSession, ids: List[int]) -> None:
+        msg = Message.__table__
+        att = Attachment.__table__
+
+        await db.execute(
+            insert(ArchivedMessage.__table__).from_select(
+                MESSAGE_COLUMNS,
+                select(*[msg.c[name] for name in MESSAGE_COLUMNS]).where(msg.c.id.in_(ids)),
+            )
+        )
+        res = await db.execute(
+            insert(ArchivedAttachment.__table__).from_select(
+                ATTACHMENT_COLUMNS,
+                select(*[att.c[name] for name in ATTACHMENT_COLUMNS]).where(att.c.message_id.in_(ids)),
+            )
+        )
+        attachments = max(res.rowcount or 0, 0)
+        # архив остаётся в поиске — по локальному индексу терминов
+        await message_search.index_archived(db, ids)
+
+        await db.execute(delete(att).where(att.c.message_id.in_(ids)))
+        await db.execute(delete(msg).where(msg.c.id.in_(ids)))
+
+        ARCHIVE_MOVED.inc(len(ids), table="messages")
+        if attachments:
+            ARCHIVE_MOVED.inc(attachments, table="attachments")
+
+    async def _ensure_partitions(self, oldest: datetime, newest: datetime) -> None:
+        """
+        Отрезает от pmax помесячные партиции до месяца newest включительно.
+        REORGANIZE трогает только строки в pmax — при своевременной нарезке
+        там пусто, операция мгновенная. Это DDL, поэтому своё соединение.
+        """
+        async with engine.connect() as conn:
+            for table in ARCHIVE_TABLES:
+                names = (await conn.execute(
+                    text(
+                        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                        "AND PARTITION_NAME IS NOT NULL"
+                    ),
+                    {"table": table},
+                )).scalars().all()
+                if "pmax" not in names:
+                    continue  # таблицу партиционировали вручную по-другому — не трогаем
+
+                months = sorted(
+                    datetime.strptime(name[1:], "%Y%m") for name in names if name != "pmax"
+                )
+                # новые границы должны идти строго после последней существующей
+                start = _next_month(months[-1]) if months else _month(oldest)
+                if start > newest:
+                    continue
+
+                parts = []
+                month = start
+                while month <= newest:
+                    parts.append(
+                        f"PARTITION p{month:%Y%m} VALUES LESS THAN "
+                        f"(TO_DAYS('{_next_month(month):%Y-%m-%d}'))"
+                    )
+                    month = _next_month(month)
+                parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+                await conn.execute(text(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(parts)})"
+                ))
+                logger.info(f"[ARCHIVE] {table}: added {len(parts) - 1} monthly partitions")
+
+
+message_archiver = MessageArchiver()
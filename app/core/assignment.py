@@ -0,0 +1,476 @@
+# app/core/assignment.py
+"""
+Автоназначение тикетов на наименее загруженного агента.
+
+Нагрузка агента = открытые (не CLOSED) тикеты на нём
+                 + assign_reply_weight × его ответы за assign_reply_window.
+Онлайн — пока у агента открыто хотя бы одно push-соединение дашборда
+(app.core.events): закрыл вкладку — новые тикеты ему не идут.
+Соединения агента могут быть на разных воркерах API: при push_backend =
+"redis" каждый проход отмечает своих онлайн-агентов в общем sorted set
+(assign_presence_key, score — время отметки) и читает отметки остальных.
+Агент онлайн, если он подключён здесь или его отметка моложе
+assign_presence_ttl. Без Redis (один воркер) — только свои соединения.
+
+Для каждой роли — min-heap по нагрузке с ленивой инвалидацией: любое
+изменение нагрузки кладёт в кучу новую запись с новой версией, старые
+выбрасываются, когда всплывают наверх. Выбор агента и учёт назначения —
+O(log n), без сортировки всех агентов на каждый тикет.
+
+Роли (по порядку предпочтения; ADMIN автоматически не назначается):
+• обычный тикет      — SUPPORT, если никого нет — MODERATOR;
+• эскалированный     — MODERATOR, если никого нет — SUPPORT; при эскалации
+  уже назначенного тикета он переходит к модератору, если тот онлайн.
+
+Фоновый проход раз в assign_interval секунд:
+• обменивается отметками присутствия (push_backend = "redis");
+• сверяет нагрузку с БД (закрытия, ручные переназначения, другие воркеры);
+• агент офлайн дольше assign_offline_grace — его открытые тикеты
+  раздаются онлайн-агентам (никого нет — снимаются и ждут). Если Redis
+  недоступен, присутствие на других воркерах неизвестно, и перебалансировка
+  пропускается — иначе ушли бы тикеты агентов, подключённых к другому воркеру;
+• неназначенные тикеты (пришли, когда никого не было) раздаются.
+
+Нагрузка — в памяти процесса. Назначение в БД — условным UPDATE
+(только если исполнитель не сменился): проходы нескольких воркеров и ответ
+агента (он забирает тикет таким же UPDATE) не дают двойного назначения,
+а счётчики догоняет сверка.
+
+При нескольких воркерах без push_backend = "redis" каждый видит только свои
+соединения и раздаст тикеты агента, подключённого к другому воркеру, —
+такая конфигурация требует assign_enabled = false на всех воркерах, кроме
+одного, и подключения дашборда только к нему.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.events import event_hub
+from app.core.metrics import metrics
+from app.models.agent import AgentRole
+from app.models.ticket import Ticket, TicketStatus
+
+logger = logging.getLogger("assignment")
+
+ASSIGNED = metrics.counter(
+    "ticket_assignments_total", "Automatic ticket assignments"
+)
+AGENTS_ONLINE = metrics.gauge(
+    "assign_agents_online", "Agents currently eligible for automatic assignment"
+)
+
+POOLS: Dict[bool, Tuple[AgentRole, ...]] = {
+    False: (AgentRole.SUPPORT, AgentRole.MODERATOR),
+    True: (AgentRole.MODERATOR, AgentRole.SUPPORT),
+}
+ACTIVE_STATUSES = (TicketStatus.OPEN, TicketStatus.IN_PROGRESS, TicketStatus.PENDING)
+
+HeapEntry = Tuple[float, int, int, int]   # (нагрузка, порядок, версия, agent_id)
+
+
+@dataclass
+class AgentLoad:
+    agent_id: int
+    role: AgentRole
+    open_tickets: int = 0
+    replies: Deque[float] = field(default_factory=deque)
+    connections: int = 0
+    shared: bool = False          # есть свежая отметка присутствия в Redis
+    offline_since: Optional[float] = None
+    version: int = 0
+
+    @property
+    def online(self) -> bool:
+        return self.connections > 0 or self.shared
+
+    @property
+    def score(self) -> float:
+        return self.open_tickets + settings.assign_reply_weight * len(self.replies)
+
+    def prune(self, now: float) -> bool:
+        """Выкинуть ответы старше окна; True — нагрузка изменилась."""
+        edge = now - settings.assign_reply_window
+        pruned = False
+        while self.replies and self.replies[0] < edge:
+            self.replies.popleft()
+            pruned = True
+        return pruned
+
+
+class AssignmentEngine:
+    def __init__(self):
+        self._agents: Dict[int, AgentLoad] = {}
+        self._heaps: Dict[AgentRole, List[HeapEntry]] = {role: [] for role in POOLS[False]}
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._last_resync = float("-inf")
+        self._redis = None
+
+        AGENTS_ONLINE.set_function(
+            lambda: sum(1 for a in self._agents.values() if a.online and a.role in self._heaps)
+        )
+
+    # -------------------------------------------------
+    # Куча
+    # -------------------------------------------------
+
+    def _push(self, load: AgentLoad) -> None:
+        """Новая запись с актуальной нагрузкой; прежние записи агента устаревают."""
+        load.version += 1
+        heap = self._heaps.get(load.role)
+        if heap is None or not load.online:
+            return
+        heapq.heappush(heap, (load.score, next(self._seq), load.version, load.agent_id))
+        # устаревших записей слишком много — пересобрать
+        if len(heap) > 4 * len(self._agents) + 16:
+            self._rebuild(load.role)
+
+    def _rebuild(self, role: AgentRole) -> None:
+        heap = [
+            (a.score, next(self._seq), a.version, a.agent_id)
+            for a in self._agents.values()
+            if a.role == role and a.online
+        ]
+        heapq.heapify(heap)
+        self._heaps[role] = heap
+
+    def _peek(self, role: AgentRole) -> Optional[AgentLoad]:
+        """Наименее загруженный онлайн-агент роли."""
+        heap = self._heaps.get(role)
+        while heap:
+            _, _, version, agent_id = heap[0]
+            load = self._agents.get(agent_id)
+            if load is not None and load.version == version and load.online and load.role == role:
+                return load
+            heapq.heappop(heap)
+        return None
+
+    def choose(self, escalated: bool, roles: Optional[Sequence[AgentRole]] = None) -> Optional[int]:
+        """Агент для тикета (нагрузка не меняется — это делает _moved)."""
+        for role in roles or POOLS[escalated]:
+            load = self._peek(role)
+            if load is not None:
+                return load.agent_id
+        return None
+
+    def _moved(self, old: Optional[int], new: Optional[int]) -> None:
+        for agent_id, delta in ((old, -1), (new, 1)):
+            load = self._agents.get(agent_id) if agent_id is not None else None
+            if load is not None:
+                load.open_tickets = max(0, load.open_tickets + delta)
+                self._push(load)
+
+    # -------------------------------------------------
+    # Присутствие и ответы
+    # -------------------------------------------------
+
+    def agent_connected(self, agent) -> None:
+        load = self._agents.get(agent.id)
+        if load is None:
+            load = self._agents[agent.id] = AgentLoad(agent.id, agent.role)
+            # открытые тикеты нового агента подтянет сверка
+            self._last_resync = float("-inf")
+        was_online = load.online
+        load.role = agent.role
+        load.connections += 1
+        load.offline_since = None
+        self._push(load)
+        if not was_online:
+            # появился исполнитель — раздать накопившиеся неназначенные
+            self._wake.set()
+
+    def agent_disconnected(self, agent_id: int) -> None:
+        load = self._agents.get(agent_id)
+        if load is None or load.connections == 0:
+            return
+        load.connections -= 1
+        if not load.online:
+            # из кучи выпадет лениво; тикеты заберём после assign_offline_grace
+            load.offline_since = time.monotonic()
+            load.version += 1
+        # иначе он ещё подключён к другому воркеру (или своя отметка не истекла) —
+        # следующий проход без нашей отметки это уточнит
+
+    def note_reply(self, agent_id: int, claimed: bool = False) -> None:
+        """Ответ агента; claimed — он же взял неназначенный тикет."""
+        load = self._agents.get(agent_id)
+        if load is None:
+            return
+        now = time.monotonic()
+        load.prune(now)
+        load.replies.append(now)
+        if claimed:
+            load.open_tickets += 1
+        self._push(load)
+
+    async def sync_presence(self) -> bool:
+        """
+        Обмен отметками присутствия с другими воркерами.
+        False — Redis недоступен: кто онлайн на других воркерах, неизвестно.
+        """
+        if settings.push_backend != "redis":
+            return True
+        if self._redis is None:
+            from redis.asyncio import Redis
+
+            self._redis = Redis.from_url(settings.redis_url)
+
+        key = settings.assign_presence_key
+        now = time.time()
+        mine = {
+            f"{a.agent_id}:{a.role.value}": now
+            for a in self._agents.values()
+            if a.connections > 0
+        }
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            if mine:
+                pipe.zadd(key, mine)
+            pipe.zremrangebyscore(key, "-inf", now - settings.assign_presence_ttl)
+            pipe.zrange(key, 0, -1)
+            members = (await pipe.execute())[-1]
+        except Exception as e:
+            logger.warning(f"[ASSIGN] presence sync failed: {e!r}")
+            return False
+
+        present: Dict[int, AgentRole] = {}
+        for member in members:
+            if isinstance(member, bytes):
+                member = member.decode()
+            try:
+                agent_id, role = member.split(":", 1)
+                present[int(agent_id)] = AgentRole(role)
+            except ValueError:
+                continue
+
+        for agent_id, role in present.items():
+            if agent_id not in self._agents:
+                self._agents[agent_id] = AgentLoad(agent_id, role)
+                # открытые тикеты агента подтянет сверка
+                self._last_resync = float("-inf")
+
+        for load in self._agents.values():
+            was_online = load.online
+            load.shared = load.agent_id in present
+            if load.shared and load.connections == 0:
+                load.role = present[load.agent_id]
+            if load.online and not was_online:
+                load.offline_since = None
+                self._push(load)
+            elif was_online and not load.online:
+                load.offline_since = time.monotonic()
+                load.version += 1
+        return True
+
+    def snapshot(self) -> List[dict]:
+        return [
+            {
+                "agent_id": a.agent_id,
+                "role": a.role,
+                "online": a.online,
+                "open_tickets": a.open_tickets,
+                "recent_replies": len(a.replies),
+                "score": a.score,
+            }
+            for a in sorted(self._agents.values(), key=lambda a: (not a.online, a.score))
+        ]
+
+    # -------------------------------------------------
+    # Назначение
+    # -------------------------------------------------
+
+    async def assign(self, db: AsyncSession, ticket: Ticket) -> Optional[int]:
+        """
+        Назначает новый или только что эскалированный тикет.
+        Возвращает нового исполнителя или None, если ничего не поменялось.
+        """
+        if not settings.assign_enabled or ticket.status == TicketStatus.CLOSED:
+            return None
+
+        current = ticket.assigned_to
+        if current is None:
+            new = self.choose(ticket.is_escalated)
+        elif ticket.is_escalated:
+            # уже у агента — к модератору, только если тот онлайн
+            load = self._agents.get(current)
+            primary = POOLS[True][0]
+            if load is not None and load.role == primary:
+                return None
+            new = self.choose(True, roles=(primary,))
+        else:
+            return None
+
+        if new is None or new == current:
+            ASSIGNED.inc(result="no_agent")
+            return None
+        if not await self._reassign(db, ticket.id, current, new):
+            return None
+
+        ticket.assigned_to = new
+        ASSIGNED.inc(result="escalated" if current is not None else "assigned")
+        self._publish(ticket.id, ticket.platform, new, reason="escalated" if current else "auto")
+        return new
+
+    async def _reassign(self, db: AsyncSession, ticket_id: int, old: Optional[int], new: Optional[int]) -> bool:
+        """Сменить исполнителя, если он всё ещё old."""
+        res = await db.execute(
+            update(Ticket)
+            .where(
+                Ticket.id == ticket_id,
+                Ticket.assigned_to.is_(None) if old is None else Ticket.assigned_to == old,
+                Ticket.status != TicketStatus.CLOSED,
+            )
+            .values(assigned_to=new)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if res.rowcount != 1:
+            return False
+        self._moved(old, new)
+        return True
+
+    @staticmethod
+    def _publish(ticket_id: int, platform, agent_id: Optional[int], reason: str) -> None:
+        event_hub.publish(
+            "ticket.updated",
+            ticket_id=ticket_id,
+            platform=platform,
+            data={"assigned_to": agent_id, "reason": reason},
+        )
+
+    # -------------------------------------------------
+    # Фоновый проход
+    # -------------------------------------------------
+
+    def start(self) -> None:
+        if not settings.assign_enabled:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ticket-assignment")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[ASSIGN] pass failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.assign_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def tick(self) -> None:
+        presence_known = await self.sync_presence()
+
+        now = time.monotonic()
+        if now - self._last_resync >= settings.assign_resync_interval:
+            await self.resync()
+            self._last_resync = now
+
+        for load in self._agents.values():
+            if load.prune(now):
+                self._push(load)
+
+        for load in list(self._agents.values()):
+            if (
+                    presence_known
+                    and load.offline_since is not None
+                    and now - load.offline_since >= settings.assign_offline_grace
+                    and load.open_tickets > 0
+            ):
+                await self.rebalance(load.agent_id)
+
+        # пачка заполнилась целиком — неназначенные могли остаться
+        while await self.sweep() >= settings.assign_sweep_batch:
+            pass
+
+    async def resync(self) -> None:
+        """Открытые тикеты агентов — из БД."""
+        async with async_session_maker() as db:
+            rows = (await db.execute(
+                select(Ticket.assigned_to, func.count())
+                .where(Ticket.assigned_to.is_not(None), Ticket.status.in_(ACTIVE_STATUSES))
+                .group_by(Ticket.assigned_to)
+            )).all()
+        counts = dict(rows)
+        for load in self._agents.values():
+            actual = counts.get(load.agent_id, 0)
+            if load.open_tickets != actual:
+                load.open_tickets = actual
+                self._push(load)
+
+    async def rebalance(self, agent_id: int) -> int:
+        """Раздать открытые тикеты агента онлайн-агентам; возвращает, сколько перешло."""
+        moved = 0
+        async with async_session_maker() as db:
+            rows = (await db.execute(
+                select(Ticket.id, Ticket.is_escalated, Ticket.platform)
+                .where(Ticket.assigned_to == agent_id, Ticket.status.in_(ACTIVE_STATUSES))
+                .order_by(Ticket.id)
+            )).all()
+            for row in rows:
+                # никого нет — снимаем, тикет дождётся первого, кто появится
+                new = self.choose(row.is_escalated)
+                if await self._reassign(db, row.id, agent_id, new):
+                    moved += 1
+                    ASSIGNED.inc(result="rebalanced" if new else "released")
+                    self._publish(row.id, row.platform, new, reason="rebalance")
+
+        if rows:
+            logger.info("[ASSIGN] agent %s offline: %d of %d tickets moved", agent_id, moved, len(rows))
+        return moved
+
+    async def sweep(self) -> int:
+        """Назначить тикеты, оставшиеся без исполнителя."""
+        if not any(a.online and a.role in self._heaps for a in self._agents.values()):
+            return 0
+
+        assigned = 0
+        async with async_session_maker() as db:
+            rows = (await db.execute(
+                select(Ticket.id, Ticket.is_escalated, Ticket.platform)
+                .where(Ticket.assigned_to.is_(None), Ticket.status.in_(ACTIVE_STATUSES))
+                .order_by(Ticket.is_escalated.desc(), Ticket.created_at, Ticket.id)
+                .limit(settings.assign_sweep_batch)
+            )).all()
+            for row in rows:
+                new = self.choose(row.is_escalated)
+                if new is None:
+                    break
+                if await self._reassign(db, row.id, None, new):
+                    assigned += 1
+                    ASSIGNED.inc(result="assigned")
+                    self._publish(row.id, row.platform, new, reason="auto")
+        return assigned
+
+
+assignment_engine = AssignmentEngine()
@@ -0,0 +1,93 @@
+# app/core/batching.py
+"""
+Микро-батчинг: собираем конкурентные запросы за несколько миллисекунд
+и обрабатываем их одним вызовом, а результаты раздаём обратно ждущим корутинам.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger("batching")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BATCH_SIZE = metrics.histogram(
+    "microbatch_size",
+    "Number of items flushed together by a micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    handler получает список элементов и обязан вернуть список результатов
+    той же длины и в том же порядке.
+
+    Пачка уходит, когда набралось max_batch элементов или с момента первого
+    элемента прошло max_wait секунд — что наступит раньше.
+    """
+
+    def __init__(
+            self,
+            handler: Callable[[List[T]], Awaitable[List[R]]],
+            max_batch: int = 32,
+            max_wait: float = 0.003,
+            name: str = "default",
+    ):
+        self.handler = handler
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.name = name
+
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        self._pending.append((item, fut))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        # те, кто уже отвалился по таймауту, в пачку не идут
+        batch = [(item, fut) for item, fut in batch if not fut.done()]
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch), name=f"microbatch-{self.name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        BATCH_SIZE.observe(len(batch), batcher=self.name)
+
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, fut in batch:
+                fut.cancel()
+            raise
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
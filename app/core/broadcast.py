@@ -0,0 +1,288 @@
+# app/core/broadcast.py
+"""
+Массовые рассылки (вайпы, техработы) по всем пользователям ботов.
+
+• получатели читаются из users серверным курсором (stream + yield_per)
+  по возрастанию id — в памяти только текущая пачка;
+• пачка раздаётся воркерам, каждый шлёт через bot.send_message с
+  приоритетом PRIORITY_BULK: лимиты платформы и паузы по 429 держит
+  планировщик исходящих (app.bot.outbound), а ответы операторов и
+  авто-ответы рассылку обгоняют;
+• после каждой пачки в broadcasts пишется cursor (последний users.id)
+  и счётчики — после рестарта рассылка продолжается с курсора;
+  доставка «хотя бы один раз»: недописанная пачка уйдёт повторно;
+• там же проверяется статус: пауза/отмена из любого процесса API
+  останавливают рассылку на ближайшей границе пачки.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Set
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.outbound import PRIORITY_BULK
+from app.core.config import settings
+from app.core.database import async_session_maker, engine
+from app.core.metrics import metrics
+from app.core.processor import processor
+from app.models.broadcast import Broadcast, BroadcastStatus
+from app.models.user import User, PlatformType
+
+logger = logging.getLogger("broadcast")
+
+BROADCAST_MESSAGES = metrics.counter(
+    "broadcast_messages_total", "Broadcast deliveries by platform and result"
+)
+BROADCAST_RUNNING = metrics.gauge(
+    "broadcasts_running", "Broadcasts currently being sent by this process"
+)
+
+_ACTIVE = (BroadcastStatus.PENDING, BroadcastStatus.RUNNING)
+
+
+@dataclass
+class _Progress:
+    started: float     # monotonic, момент (пере)запуска в этом процессе
+    done_base: int     # sent + failed на момент запуска
+
+
+def _recipients_filter(platform: Optional[PlatformType]):
+    cond = [
+        User.is_banned.is_(False),
+        User.is_blocked.is_(False),
+        User.platform.in_([PlatformType.TELEGRAM, PlatformType.VK]),
+    ]
+    if platform is not None:
+        cond.append(User.platform == platform)
+    return cond
+
+
+class BroadcastService:
+    def __init__(self):
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._progress: Dict[int, _Progress] = {}
+        # возобновлены, пока прежняя задача ещё доходила до границы пачки
+        self._restart: Set[int] = set()
+
+        BROADCAST_RUNNING.set_function(lambda: len(self._tasks))
+
+    # ------------------------------------
+    # УПРАВЛЕНИЕ
+    # ------------------------------------
+
+    async def create(
+            self,
+            db: AsyncSession,
+            *,
+            text: str,
+            platform: Optional[PlatformType] = None,
+            created_by: Optional[int] = None,
+    ) -> Broadcast:
+        total = await db.scalar(
+            select(func.count(User.id)).where(*_recipients_filter(platform))
+        )
+        obj = Broadcast(
+            text=text,
+            platform=platform,
+            status=BroadcastStatus.PENDING,
+            total=total or 0,
+            created_by=created_by,
+        )
+        db.add(obj)
+        await db.commit()
+        await db.refresh(obj)
+
+        self.start(obj.id)
+        return obj
+
+    def start(self, broadcast_id: int) -> None:
+        task = self._tasks.get(broadcast_id)
+        if task is not None and not task.done():
+            # задача может уже останавливаться по паузе — перезапустим после неё
+            self._restart.add(broadcast_id)
+            return
+        self._tasks[broadcast_id] = asyncio.create_task(
+            self._run(broadcast_id), name=f"broadcast-{broadcast_id}"
+        )
+
+    async def set_status(self, db: AsyncSession, broadcast: Broadcast, status: BroadcastStatus) -> Broadcast:
+        """
+        Пауза / отмена / возобновление.
+        Идущую рассылку не прерываем: задача увидит новый статус в
+        _checkpoint и остановится на границе пачки, записав её прогресс, —
+        иначе разосланная половина пачки ушла бы повторно после resume.
+        """
+        broadcast.status = status
+        if status == BroadcastStatus.CANCELLED:
+            broadcast.finished_at = datetime.utcnow()
+        db.add(broadcast)
+        await db.commit()
+        await db.refresh(broadcast)
+
+        if status == BroadcastStatus.RUNNING:
+            self.start(broadcast.id)
+        return broadcast
+
+    async def resume_all(self) -> None:
+        """После рестарта подхватываем незавершённые рассылки."""
+        async with async_session_maker() as db:
+            ids = (await db.scalars(
+                select(Broadcast.id).where(Broadcast.status.in_(_ACTIVE))
+            )).all()
+        for broadcast_id in ids:
+            logger.info(f"[BROADCAST] resuming #{broadcast_id}")
+            self.start(broadcast_id)
+
+    async def stop(self) -> None:
+        # статус остаётся RUNNING — следующий запуск продолжит с курсора
+        for task in list(self._tasks.values()):
+            task.cancel()
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def progress(self, broadcast: Broadcast) -> dict:
+        """Скорость (сообщений/сек) и ETA (сек) — по данным этого процесса."""
+        done = broadcast.sent + broadcast.failed
+        stats = self._progress.get(broadcast.id)
+        rate = eta = None
+        if stats is not None and broadcast.status == BroadcastStatus.RUNNING:
+            elapsed = time.monotonic() - stats.started
+            if elapsed > 0 and done > stats.done_base:
+                rate = (done - stats.done_base) / elapsed
+                eta = max(0, broadcast.total - done) / rate
+        return {
+            "done": done,
+            "rate": round(rate, 2) if rate is not None else None,
+            "eta_seconds": round(eta) if eta is not None else None,
+        }
+
+    # ------------------------------------
+    # ОТПРАВКА
+    # ------------------------------------
+
+    async def _run(self, broadcast_id: int) -> None:
+        try:
+            async with async_session_maker() as db:
+                obj = await db.get(Broadcast, broadcast_id)
+                if obj is None or obj.status not in _ACTIVE:
+                    return
+                obj.status = BroadcastStatus.RUNNING
+                obj.started_at = obj.started_at or datetime.utcnow()
+                await db.commit()
+                text, platform, cursor = obj.text, obj.platform, obj.cursor
+                self._progress[broadcast_id] = _Progress(time.monotonic(), obj.sent + obj.failed)
+
+            logger.info(f"[BROADCAST] #{broadcast_id} running from user id > {cursor}")
+
+            async for chunk in self._recipients(platform, cursor):
+                sent, failed = await self._send_chunk(text, chunk)
+                if not await self._checkpoint(broadcast_id, chunk[-1].id, sent, failed):
+                    logger.info(f"[BROADCAST] #{broadcast_id} stopped by status change")
+                    return
+
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(Broadcast)
+                    .where(Broadcast.id == broadcast_id, Broadcast.status == BroadcastStatus.RUNNING)
+                    .values(status=BroadcastStatus.DONE, finished_at=datetime.utcnow())
+                )
+                await db.commit()
+            logger.info(f"[BROADCAST] #{broadcast_id} done")
+
+        except asyncio.CancelledError:
+            # остановка процесса — перезапуск подхватит resume_all
+            self._restart.discard(broadcast_id)
+            raise
+        except Exception as e:
+            # статус остаётся RUNNING — продолжим с курсора при следующем resume
+            logger.exception(f"[BROADCAST] #{broadcast_id} failed: {e}")
+        finally:
+            # за время остановки рассылку могли уже перезапустить
+            if self._tasks.get(broadcast_id) is asyncio.current_task():
+                del self._tasks[broadcast_id]
+                self._progress.pop(broadcast_id, None)
+                # _run сам проверит статус: завершённую или снова
+                # поставленную на паузу рассылку он не запустит
+                if broadcast_id in self._restart:
+                    self._restart.discard(broadcast_id)
+                    self.start(broadcast_id)
+
+    async def _recipients(self, platform: Optional[PlatformType], cursor: int):
+        """Пачки получателей с id > cursor по возрастанию id."""
+        batch = settings.broadcast_batch_size
+        query = (
+            select(User.id, User.platform, User.platform_id)
+            .where(*_recipients_filter(platform))
+            .order_by(User.id)
+        )
+
+        if engine.dialect.name != "sqlite":
+            # серверный курсор: одна выборка, строки подтягиваются по мере отправки
+            async with async_session_maker() as reader:
+                rows = await reader.stream(
+                    query.where(User.id > cursor).execution_options(yield_per=batch)
+                )
+                async for chunk in rows.partitions():
+                    yield chunk
+            return
+
+        # SQLite не даст сохранить прогресс, пока открыт читающий курсор —
+        # там читаем keyset-страницами
+        while True:
+            async with async_session_maker() as reader:
+                chunk = (await reader.execute(query.where(User.id > cursor).limit(batch))).all()
+            if not chunk:
+                return
+            yield chunk
+            cursor = chunk[-1].id
+
+    async def _checkpoint(self, broadcast_id: int, cursor: int, sent: int, failed: int) -> bool:
+        """Сохраняет прогресс пачки; False — рассылку поставили на паузу или отменили."""
+        async with async_session_maker() as db:
+            await db.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id)
+                .values(
+                    cursor=cursor,
+                    sent=Broadcast.sent + sent,
+                    failed=Broadcast.failed + failed,
+                )
+            )
+            status = await db.scalar(select(Broadcast.status).where(Broadcast.id == broadcast_id))
+            await db.commit()
+        return status == BroadcastStatus.RUNNING
+
+    async def _send_chunk(self, text: str, chunk: Sequence) -> tuple[int, int]:
+        bots = {
+            PlatformType.TELEGRAM: processor.telegram_bot,
+            PlatformType.VK: processor.vk_bot,
+        }
+        pending = iter(chunk)
+        counts = {"sent": 0, "failed": 0}
+
+        async def worker():
+            for row in pending:
+                try:
+                    result = await bots[row.platform].send_message(
+                        row.platform_id, text, priority=PRIORITY_BULK
+                    )
+                    ok = bool(result and result.get("success"))
+                except Exception as e:
+                    logger.warning(f"[BROADCAST] send to user {row.id} failed: {e!r}")
+                    ok = False
+                key = "sent" if ok else "failed"
+                counts[key] += 1
+                BROADCAST_MESSAGES.inc(platform=row.platform.value, result=key)
+
+        # воркеров столько, чтобы планировщик всегда был загружен, но не больше
+        await asyncio.gather(*(worker() for _ in range(min(settings.broadcast_workers, len(chunk)))))
+        return counts["sent"], counts["failed"]
+
+
+broadcast_service = BroadcastService()
@@ -12,6 +12,16 @@ class Settings(BaseSettings):
     mysql_user: str
     mysql_password: str
     mysql_database: str
+    db_auto_migrate: bool = True             # alembic upgrade head при старте приложения
+    database_replica_url: Optional[str] = None  # read-реплика для админки; пусто — всё в primary
+    replica_max_lag: float = 5.0             # сек отставания, после которых чтения идут в primary
+    replica_check_interval: float = 5.0      # сек кэша проверки реплики
+    replica_check_timeout: float = 2.0       # сек на саму проверку
+    db_pool_size: int = 10                   # постоянных соединений в пуле (на движок)
+    db_max_overflow: int = 20                # сверх pool_size при пиках
+    db_pool_timeout: float = 30.0            # сек ждать свободное соединение
+    db_pool_recycle: int = 1800              # сек жизни соединения (< wait_timeout MySQL)
+    db_pool_pre_ping: bool = True            # SELECT 1 на каждый checkout; False — экономит round-trip
 
     # -------------------------
     # Redis
@@ -33,6 +43,10 @@ class Settings(BaseSettings):
     vk_group_id: Optional[int] = None
     vk_secret_key: Optional[str] = None
     vk_confirmation_code: Optional[str] = None
+    vk_http_pool_size: int = 20               # соединений к api.vk.com в пуле
+    vk_http_keepalive: float = 30.0           # сек держим простаивающее соединение
+    vk_http_dns_ttl: int = 300                # сек кэша DNS
+    vk_http_timeout: float = 10.0             # сек на один вызов API
 
     # -------------------------
     # JWT Auth
@@ -61,6 +75,125 @@ class Settings(BaseSettings):
     log_level: str
     log_file: str
 
+    # -------------------------
+    # Knowledge base (FAISS)
+    # -------------------------
+    kb_index_dir: str = "data/kb_index"
+    kb_docs_dir: Optional[str] = None        # *.txt / *.md с правилами
+    kb_flat_max_docs: int = 5_000            # дальше — IVF
+    kb_hnsw_min_docs: int = 100_000          # дальше — HNSW
+    kb_reload_interval: int = 30             # сек между проверками CURRENT
+
+    # -------------------------
+    # NLP worker pool
+    # -------------------------
+    nlp_workers: int = 2                     # 0 → считать inline в event loop
+    nlp_timeout: float = 2.0                 # сек на один вызов, дальше — оператор
+    nlp_batch_max_size: int = 32             # макс. запросов mini-LLM в одной пачке
+    nlp_batch_max_wait_ms: float = 3.0       # сколько ждём добора пачки
+    intent_stages: str = "exact,automaton,fuzzy"   # порядок ступеней классификатора (+ ",embedding")
+
+    # -------------------------
+    # User contexts (Telegram)
+    # -------------------------
+    context_ttl: int = 1800                  # сек без сообщений → контекст выгружается
+    context_operator_ttl: int = 86400        # то же для диалога с оператором
+    context_max_resident: int = 100_000      # больше — выгружаем самых неактивных
+    context_backend: str = "memory"          # memory | redis (общий для нескольких процессов)
+    context_redis_prefix: str = "ctx:"
+
+    # -------------------------
+    # Flood control (per platform)
+    # -------------------------
+    flood_tg_rate: float = 1.25              # сообщений/сек без страйка (1 / 0.8 сек)
+    flood_tg_burst: float = 1.0
+    flood_tg_mute_after: int = 0             # 0 → только предупреждения
+    flood_tg_mute_seconds: float = 20.0
+    flood_vk_rate: float = 0.83              # 1 / 1.2 сек
+    flood_vk_burst: float = 1.0
+    flood_vk_mute_after: int = 4
+    flood_vk_mute_seconds: float = 20.0
+
+    # -------------------------
+    # Outbound send scheduler
+    # -------------------------
+    tg_send_rate: float = 30.0               # сообщений/сек на бота (лимит Telegram)
+    tg_send_per_chat_interval: float = 1.0   # не чаще раза в секунду в один чат
+    vk_send_rate: float = 20.0               # запросов/сек на сообщество
+    vk_send_per_chat_interval: float = 0.34
+    send_max_retries: int = 5                # повторов после 429 / flood control
+
+    # -------------------------
+    # Broadcasts
+    # -------------------------
+    broadcast_batch_size: int = 200          # получателей на пачку (и шаг сохранения прогресса)
+    broadcast_workers: int = 32              # параллельных отправок на пачку
+
+    # -------------------------
+    # Outbox (ответы агентов)
+    # -------------------------
+    outbox_batch_size: int = 50
+    outbox_poll_interval: float = 1.0        # сек между опросами, если никто не разбудил
+    outbox_lease: int = 60                   # сек аренды пачки воркером
+    outbox_max_attempts: int = 5             # дальше — статус ERROR
+    outbox_retry_base: float = 2.0           # пауза перед повтором: base * 2^(попытка-1)
+
+    # -------------------------
+    # users.last_active (write-behind)
+    # -------------------------
+    last_active_flush_interval: float = 30.0  # сек между сбросами в БД
+    last_active_flush_batch: int = 500        # пользователей на один UPDATE
+
+    # -------------------------
+    # Архив переписки (messages → messages_archive)
+    # -------------------------
+    archive_after_days: int = 90             # переносить тикеты, закрытые раньше; 0 — выключено
+    archive_batch_size: int = 500            # сообщений на одну транзакцию переноса
+    archive_batch_pause: float = 0.5         # сек между пачками
+    archive_interval: float = 3600.0         # сек между проходами
+
+    # -------------------------
+    # Поиск по переписке
+    # -------------------------
+    search_index_interval: float = 5.0       # сек между дочитками локального индекса (не MySQL)
+    search_index_batch: int = 1000           # сообщений за одну дочитку
+
+    # -------------------------
+    # Выгрузки (CSV / NDJSON)
+    # -------------------------
+    export_yield_per: int = 1000             # строк на пачку серверного курсора (и на кусок ответа)
+
+    # -------------------------
+    # Статистика (ticket_rollups)
+    # -------------------------
+    stats_rollup_interval: float = 60.0      # сек между пересчётами свежих часов
+    stats_rollup_overlap: int = 1            # часов до последнего посчитанного, которые пересчитываются ещё раз
+    stats_rollup_chunk_hours: int = 24       # часов на транзакцию при первичном заполнении
+
+    # -------------------------
+    # Push-события дашборда (WebSocket / SSE)
+    # -------------------------
+    push_buffer_size: int = 256              # неотправленных событий на соединение; больше — клиент медленный, отключаем
+    push_max_topics: int = 50                # подписок на одно соединение
+    push_heartbeat: float = 15.0             # сек тишины до ping (заодно выявляет мёртвые соединения)
+    push_send_timeout: float = 10.0          # сек на отправку одного события в WebSocket
+    push_backend: str = "memory"             # memory | redis (несколько воркеров API)
+    push_redis_channel: str = "push:events"
+    push_redis_buffer: int = 10_000          # событий в очереди на публикацию в Redis
+
+    # -------------------------
+    # Автоназначение тикетов
+    # -------------------------
+    assign_enabled: bool = True
+    assign_interval: float = 10.0            # сек между фоновыми проходами (сверка, перебалансировка, неназначенные)
+    assign_resync_interval: float = 60.0     # сек между сверками нагрузки с БД
+    assign_reply_window: float = 900.0       # сек: ответы за это окно считаются текущей нагрузкой
+    assign_reply_weight: float = 0.2         # вес одного недавнего ответа относительно открытого тикета
+    assign_offline_grace: float = 120.0      # сек без соединений, после которых тикеты агента раздаются
+    assign_sweep_batch: int = 100            # неназначенных тикетов за один запрос
+    assign_presence_key: str = "assign:presence"  # push_backend = redis: общий список онлайн-агентов всех воркеров
+    assign_presence_ttl: float = 30.0        # сек: отметка присутствия от воркера живёт столько (больше assign_interval)
+
     # -------------------------
     # Pydantic Settings
     # -------------------------
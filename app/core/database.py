@@ -1,10 +1,19 @@
 # app/core/database.py
+import asyncio
 import logging
-from typing import AsyncGenerator
+import time
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 
 from app.core.config import settings
+from app.core.db_pool import engine_options, instrument
+from app.core.metrics import metrics
 from app.models.base import Base
 
 logger = logging.getLogger(__name__)
@@ -14,8 +23,9 @@ engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     future=True,
-    pool_pre_ping=True,
+    **engine_options(settings.database_url),
 )
+instrument(engine, "primary")
 
 # Фабрика сессий
 async_session_maker = async_sessionmaker(
@@ -25,11 +35,148 @@ async_session_maker = async_sessionmaker(
 )
 
 
+# =====================================================
+# Read-реплика (опционально, DATABASE_REPLICA_URL)
+# =====================================================
+# Тяжёлые чтения админки (списки, статистика, поиск) уходят на реплику,
+# чтобы не конкурировать за пул и буферы с приёмом сообщений. Реплика
+# используется, только пока она отвечает и отстаёт не больше
+# replica_max_lag секунд — иначе чтения молча идут в primary.
+
+read_engine: Optional[AsyncEngine] = (
+    create_async_engine(
+        settings.database_replica_url,
+        echo=settings.debug,
+        future=True,
+        **engine_options(settings.database_replica_url, "replica"),
+    )
+    if settings.database_replica_url
+    else None
+)
+if read_engine is not None:
+    instrument(read_engine, "replica")
+
+read_session_maker = (
+    async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+    if read_engine is not None
+    else async_session_maker
+)
+
+REPLICA_LAG = metrics.gauge(
+    "db_replica_lag_seconds", "Replication lag of the read replica at the last check (-1 = unavailable)"
+)
+REPLICA_READS = metrics.counter(
+    "db_read_sessions_total", "Read-only sessions by target database"
+)
+
+
+class ReplicaRouter:
+    """Кэширует состояние реплики на replica_check_interval секунд."""
+
+    def __init__(self, engine: Optional[AsyncEngine]):
+        self.engine = engine
+        self.lag: Optional[float] = None
+        self._usable = False
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+        REPLICA_LAG.set_function(lambda: -1 if self.lag is None else self.lag)
+
+    async def _measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if conn.dialect.name != "mysql":
+                # у SQLite нет репликации: вторая база считается актуальной,
+                # проверяем только, что она открывается
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+
+            try:
+                row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+            except DBAPIError:
+                # MySQL < 8.0.22 / MariaDB
+                row = (await conn.execute(text("SHOW SLAVE STATUS"))).mappings().first()
+            if row is None:
+                # инстанс не настроен как реплика (например, второй локальный MySQL)
+                return 0.0
+            lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+            if lag is None:
+                raise RuntimeError("replication SQL thread is not running")
+            return float(lag)
+
+    async def is_usable(self) -> bool:
+        if self.engine is None:
+            return False
+        if time.monotonic() - self._checked_at < settings.replica_check_interval:
+            return self._usable
+
+        async with self._lock:
+            if time.monotonic() - self._checked_at < settings.replica_check_interval:
+                return self._usable
+            try:
+                self.lag = await asyncio.wait_for(
+                    self._measure_lag(), timeout=settings.replica_check_timeout
+                )
+                usable = self.lag <= settings.replica_max_lag
+                if not usable:
+                    logger.warning(
+                        f"[DB] replica lag {self.lag:.1f}s > {settings.replica_max_lag}s → reads go to primary"
+                    )
+            except Exception as e:
+                self.lag = None
+                usable = False
+                logger.warning(f"[DB] replica unavailable ({e!r}) → reads go to primary")
+            if usable and not self._usable:
+                logger.info("[DB] reads routed to replica")
+            self._usable = usable
+            self._checked_at = time.monotonic()
+        return self._usable
+
+    def mark_down(self) -> None:
+        """Ошибка на реплике посреди запроса — не ждать следующей проверки."""
+        self._usable = False
+        self.lag = None
+        self._checked_at = time.monotonic()
+
+
+replica = ReplicaRouter(read_engine)
+
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# таблицы ревизии 0001 — то, что создавал старый create_all
+BASELINE_TABLES = {"agents", "users", "tickets", "messages", "attachments"}
+
+
+def _upgrade_schema(connection) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.attributes["connection"] = connection
+    cfg.attributes["configure_logger"] = False
+
+    # база от старого init_models (create_all) без alembic_version:
+    # полная её схема — это ревизия 0001, дальше идём обычными миграциями;
+    # в неполной 0001 досоздаёт недостающие таблицы, поэтому её не штампуем
+    tables = set(inspect(connection).get_table_names())
+    if "alembic_version" not in tables and tables & BASELINE_TABLES:
+        missing = BASELINE_TABLES - tables
+        if missing:
+            logger.info(f"Partial legacy schema, creating missing tables: {sorted(missing)}")
+        else:
+            logger.info("Legacy schema without alembic_version → stamping 0001")
+            command.stamp(cfg, "0001")
+
+    command.upgrade(cfg, "head")
+
+
 async def init_models() -> None:
-    """Создание таблиц (вызывается в on_startup)."""
+    """Миграции схемы до head (вызывается в on_startup)."""
+    if not settings.db_auto_migrate:
+        return
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("✅ DB tables ensured.")
+        await conn.run_sync(_upgrade_schema)
+    logger.info("✅ DB schema migrated.")
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -40,3 +187,31 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 # Для старого кода, который импортирует get_db
 get_db = get_session
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия только для чтения: реплика, если она настроена, жива и не
+    отстала, иначе primary. Писать через эту сессию нельзя.
+    """
+    on_replica = await replica.is_usable()
+    maker = read_session_maker if on_replica else async_session_maker
+    REPLICA_READS.inc(target="replica" if on_replica else "primary")
+
+    async with maker() as session:
+        try:
+            yield session
+        except DBAPIError:
+            if on_replica:
+                replica.mark_down()
+            raise
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency для read-only эндпоинтов (см. read_session)."""
+    async with read_session() as session:
+        yield session
+
+
+get_read_db = get_read_session
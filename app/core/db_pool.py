@@ -0,0 +1,123 @@
+# app/core/db_pool.py
+"""
+Пул соединений к БД: параметры из Settings и метрики.
+
+• db_pool_size / db_max_overflow / db_pool_timeout / db_pool_recycle /
+  db_pool_pre_ping — настраиваются через .env;
+• pre-ping — это лишний SELECT 1 на каждый checkout; если соединения
+  и так переоткрываются через db_pool_recycle раньше wait_timeout MySQL,
+  его можно выключить;
+• метрики снимаются событиями пула (checkout / checkin / connect /
+  invalidate), время ожидания соединения — вокруг получения из очереди:
+  по db_pool_wait_seconds и db_pool_overflow видно, что упираемся в пул.
+"""
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+POOL_CHECKED_OUT = metrics.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool"
+)
+POOL_SIZE = metrics.gauge(
+    "db_pool_size", "Configured pool size (persistent connections)"
+)
+POOL_OVERFLOW = metrics.gauge(
+    "db_pool_overflow", "Connections opened above pool_size right now"
+)
+POOL_WAIT = metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a connection from the pool"
+)
+POOL_TIMEOUTS = metrics.counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout"
+)
+POOL_CHECKOUTS = metrics.counter(
+    "db_pool_checkouts_total", "Connection checkouts"
+)
+POOL_CONNECTS = metrics.counter(
+    "db_pool_connections_opened_total", "New DBAPI connections opened by the pool"
+)
+POOL_INVALIDATIONS = metrics.counter(
+    "db_pool_invalidations_total", "Connections discarded as broken"
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который меряет ожидание свободного соединения.
+    Метка engine — атрибут класса: dispose() пересоздаёт пул через
+    self.__class__, и атрибут экземпляра на новом пуле потерялся бы.
+    Свой подкласс на каждый движок даёт pool_class().
+    """
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.metrics_name)
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started, engine=self.metrics_name)
+
+
+def pool_class(name: str) -> type:
+    """Подкласс InstrumentedQueuePool с меткой engine=name."""
+    return type(f"InstrumentedQueuePool[{name}]", (InstrumentedQueuePool,), {"metrics_name": name})
+
+
+def engine_options(url: str, name: str = "primary") -> Dict[str, Any]:
+    """kwargs пула для create_async_engine; name — метка engine в метриках."""
+    opts: Dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if url.startswith("sqlite"):
+        # у aiosqlite свой пул (NullPool/StaticPool) — размеры к нему неприменимы
+        return opts
+    opts.update(
+        poolclass=pool_class(name),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return opts
+
+
+def instrument(engine: AsyncEngine, name: str) -> None:
+    """Вешает метрики на пул движка; name — метка engine (primary / replica)."""
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+
+    # выданные соединения считаем по событиям — работает с любым классом пула
+    checked_out = [0]
+    POOL_CHECKED_OUT.set_function(lambda: checked_out[0], engine=name)
+
+    # size()/overflow() есть только у QueuePool; dispose() пересоздаёт пул
+    # (события переносятся), поэтому берём текущий через движок
+    if hasattr(pool, "overflow"):
+        POOL_SIZE.set_function(lambda: sync_engine.pool.size(), engine=name)
+        POOL_OVERFLOW.set_function(lambda: max(0, sync_engine.pool.overflow()), engine=name)
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, record):
+        POOL_CONNECTS.inc(engine=name)
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        checked_out[0] += 1
+        POOL_CHECKOUTS.inc(engine=name)
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        checked_out[0] = max(0, checked_out[0] - 1)
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        POOL_INVALIDATIONS.inc(engine=name)
@@ -0,0 +1,299 @@
+# app/core/events.py
+"""
+Push-события для дашборда агентов (WebSocket / SSE) вместо опроса REST.
+
+Темы подписки:
+• ticket:<id>        — всё по одному тикету (сообщения, статусы, назначение);
+• queue              — события всех тикетов (очередь целиком);
+• queue:<platform>   — то же для одной платформы (queue:TELEGRAM, queue:VK).
+
+publish() синхронный и не ждёт сеть: событие один раз кодируется в JSON
+и раскладывается по очередям подписчиков. Очередь у каждого соединения
+ограничена push_buffer_size; если клиент не успевает её разбирать
+(медленная сеть, зависшая вкладка), он считается медленным: накопленное
+выбрасывается, соединение закрывается, клиент переподключается и
+перечитывает состояние через REST. Так один медленный агент не держит
+память процесса и не тормозит остальных.
+
+push_backend = "redis" — несколько воркеров API: события дополнительно
+уходят в канал Redis, каждый процесс раздаёт своим подписчикам чужие
+события (свои отсекаются по origin).
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.user import PlatformType
+
+logger = logging.getLogger("events")
+
+PUSH_SUBSCRIBERS = metrics.gauge(
+    "push_subscribers", "Open push connections (WebSocket + SSE)"
+)
+PUSH_EVENTS = metrics.counter(
+    "push_events_total", "Events published to the push hub"
+)
+PUSH_DISCONNECTS = metrics.counter(
+    "push_slow_disconnects_total", "Push connections dropped because the client fell behind"
+)
+PUSH_REDIS_DROPPED = metrics.counter(
+    "push_redis_dropped_total", "Events not forwarded to Redis because the publish buffer was full"
+)
+
+PLATFORMS = {p.value for p in PlatformType}
+REDIS_BATCH = 100        # событий на один pipeline PUBLISH
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+def valid_topic(topic: str) -> bool:
+    kind, _, arg = topic.partition(":")
+    if kind == "queue":
+        return arg == "" or arg in PLATFORMS
+    if kind == "ticket":
+        return arg.isdigit()
+    return False
+
+
+def event_topics(ticket_id: int, platform: Optional[str]) -> List[str]:
+    topics = ["queue", f"ticket:{ticket_id}"]
+    if platform:
+        topics.append(f"queue:{platform}")
+    return topics
+
+
+class Subscription:
+    """Одно соединение: набор тем и ограниченный буфер неотправленных событий."""
+
+    def __init__(self, topics: Iterable[str], maxsize: int):
+        self.topics: Set[str] = set(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def offer(self, payload: str) -> bool:
+        """Положить событие в буфер; False — буфер полон (медленный клиент)."""
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # накопленное клиенту уже не нужно — он перечитает состояние;
+        # None будит отправителя, чтобы тот закрыл соединение
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout: float) -> Optional[str]:
+        """Следующее событие; "" — за timeout ничего не пришло, None — подписка закрыта."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return ""
+
+
+class EventHub:
+    def __init__(self):
+        self._by_topic: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._subs: Set[Subscription] = set()
+        self.origin = uuid.uuid4().hex[:12]
+
+        self._redis = None
+        self._pubsub = None
+        self._outgoing: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        PUSH_SUBSCRIBERS.set_function(lambda: len(self._subs))
+
+    # -------------------------------------------------
+    # Подписки
+    # -------------------------------------------------
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        sub = Subscription((), settings.push_buffer_size)
+        self._subs.add(sub)
+        self.update(sub, add=topics)
+        return sub
+
+    def update(self, sub: Subscription, *, add: Iterable[str] = (), remove: Iterable[str] = ()) -> None:
+        for topic in remove:
+            sub.topics.discard(topic)
+            self._discard(topic, sub)
+        for topic in add:
+            if len(sub.topics) >= settings.push_max_topics and topic not in sub.topics:
+                break
+            sub.topics.add(topic)
+            self._by_topic[topic].add(sub)
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subs.discard(sub)
+        for topic in sub.topics:
+            self._discard(topic, sub)
+        sub.close()
+
+    def _discard(self, topic: str, sub: Subscription) -> None:
+        subs = self._by_topic.get(topic)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._by_topic[topic]
+
+    # -------------------------------------------------
+    # Публикация
+    # -------------------------------------------------
+
+    def publish(
+            self,
+            event_type: str,
+            *,
+            ticket_id: int,
+            platform: Optional[Any] = None,
+            data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Событие по тикету — подписчикам тикета и очереди. Не блокирует."""
+        if isinstance(platform, Enum):
+            platform = platform.value
+        payload = json.dumps(
+            {
+                "type": event_type,
+                "ticket_id": ticket_id,
+                "platform": platform,
+                "ts": datetime.utcnow(),
+                "data": data or {},
+            },
+            ensure_ascii=False,
+            default=_json_default,
+        )
+        topics = event_topics(ticket_id, platform)
+        PUSH_EVENTS.inc(type=event_type)
+
+        self._deliver(topics, payload)
+
+        if self._outgoing is not None:
+            try:
+                self._outgoing.put_nowait(f"{self.origin}\n{' '.join(topics)}\n{payload}")
+            except asyncio.QueueFull:
+                PUSH_REDIS_DROPPED.inc()
+
+    def _deliver(self, topics: List[str], payload: str) -> None:
+        # подписчик на несколько подходящих тем получает событие один раз
+        targets: Set[Subscription] = set()
+        for topic in topics:
+            subs = self._by_topic.get(topic)
+            if subs:
+                targets.update(subs)
+
+        for sub in [sub for sub in targets if not sub.offer(payload)]:
+            self.drop_slow(sub)
+
+    def drop_slow(self, sub: Subscription) -> None:
+        """Клиент не успевает: отписать, соединение закроет его отправитель."""
+        if sub.closed:
+            return
+        logger.info("[PUSH] slow consumer dropped (topics=%s)", sorted(sub.topics))
+        PUSH_DISCONNECTS.inc()
+        self.unsubscribe(sub)
+
+    # -------------------------------------------------
+    # Redis fan-out
+    # -------------------------------------------------
+
+    async def start(self) -> None:
+        if settings.push_backend != "redis" or self._redis is not None:
+            return
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(settings.redis_url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(settings.push_redis_channel)
+        self._outgoing = asyncio.Queue(settings.push_redis_buffer)
+        self._tasks = [
+            asyncio.create_task(self._forward(), name="push-redis-publish"),
+            asyncio.create_task(self._listen(), name="push-redis-listen"),
+        ]
+        logger.info("[PUSH] Redis fan-out on %s (origin=%s)", settings.push_redis_channel, self.origin)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        self._outgoing = None
+
+        for sub in list(self._subs):
+            self.unsubscribe(sub)
+
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+    async def _forward(self) -> None:
+        while True:
+            batch = [await self._outgoing.get()]
+            while len(batch) < REDIS_BATCH and not self._outgoing.empty():
+                batch.append(self._outgoing.get_nowait())
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for message in batch:
+                    pipe.publish(settings.push_redis_channel, message)
+                await pipe.execute()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # локальные подписчики событие уже получили, другие воркеры — нет
+                logger.warning(f"[PUSH] Redis publish failed, {len(batch)} events lost: {e!r}")
+                PUSH_REDIS_DROPPED.inc(len(batch))
+                await asyncio.sleep(1.0)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    data = message.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    if not isinstance(data, str):
+                        continue
+                    origin, topics, payload = data.split("\n", 2)
+                    if origin != self.origin:
+                        self._deliver(topics.split(" "), payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[PUSH] Redis listener failed: {e!r}")
+                await asyncio.sleep(1.0)
+
+
+event_hub = EventHub()
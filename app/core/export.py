@@ -0,0 +1,166 @@
+# app/core/export.py
+"""
+Потоковая выгрузка тикетов и сообщений в CSV / NDJSON (опционально gzip).
+
+Строки читаются серверным курсором (stream + yield_per): в памяти
+одновременно только одна пачка из export_yield_per строк, сколько бы их
+ни было всего. Каждая пачка сразу кодируется и уходит в ответ, поэтому
+первый байт клиент получает сразу, а не после чтения всей таблицы.
+Колонки — плоские значения, без ORM-объектов. Сообщения выгружаются
+из messages и messages_archive одним UNION ALL.
+"""
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import Select, select, union_all
+
+from app.core.config import settings
+from app.core.database import read_session
+from app.core.metrics import metrics
+from app.models.archive import ArchivedMessage
+from app.models.message import Message
+from app.models.ticket import Ticket, TicketCategory
+from app.models.user import PlatformType
+
+EXPORT_ROWS = metrics.counter(
+    "export_rows_total", "Rows written by streaming exports"
+)
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@dataclass
+class ExportFilters:
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    platform: Optional[PlatformType] = None
+    category: Optional[TicketCategory] = None
+
+
+TICKET_COLUMNS = [
+    Ticket.id, Ticket.user_id, Ticket.platform, Ticket.status, Ticket.priority,
+    Ticket.category, Ticket.title, Ticket.assigned_to, Ticket.is_escalated,
+    Ticket.created_at, Ticket.first_response_at, Ticket.closed_at,
+]
+
+MESSAGE_FIELDS = [
+    "id", "ticket_id", "user_id", "direction", "status", "is_ai_response",
+    "confidence_score", "created_at", "content",
+]
+
+
+def _tickets_query(f: ExportFilters) -> Select:
+    query = select(*TICKET_COLUMNS)
+    if f.date_from is not None:
+        query = query.where(Ticket.created_at >= f.date_from)
+    if f.date_to is not None:
+        query = query.where(Ticket.created_at < f.date_to)
+    if f.platform is not None:
+        query = query.where(Ticket.platform == f.platform)
+    if f.category is not None:
+        query = query.where(Ticket.category == f.category)
+    return query.order_by(Ticket.id)
+
+
+def _messages_part(model, f: ExportFilters) -> Select:
+    # платформа и категория — тикета, диапазон дат — самого сообщения
+    columns = [getattr(model, name) for name in MESSAGE_FIELDS]
+    query = (
+        select(*columns[:3], Ticket.platform, Ticket.category, *columns[3:])
+        .join(Ticket, Ticket.id == model.ticket_id)
+    )
+    if f.date_from is not None:
+        query = query.where(model.created_at >= f.date_from)
+    if f.date_to is not None:
+        query = query.where(model.created_at < f.date_to)
+    if f.platform is not None:
+        query = query.where(Ticket.platform == f.platform)
+    if f.category is not None:
+        query = query.where(Ticket.category == f.category)
+    return query
+
+
+def _messages_query(f: ExportFilters) -> Select:
+    # сообщения давно закрытых тикетов лежат в messages_archive (id те же)
+    both = union_all(_messages_part(Message, f), _messages_part(ArchivedMessage, f)).subquery()
+    return select(both).order_by(both.c.id)
+
+
+QUERIES = {
+    "tickets": _tickets_query,
+    "messages": _messages_query,
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(header: List[str], rows: List[Dict[str, Any]], with_header: bool) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if with_header:
+        writer.writerow(header)
+    for row in rows:
+        writer.writerow(["" if row[k] is None else row[k] for k in header])
+    return buf.getvalue()
+
+
+def _encode_ndjson(rows: List[Dict[str, Any]]) -> str:
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def export_stream(
+        kind: str,
+        fmt: str,
+        filters: ExportFilters,
+        *,
+        gzip: bool = False,
+) -> AsyncIterator[bytes]:
+    """Куски ответа: одна пачка строк → один кусок."""
+    query = QUERIES[kind](filters)
+    header = [c.name for c in query.selected_columns]
+    # gzip-контейнер (wbits=31), чтобы файл открывался обычным gunzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def out(text_: str) -> bytes:
+        data = text_.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    # Excel без BOM открывает UTF-8 CSV как cp1251
+    first = "\ufeff" if fmt == "csv" else ""
+    if fmt == "csv":
+        first += _encode_csv(header, [], with_header=True)
+    chunk = out(first)
+    if chunk:
+        yield chunk
+
+    async with read_session() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.export_yield_per))
+        async for partition in result.partitions():
+            rows = [{k: _plain(v) for k, v in zip(header, row)} for row in partition]
+            text_ = (
+                _encode_csv(header, rows, with_header=False)
+                if fmt == "csv"
+                else _encode_ndjson(rows)
+            )
+            EXPORT_ROWS.inc(len(rows), kind=kind, format=fmt)
+            chunk = out(text_)
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
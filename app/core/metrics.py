@@ -0,0 +1,172 @@
+# app/core/metrics.py
+"""
+Минимальный реестр метрик в формате Prometheus (text exposition 0.0.4).
+Без внешних зависимостей: счётчики, гауги (в т.ч. вычисляемые при скрейпе)
+и гистограммы. Отдаётся через GET /metrics.
+"""
+import abc
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.doc = doc
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Строки сэмплов без HELP/TYPE."""
+
+    def render(self) -> str:
+        head = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(head + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str):
+        super().__init__(name, doc)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str):
+        super().__init__(name, doc)
+        self._values: Dict[LabelKey, float] = {}
+        self._callbacks: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels) -> None:
+        """Значение считается в момент скрейпа (размер пула, кол-во контекстов…)."""
+        self._callbacks[_key(labels)] = fn
+
+    def value(self, **labels) -> float:
+        key = _key(labels)
+        if key in self._callbacks:
+            return float(self._callbacks[key]())
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> List[str]:
+        out = [f"{self.name}{_fmt_labels(k)} {v}" for k, v in self._values.items()]
+        for k, fn in self._callbacks.items():
+            try:
+                out.append(f"{self.name}{_fmt_labels(k)} {float(fn())}")
+            except Exception:
+                continue
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [counts per bucket..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = row
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def count(self, **labels) -> float:
+        row = self._values.get(_key(labels))
+        return row[-2] if row else 0.0
+
+    def sum(self, **labels) -> float:
+        row = self._values.get(_key(labels))
+        return row[-1] if row else 0.0
+
+    def samples(self) -> List[str]:
+        out = []
+        for k, row in self._values.items():
+            for i, bound in enumerate(self.buckets):
+                out.append(f"{self.name}_bucket{_fmt_labels(k, ('le', repr(bound)))} {row[i]}")
+            out.append(f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {row[-2]}")
+            out.append(f"{self.name}_count{_fmt_labels(k)} {row[-2]}")
+            out.append(f"{self.name}_sum{_fmt_labels(k)} {row[-1]}")
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, doc: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, doc, **kwargs)
+            self._metrics[name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str) -> Counter:
+        return self._get_or_create(Counter, name, doc)
+
+    def gauge(self, name: str, doc: str) -> Gauge:
+        return self._get_or_create(Gauge, name, doc)
+
+    def histogram(self, name: str, doc: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, doc, buckets=buckets)
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+# Глобальный реестр
+metrics = MetricsRegistry()
@@ -0,0 +1,188 @@
+# app/core/outbox.py
+"""
+Outbox исходящих сообщений (ответы агентов из админки).
+
+HTTP-запрос только пишет OUTGOING Message со статусом PENDING в той же
+транзакции, что и изменение тикета, и будит воркер. Воркер:
+
+• забирает пачку PENDING, у которых подошло next_attempt_at, и «арендует»
+  её — сдвигает next_attempt_at на outbox_lease секунд (на MySQL под
+  FOR UPDATE SKIP LOCKED, так что несколько процессов не делят строки);
+  если процесс умер посреди отправки, аренда истечёт и строку подберут;
+• отправляет через ботов платформ (лимиты держит app.bot.outbound);
+• SENT + platform_message_id при успехе, при ошибке — повтор с
+  экспоненциальной паузой, после outbox_max_attempts — ERROR.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.outbound import PRIORITY_OPERATOR
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.events import event_hub
+from app.core.metrics import metrics
+from app.core.processor import processor
+from app.models.message import Message, MessageDirection, MessageStatus
+from app.models.user import User, PlatformType
+
+logger = logging.getLogger("outbox")
+
+OUTBOX_DELIVERED = metrics.counter(
+    "outbox_messages_total", "Outbox delivery attempts by result"
+)
+OUTBOX_LAG = metrics.histogram(
+    "outbox_delivery_lag_seconds", "Time from outbox write to successful delivery"
+)
+
+
+class OutboxWorker:
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="outbox-worker")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """В outbox что-то записали — не ждать следующего опроса."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ------------------------------------
+    # ЦИКЛ
+    # ------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delivered = await self.deliver_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[OUTBOX] batch failed: {e}")
+                delivered = 0
+
+            # полная пачка — сразу за следующей
+            if delivered >= settings.outbox_batch_size:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.outbox_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, db: AsyncSession) -> List[tuple]:
+        now = datetime.utcnow()
+        rows = (await db.execute(
+            select(Message.id, Message.ticket_id, Message.content, Message.send_attempts,
+                   Message.created_at, User.platform, User.platform_id)
+            .join(User, User.id == Message.user_id)
+            .where(
+                Message.direction == MessageDirection.OUTGOING,
+                Message.status == MessageStatus.PENDING,
+                or_(Message.next_attempt_at.is_(None), Message.next_attempt_at <= now),
+            )
+            .order_by(Message.id)
+            .limit(settings.outbox_batch_size)
+            .with_for_update(skip_locked=True, of=Message)
+        )).all()
+
+        if rows:
+            await db.execute(
+                update(Message)
+                .where(Message.id.in_([r.id for r in rows]))
+                .values(next_attempt_at=now + timedelta(seconds=settings.outbox_lease))
+            )
+        await db.commit()
+        return rows
+
+    async def deliver_batch(self) -> int:
+        """Одна пачка: аренда → отправка → запись статусов. Возвращает размер пачки."""
+        async with async_session_maker() as db:
+            rows = await self._claim(db)
+        if not rows:
+            return 0
+
+        bots = {
+            PlatformType.TELEGRAM: processor.telegram_bot,
+            PlatformType.VK: processor.vk_bot,
+        }
+
+        async def send(row) -> dict:
+            bot = bots.get(row.platform)
+            if bot is None:
+                return {"success": False, "error": f"no bot for {row.platform.value}"}
+            try:
+                return await bot.send_message(row.platform_id, row.content or "", priority=PRIORITY_OPERATOR)
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+
+        results = await asyncio.gather(*(send(row) for row in rows))
+
+        now = datetime.utcnow()
+        changes: List[dict] = []
+        counts: Dict[str, int] = defaultdict(int)
+
+        for row, result in zip(rows, results):
+            attempts = row.send_attempts + 1
+            change = {"id": row.id, "send_attempts": attempts, "next_attempt_at": None}
+
+            if result.get("success"):
+                change["status"] = MessageStatus.SENT
+                message_id = result.get("message_id")
+                change["platform_message_id"] = None if message_id is None else str(message_id)
+                OUTBOX_LAG.observe((now - row.created_at).total_seconds())
+                counts["sent"] += 1
+            else:
+                logger.warning(f"[OUTBOX] message {row.id} attempt {attempts} failed: {result.get('error')}")
+                change["platform_message_id"] = None
+                if attempts >= settings.outbox_max_attempts:
+                    change["status"] = MessageStatus.ERROR
+                    counts["error"] += 1
+                else:
+                    change["status"] = MessageStatus.PENDING
+                    change["next_attempt_at"] = now + timedelta(
+                        seconds=settings.outbox_retry_base * 2 ** (attempts - 1)
+                    )
+                    counts["retry"] += 1
+            changes.append(change)
+
+        # bulk UPDATE по первичному ключу — один executemany на пачку
+        async with async_session_maker() as db:
+            await db.execute(update(Message), changes)
+            await db.commit()
+
+        for result, n in counts.items():
+            OUTBOX_DELIVERED.inc(n, result=result)
+
+        # повтор (PENDING → PENDING) дашборду не интересен
+        for row, change in zip(rows, changes):
+            if change["status"] != MessageStatus.PENDING and row.ticket_id is not None:
+                event_hub.publish(
+                    "message.status",
+                    ticket_id=row.ticket_id,
+                    platform=row.platform,
+                    data={"id": row.id, "status": change["status"]},
+                )
+        return len(rows)
+
+
+outbox_worker = OutboxWorker()
@@ -1,13 +1,19 @@
 # app/core/processor.py
 import asyncio
 import logging
+from datetime import datetime
 from typing import Optional, Tuple, List
 
 from app.core.config import settings
 from app.core.database import async_session_maker
+from app.core.activity import activity_buffer
+from app.core.assignment import assignment_engine
+from app.core.events import event_hub
 
 from app.bot.telegram_bot import TelegramBot
 from app.bot.vk_bot import VKBot
+from app.bot.kb_index import knowledge_base, collect_documents, build_index
+from app.bot.nlp_service import nlp_service
 
 from app.models.user import PlatformType
 from app.schemas.message import MessageCreate, MessageDirection
@@ -38,6 +44,7 @@ class MessageProcessor:
 
         self._tg_task: Optional[asyncio.Task] = None
         self._vk_task: Optional[asyncio.Task] = None
+        self._kb_task: Optional[asyncio.Task] = None
         self._running: bool = False
 
     # ======================================================
@@ -50,6 +57,17 @@ class MessageProcessor:
             return
 
         self._running = True
+
+        await self._start_knowledge_base()
+        nlp_service.start(
+            workers=settings.nlp_workers,
+            timeout=settings.nlp_timeout,
+            kb_index_dir=settings.kb_index_dir,
+            batch_max_size=settings.nlp_batch_max_size,
+            batch_max_wait=settings.nlp_batch_max_wait_ms / 1000,
+            intent_stages=settings.intent_stages,
+        )
+
         logger.info("Starting bots...")
 
         # Telegram
@@ -89,13 +107,41 @@ class MessageProcessor:
         except Exception as e:
             logger.exception(f"Error stopping VK bot: {e}")
 
-        for task in (self._tg_task, self._vk_task):
+        try:
+            nlp_service.stop()
+        except Exception as e:
+            logger.exception(f"Error stopping NLP service: {e}")
+
+        for task in (self._tg_task, self._vk_task, self._kb_task):
             if task and not task.done():
                 task.cancel()
 
         self._running = False
         logger.info("MessageProcessor stopped.")
 
+    async def _start_knowledge_base(self) -> None:
+        """
+        Ингест FAQ/правил в индекс на диске (пересборка только при изменениях)
+        и фоновая подмена индекса, когда CURRENT указывает на новую версию.
+        """
+        try:
+            docs = collect_documents(settings.kb_docs_dir)
+            await asyncio.to_thread(
+                build_index,
+                docs,
+                settings.kb_index_dir,
+                flat_max=settings.kb_flat_max_docs,
+                hnsw_min=settings.kb_hnsw_min_docs,
+            )
+            knowledge_base.maybe_reload(settings.kb_index_dir)
+        except Exception as e:
+            logger.exception(f"KB ingestion failed, serving builtin index: {e}")
+
+        self._kb_task = asyncio.create_task(
+            knowledge_base.watch(settings.kb_index_dir, settings.kb_reload_interval),
+            name="kb-watch",
+        )
+
     # ======================================================
     # RAW → Pydantic
     # ======================================================
@@ -165,37 +211,49 @@ class MessageProcessor:
                 platform_id = "unknown"
                 username = first_name = last_name = language_code = None
 
-            # 3.2 Находим или создаём пользователя
-            user = await user_crud.create_or_get(
-                db=db,
+            # 3.2 Находим или создаём пользователя одним запросом;
+            # last_active копится в памяти и пишется пачкой (app.core.activity)
+            user_id = await user_crud.upsert(
+                db,
                 platform=platform,
                 platform_id=platform_id,
                 username=username,
                 first_name=first_name,
                 last_name=last_name,
                 language_code=language_code,
+                touch=False,
             )
-
-            await user_crud.update_last_active(db, user.id)
+            activity_buffer.touch(user_id)
 
             # 3.3 Ищем открытый тикет
-            ticket = await ticket_crud.get_open_by_user(db, user.id)
+            ticket = await ticket_crud.get_open_by_user(db, user_id)
+            ticket_created = ticket is None
+            escalated = False
 
             if not ticket:
                 title = (msg_in.content or "Новый тикет")[:255]
 
                 ticket_in = TicketCreate(
-                    user_id=user.id,
+                    user_id=user_id,
                     platform=platform,
                     title=title,
                     description=msg_in.content,
                     priority=TicketPriority.MEDIUM,
                     category=TicketCategory.OTHER,
                     is_escalated=bool(data.get("call_specialist")),
+                    intent=data.get("intent"),
                 )
 
                 ticket = await ticket_crud.create(db, ticket_in)
 
+            elif data.get("call_specialist") and not ticket.is_escalated:
+                # позвали оператора в уже открытом тикете — закоммитится
+                # вместе с сообщением
+                ticket.is_escalated = True
+                if ticket.escalated_at is None:
+                    ticket.escalated_at = datetime.utcnow()
+                escalated = True
+
             # ==================================================
             # 3.4 Создаём сообщение
             # ГАРАНТИРУЕМ direction != None
@@ -204,7 +262,7 @@ class MessageProcessor:
 
             msg_to_save: MessageCreate = msg_in.model_copy(
                 update={
-                    "user_id": user.id,
+                    "user_id": user_id,
                     "ticket_id": ticket.id,
                     "direction": direction,
                 }
@@ -220,12 +278,60 @@ class MessageProcessor:
             logger.info(
                 "Saved message %s for user=%s platform=%s ticket=%s attachments=%d",
                 db_msg.id,
-                user.id,
+                user_id,
                 platform.value,
                 ticket.id,
                 len(attachments_in),
             )
 
+            # 3.6 Push в дашборд агентов (app.core.events)
+            if ticket_created:
+                event_hub.publish(
+                    "ticket.created",
+                    ticket_id=ticket.id,
+                    platform=platform,
+                    data={
+                        "user_id": user_id,
+                        "title": ticket.title,
+                        "status": ticket.status,
+                        "priority": ticket.priority,
+                        "category": ticket.category,
+                        "intent": ticket.intent,
+                        "is_escalated": ticket.is_escalated,
+                        "created_at": ticket.created_at,
+                    },
+                )
+            event_hub.publish(
+                "message.created",
+                ticket_id=ticket.id,
+                platform=platform,
+                data={
+                    "id": db_msg.id,
+                    "user_id": user_id,
+                    "direction": db_msg.direction,
+                    "status": db_msg.status,
+                    "content": db_msg.content,
+                    "is_ai_response": db_msg.is_ai_response,
+                    "attachments": len(attachments_in),
+                    "created_at": db_msg.created_at,
+                },
+            )
+            if escalated:
+                event_hub.publish(
+                    "ticket.updated",
+                    ticket_id=ticket.id,
+                    platform=platform,
+                    data={"is_escalated": True},
+                )
+
+            # 3.7 Новый или эскалированный тикет — наименее загруженному агенту
+            if ticket_created or escalated:
+                try:
+                    await assignment_engine.assign(db, ticket)
+                except Exception:
+                    # сообщение уже сохранено; тикет подберёт фоновый проход
+                    logger.exception("Auto-assignment failed for ticket %s", ticket.id)
+
 
 # Глобальный экземпляр
 processor = MessageProcessor()
@@ -0,0 +1,255 @@
+# app/core/rollups.py
+"""
+Предагрегированная статистика для дашборда (ticket_rollups).
+
+Раз в stats_rollup_interval секунд фоновая задача пересчитывает свежие
+часы целиком из tickets / messages:
+
+• окно — от последнего посчитанного часа минус stats_rollup_overlap
+  часов до текущего момента; GROUP BY идёт только по строкам окна (по
+  индексам на created_at / closed_at / first_response_at), поэтому цена
+  прохода зависит от трафика за окно, а не от размера таблиц;
+• часовые строки окна удаляются и пишутся заново — пересчёт идемпотентен,
+  падение посреди прохода ничего не портит;
+• подневные строки затронутых дней собираются из часовых;
+• на пустой таблице — первичное заполнение по всей истории кусками
+  по stats_rollup_chunk_hours часов.
+
+Каждое событие попадает в час, когда оно произошло: tickets_created —
+по created_at, tickets_escalated — по escalated_at (эскалация открытого
+тикета случается позже его создания), tickets_closed — по closed_at.
+
+Старые бакеты не пересчитываются, поэтому перенос переписки в архив
+(app.core.archive) статистику не меняет.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Integer, cast, delete, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.metrics import metrics
+from app.models.message import Message, MessageDirection
+from app.models.stats import TicketRollup
+from app.models.ticket import Ticket
+
+logger = logging.getLogger("rollups")
+
+ROLLUP_RUN = metrics.histogram(
+    "stats_rollup_run_seconds", "Duration of one rollup refresh"
+)
+
+PERIOD_HOUR = "hour"
+PERIOD_DAY = "day"
+
+METRICS = (
+    "tickets_created", "tickets_escalated", "tickets_closed",
+    "first_responses", "first_response_seconds",
+    "messages_in", "messages_out",
+)
+
+Key = Tuple[datetime, str, str, str]   # (bucket, platform, category, intent)
+
+
+def _floor_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _hour_expr(col, dialect: str):
+    """Начало часа строкой 'YYYY-MM-DD HH:00:00'."""
+    if dialect == "mysql":
+        return func.date_format(col, "%Y-%m-%d %H:00:00")
+    return func.strftime("%Y-%m-%d %H:00:00", col)
+
+
+def _seconds_expr(start, end, dialect: str):
+    if dialect == "mysql":
+        return func.timestampdiff(literal_column("SECOND"), start, end)
+    # julianday — дробные сутки в float: без round 30 с превращаются в 29
+    return cast(func.round((func.julianday(end) - func.julianday(start)) * 86400), Integer)
+
+
+def _dim(value) -> str:
+    if value is None:
+        return ""
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+class RollupJob:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="stats-rollups")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[ROLLUPS] refresh failed: {e}")
+            await asyncio.sleep(settings.stats_rollup_interval)
+
+    # -------------------------------------------------
+    # Пересчёт
+    # -------------------------------------------------
+
+    async def refresh(self, now: Optional[datetime] = None) -> None:
+        """Пересчитывает всё от последнего посчитанного часа до now."""
+        now = now or datetime.utcnow()
+        started = time.perf_counter()
+
+        async with async_session_maker() as db:
+            last = await db.scalar(
+                select(func.max(TicketRollup.bucket)).where(TicketRollup.period == PERIOD_HOUR)
+            )
+            if last is not None:
+                start = last - timedelta(hours=settings.stats_rollup_overlap)
+            else:
+                # первый запуск — вся история
+                first = await db.scalar(select(func.min(Ticket.created_at)))
+                start = first or now
+        start = _floor_hour(start)
+
+        chunk = timedelta(hours=settings.stats_rollup_chunk_hours)
+        end = _floor_hour(now) + timedelta(hours=1)
+        while start < end:
+            stop = min(start + chunk, end)
+            await self.rebuild(start, stop)
+            start = stop
+
+        ROLLUP_RUN.observe(time.perf_counter() - started)
+
+    async def rebuild(self, start: datetime, end: datetime) -> None:
+        """Пересчитывает часы [start, end) и дни, в которые они попадают."""
+        async with async_session_maker() as db:
+            hours = await self._aggregate_hours(db, start, end)
+
+            await db.execute(
+                delete(TicketRollup).where(
+                    TicketRollup.period == PERIOD_HOUR,
+                    TicketRollup.bucket >= start,
+                    TicketRollup.bucket < end,
+                )
+            )
+            if hours:
+                await db.execute(insert(TicketRollup), self._rows(PERIOD_HOUR, hours))
+            await db.flush()
+
+            day_start = _floor_day(start)
+            day_end = _floor_day(end - timedelta(microseconds=1)) + timedelta(days=1)
+            await self._rebuild_days(db, day_start, day_end)
+            await db.commit()
+
+    async def _aggregate_hours(
+            self, db: AsyncSession, start: datetime, end: datetime
+    ) -> Dict[Key, Dict[str, int]]:
+        dialect = db.bind.dialect.name
+        acc: Dict[Key, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+        dims = (Ticket.platform, Ticket.category, Ticket.intent)
+
+        def key(row) -> Key:
+            return (
+                datetime.fromisoformat(row.bucket), _dim(row.platform),
+                _dim(row.category), _dim(row.intent),
+            )
+
+        async def grouped(ts_col, *aggs, join_messages=False, where=()):
+            bucket = _hour_expr(ts_col, dialect).label("bucket")
+            query = select(bucket, *dims, *aggs)
+            if join_messages:
+                query = query.select_from(Message).join(Ticket, Ticket.id == Message.ticket_id)
+            query = query.where(ts_col >= start, ts_col < end, *where)
+            query = query.group_by(bucket, *dims)
+            return (await db.execute(query)).all()
+
+        for row in await grouped(Ticket.created_at, func.count().label("n")):
+            acc[key(row)]["tickets_created"] += row.n
+
+        for row in await grouped(Ticket.escalated_at, func.count().label("n")):
+            acc[key(row)]["tickets_escalated"] += row.n
+
+        for row in await grouped(Ticket.closed_at, func.count().label("n")):
+            acc[key(row)]["tickets_closed"] += row.n
+
+        for row in await grouped(
+                Ticket.first_response_at,
+                func.count().label("n"),
+                func.sum(_seconds_expr(Ticket.created_at, Ticket.first_response_at, dialect)).label("seconds"),
+        ):
+            acc[key(row)]["first_responses"] += row.n
+            acc[key(row)]["first_response_seconds"] += int(row.seconds or 0)
+
+        for direction, metric in (
+                (MessageDirection.INCOMING, "messages_in"),
+                (MessageDirection.OUTGOING, "messages_out"),
+        ):
+            for row in await grouped(
+                    Message.created_at,
+                    func.count().label("n"),
+                    join_messages=True,
+                    where=(Message.direction == direction,),
+            ):
+                acc[key(row)][metric] += row.n
+
+        return acc
+
+    async def _rebuild_days(self, db: AsyncSession, day_start: datetime, day_end: datetime) -> None:
+        res = await db.execute(
+            select(TicketRollup).where(
+                TicketRollup.period == PERIOD_HOUR,
+                TicketRollup.bucket >= day_start,
+                TicketRollup.bucket < day_end,
+            )
+        )
+        days: Dict[Key, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+        for r in res.scalars():
+            values = days[(_floor_day(r.bucket), r.platform, r.category, r.intent)]
+            for m in METRICS:
+                values[m] += getattr(r, m)
+
+        await db.execute(
+            delete(TicketRollup).where(
+                TicketRollup.period == PERIOD_DAY,
+                TicketRollup.bucket >= day_start,
+                TicketRollup.bucket < day_end,
+            )
+        )
+        if days:
+            await db.execute(insert(TicketRollup), self._rows(PERIOD_DAY, days))
+
+    @staticmethod
+    def _rows(period: str, acc: Dict[Key, Dict[str, int]]):
+        return [
+            {
+                "period": period, "bucket": bucket, "platform": platform,
+                "category": category, "intent": intent, **values,
+            }
+            for (bucket, platform, category, intent), values in acc.items()
+        ]
+
+
+rollup_job = RollupJob()
@@ -0,0 +1,298 @@
+# app/core/search.py
+"""
+Полнотекстовый поиск по переписке для агентов.
+
+• MySQL — FULLTEXT ft_messages_content (парсер ngram): MATCH ... AGAINST
+  в BOOLEAN MODE, каждое слово запроса обязательно (+"слово"). Индекс
+  InnoDB обновляет сам при записи сообщения.
+• SQLite и прочее — свой инвертированный индекс message_search_terms
+  (term, message_id). Фоновый индексатор дочитывает новые сообщения после
+  search_index_state.last_id пачками по search_index_batch — индексация
+  инкрементальная, полная переиндексация не нужна. Слова запроса ищутся
+  по префиксу (range по PK), все — обязательно.
+
+Архив (messages_archive, app.core.archive) ищется всегда по
+message_search_terms: он партиционирован, а FULLTEXT на партиционированных
+таблицах MySQL не поддерживает. Термины архивных сообщений пишет сам
+перенос в архив (index_archived), id у сообщения в архиве тот же.
+
+Выдача — новые сверху, keyset по (created_at, id) сразу по обеим таблицам,
+к каждому сообщению — фрагмент текста с подсвеченными совпадениями
+(<mark>, остальное экранировано).
+"""
+import asyncio
+import html
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker, engine
+from app.core.metrics import metrics
+from app.crud.pagination import keyset_page, split_page
+from app.models.archive import ArchivedMessage
+from app.models.message import Message
+from app.models.search import MessageSearchTerm, SearchIndexState
+
+logger = logging.getLogger("search")
+
+SEARCH_LATENCY = metrics.histogram(
+    "message_search_seconds", "Message search query latency"
+)
+SEARCH_INDEXED = metrics.counter(
+    "message_search_indexed_total", "Messages added to the local inverted index"
+)
+
+# слова — подряд идущие буквы/цифры/_ (кириллица тоже): «steve_2010@mail.ru»
+# даёт steve_2010, mail, ru; «12.03.2025» — 12, 03, 2025
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MIN_TOKEN = 2            # = ngram_token_size по умолчанию у MySQL
+MAX_TOKEN = 64           # = длина message_search_terms.term
+MAX_QUERY_TERMS = 8
+SNIPPET_RADIUS = 60      # символов контекста вокруг первого совпадения
+INDEX_STATE = "messages"
+DRIVER_MAX_POSTINGS = 5000  # самое редкое слово чаще — идём по messages с конца
+
+
+def tokenize(text_: Optional[str]) -> List[str]:
+    """Нормализованные слова текста, без повторов, в порядке появления."""
+    if not text_:
+        return []
+    seen: Dict[str, None] = {}
+    for match in TOKEN_RE.finditer(text_.lower()):
+        token = match.group()[:MAX_TOKEN]
+        if len(token) >= MIN_TOKEN:
+            seen.setdefault(token)
+    return list(seen)
+
+
+def make_snippet(content: Optional[str], terms: List[str]) -> str:
+    """Кусок текста вокруг первого совпадения, совпадения в <mark>."""
+    if not content:
+        return ""
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE) if terms else None
+    first = pattern.search(content) if pattern else None
+
+    start = max(0, first.start() - SNIPPET_RADIUS) if first else 0
+    end = min(len(content), (first.end() if first else 0) + SNIPPET_RADIUS * 2)
+    fragment = content[start:end]
+
+    parts: List[str] = []
+    pos = 0
+    for m in (pattern.finditer(fragment) if pattern else ()):
+        parts.append(html.escape(fragment[pos:m.start()]))
+        parts.append(f"<mark>{html.escape(m.group())}</mark>")
+        pos = m.end()
+    parts.append(html.escape(fragment[pos:]))
+
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(content) else "")
+
+
+class MessageSearch:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def uses_fulltext(self) -> bool:
+        return engine.dialect.name == "mysql"
+
+    # -------------------------------------------------
+    # Поиск
+    # -------------------------------------------------
+
+    async def search(
+            self,
+            db: AsyncSession,
+            query: str,
+            *,
+            ticket_id: Optional[int] = None,
+            user_id: Optional[int] = None,
+            cursor: Optional[str] = None,
+            limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return [], None
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        counts = None
+        rows: List[Message | ArchivedMessage] = []
+        # горячая таблица и архив — по странице с одним курсором, потом слияние
+        for model in (Message, ArchivedMessage):
+            stmt = select(model)
+            if model is Message and db.bind.dialect.name == "mysql":
+                boolean = " ".join(f'+"{t}"' for t in terms)
+                # MATCH (content) AGAINST (... IN BOOLEAN MODE)
+                stmt = stmt.where(Message.content.match(boolean))
+            else:
+                if counts is None:
+                    counts = await self._term_counts(db, terms)
+                stmt = self._where_terms(stmt, model, terms, counts)
+            if ticket_id is not None:
+                stmt = stmt.where(model.ticket_id == ticket_id)
+            if user_id is not None:
+                stmt = stmt.where(model.user_id == user_id)
+
+            stmt = keyset_page(
+                stmt, model.created_at, model.id,
+                cursor=cursor, limit=limit, descending=True,
+            )
+            rows.extend((await db.execute(stmt)).scalars().all())
+
+        rows.sort(key=lambda m: (m.created_at, m.id), reverse=True)
+        items, next_cursor = split_page(rows[:limit + 1], limit)
+
+        hits = [
+            {
+                "id": m.id,
+                "ticket_id": m.ticket_id,
+                "user_id": m.user_id,
+                "direction": m.direction.value,
+                "created_at": m.created_at,
+                "snippet": make_snippet(m.content, terms),
+            }
+            for m in items
+        ]
+        SEARCH_LATENCY.observe(loop.time() - started)
+        return hits, next_cursor
+
+    @staticmethod
+    def _term_range(term: str):
+        # префикс: term <= x < term + U+FFFF — range по PK (term, message_id)
+        return and_(MessageSearchTerm.term >= term, MessageSearchTerm.term < term + "\uffff")
+
+    async def _term_counts(self, db: AsyncSession, terms: List[str]) -> Dict[str, int]:
+        """Число сообщений на слово, с потолком DRIVER_MAX_POSTINGS + 1."""
+        counts = {}
+        for term in terms:
+            capped = (
+                select(MessageSearchTerm.message_id)
+                .where(self._term_range(term))
+                .limit(DRIVER_MAX_POSTINGS + 1)
+                .subquery()
+            )
+            counts[term] = await db.scalar(select(func.count()).select_from(capped))
+        return counts
+
+    def _where_terms(self, stmt, model, terms: List[str], counts: Dict[str, int]):
+        """
+        Условия по локальному индексу. Список сообщений самого редкого слова
+        (если он короткий) задаёт кандидатов через IN, остальные слова
+        проверяются на кандидате коррелированным EXISTS по его терминам.
+        Если все слова частые — без IN: сообщения читаются с конца по
+        (created_at, id), и поиск останавливается на limit совпадениях.
+        """
+        rarest = min(terms, key=counts.__getitem__)
+        if counts[rarest] <= DRIVER_MAX_POSTINGS:
+            stmt = stmt.where(model.id.in_(
+                select(MessageSearchTerm.message_id).where(self._term_range(rarest))
+            ))
+            terms = [t for t in terms if t != rarest]
+
+        for term in terms:
+            stmt = stmt.where(exists().where(
+                MessageSearchTerm.message_id == model.id,
+                self._term_range(term),
+            ))
+        return stmt
+
+    # -------------------------------------------------
+    # Инкрементальный индекс (не MySQL)
+    # -------------------------------------------------
+
+    def start(self) -> None:
+        if self.uses_fulltext:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="search-indexer")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # догоняем пачками, потом ждём новые сообщения
+                while await self.index_pending() >= settings.search_index_batch:
+                    await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[SEARCH] indexing failed: {e}")
+            await asyncio.sleep(settings.search_index_interval)
+
+    async def index_pending(self) -> int:
+        """Индексирует одну пачку новых сообщений; возвращает их число."""
+        async with async_session_maker() as db:
+            state = await db.get(SearchIndexState, INDEX_STATE)
+            if state is None:
+                state = SearchIndexState(name=INDEX_STATE, last_id=0)
+                db.add(state)
+
+            rows = (await db.execute(
+                select(Message.id, Message.content)
+                .where(Message.id > state.last_id)
+                .order_by(Message.id)
+                .limit(settings.search_index_batch)
+            )).all()
+            if not rows:
+                await db.commit()
+                return 0
+
+            await self._insert_terms(db, rows)
+            state.last_id = rows[-1].id
+            await db.commit()
+
+        SEARCH_INDEXED.inc(len(rows))
+        return len(rows)
+
+    async def index_archived(self, db: AsyncSession, message_ids: List[int]) -> None:
+        """
+        Термины сообщений, только что перенесённых в messages_archive
+        (в той же транзакции, что и перенос). Без MySQL индексатор обычно
+        уже прошёл эти сообщения — досчитываем только те, до которых не дошёл.
+        """
+        if not message_ids:
+            return
+        query = select(ArchivedMessage.id, ArchivedMessage.content).where(
+            ArchivedMessage.id.in_(message_ids)
+        )
+        if not self.uses_fulltext:
+            state = await db.get(SearchIndexState, INDEX_STATE)
+            if state is not None:
+                query = query.where(ArchivedMessage.id > state.last_id)
+        await self._insert_terms(db, (await db.execute(query)).all())
+
+    @staticmethod
+    async def _insert_terms(db: AsyncSession, rows) -> None:
+        pairs = [
+            {"term": term, "message_id": row.id}
+            for row in rows
+            for term in tokenize(row.content)
+        ]
+        if not pairs:
+            return
+        dialect = db.bind.dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite_insert(MessageSearchTerm).on_conflict_do_nothing()
+        elif dialect == "mysql":
+            stmt = MessageSearchTerm.__table__.insert().prefix_with("IGNORE")
+        else:
+            stmt = MessageSearchTerm.__table__.insert()
+        # executemany: один скомпилированный INSERT на всю пачку
+        await db.execute(stmt, pairs)
+
+
+message_search = MessageSearch()
@@ -0,0 +1,89 @@
+# app/core/timer_wheel.py
+"""
+Хэшированное колесо таймеров — дешёвые дедлайны для миллионов ключей.
+
+Ключ лежит в слоте своего тика. Продление дедлайна (самая частая операция —
+«пользователь снова написал») — одна запись в словарь: ключ не переезжает
+между слотами, а при срабатывании слота просто перекладывается дальше,
+если его дедлайн успел сдвинуться. advance() обходит только наступившие
+тики, поэтому стоимость пропорциональна числу истёкших/перенесённых ключей,
+а не общему числу ключей.
+"""
+import math
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 1.0, slots: int = 512, now: Optional[float] = None):
+        self.tick = tick
+        self.slots = slots
+        self._wheel: List[List[Tuple[Hashable, int]]] = [[] for _ in range(slots)]
+        self._deadlines: Dict[Hashable, float] = {}
+        self._placed: Dict[Hashable, int] = {}   # ключ → тик, в слоте которого он лежит
+        self._current = self._tick_of(time.monotonic() if now is None else now)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def _tick_of(self, ts: float) -> int:
+        return int(ts // self.tick)
+
+    def _place(self, key: Hashable, deadline: float) -> None:
+        tick_no = max(self._current + 1, math.ceil(deadline / self.tick))
+        self._placed[key] = tick_no
+        self._wheel[tick_no % self.slots].append((key, tick_no))
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        return self._deadlines.get(key)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Ставит или сдвигает дедлайн ключа (время — в тех же часах, что advance)."""
+        placed = self._placed.get(key)
+        self._deadlines[key] = deadline
+        # более поздний дедлайн разберётся сам, когда сработает текущий слот
+        if placed is None or math.ceil(deadline / self.tick) < placed:
+            self._place(key, deadline)
+
+    def cancel(self, key: Hashable) -> bool:
+        # запись в слоте остаётся и будет выброшена как устаревшая
+        self._placed.pop(key, None)
+        return self._deadlines.pop(key, None) is not None
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Прокручивает колесо до now и возвращает ключи с истёкшим дедлайном."""
+        now = time.monotonic() if now is None else now
+        target = self._tick_of(now)
+        if target <= self._current:
+            return []
+
+        expired: List[Hashable] = []
+        first = self._current + 1
+        # прыжок дальше полного оборота — каждый слот достаточно обойти один раз
+        steps = min(target - self._current, self.slots)
+        self._current = target
+
+        for tick_no in range(first, first + steps):
+            slot_no = tick_no % self.slots
+            entries = self._wheel[slot_no]
+            if not entries:
+                continue
+            self._wheel[slot_no] = keep = []
+
+            for key, placed in entries:
+                if self._placed.get(key) != placed:
+                    continue                       # отменён или переложен
+                if placed > target:
+                    keep.append((key, placed))     # следующий оборот
+                    continue
+                if self._deadlines[key] <= now:
+                    del self._deadlines[key]
+                    del self._placed[key]
+                    expired.append(key)
+                else:
+                    self._place(key, self._deadlines[key])
+
+        return expired
@@ -1,9 +1,16 @@
 # app/crud/message.py
 
+from typing import List, Optional, Tuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.crud.pagination import keyset_page, split_page
+from app.models.archive import ArchivedMessage
 
 from app.models.message import Message, MessageDirection, MessageStatus
+from app.models.ticket import Ticket
 from app.schemas.message import MessageCreate, MessageUpdate
 
 
@@ -39,6 +46,33 @@ class MessageCRUD:
         await db.refresh(msg)
         return msg
 
+    # ------------------------------------
+    # OUTBOX
+    # ------------------------------------
+    def add_outgoing(
+            self,
+            db: AsyncSession,
+            *,
+            ticket: Ticket,
+            text: str,
+    ) -> Message:
+        """
+        Ответ агента в outbox: OUTGOING + PENDING, без commit —
+        коммитит вызывающий вместе с изменениями тикета.
+        Отправляет app.core.outbox.
+        """
+        msg = Message(
+            user_id=ticket.user_id,
+            ticket_id=ticket.id,
+            direction=MessageDirection.OUTGOING,
+            status=MessageStatus.PENDING,
+            content=text,
+            is_ai_response=False,
+            send_attempts=0,
+        )
+        db.add(msg)
+        return msg
+
     # ------------------------------------
     # UPDATE
     # ------------------------------------
@@ -70,13 +104,48 @@ class MessageCRUD:
         res = await db.execute(select(Message).where(Message.id == msg_id))
         return res.scalars().first()
 
-    async def get_by_ticket(self, db: AsyncSession, ticket_id: int) -> list[Message]:
+    async def get_by_ticket(self, db: AsyncSession, ticket_id: int) -> list[Message | ArchivedMessage]:
+        """Вся переписка тикета — горячая и из архива (app.core.archive)."""
         res = await db.execute(
             select(Message)
             .where(Message.ticket_id == ticket_id)
             .order_by(Message.id)
         )
-        return list(res.scalars())
+        archived = await db.execute(
+            select(ArchivedMessage)
+            .where(ArchivedMessage.ticket_id == ticket_id)
+            .order_by(ArchivedMessage.id)
+        )
+        return sorted([*archived.scalars(), *res.scalars()], key=lambda m: m.id)
+
+    async def list_page_by_ticket(
+            self,
+            db: AsyncSession,
+            ticket_id: int,
+            *,
+            cursor: Optional[str] = None,
+            limit: int = 50,
+    ) -> Tuple[List[Message | ArchivedMessage], Optional[str]]:
+        """
+        Переписка тикета по порядку, keyset по (created_at, id).
+        Вложения — одним SELECT ... IN на страницу.
+
+        Сообщения давно закрытых тикетов лежат в messages_archive (id те же),
+        поэтому страница собирается из обеих таблиц с одним курсором.
+        """
+        rows: List[Message | ArchivedMessage] = []
+        for model in (Message, ArchivedMessage):
+            query = keyset_page(
+                select(model)
+                .where(model.ticket_id == ticket_id)
+                .options(selectinload(model.attachments)),
+                model.created_at, model.id,
+                cursor=cursor, limit=limit,
+            )
+            rows.extend((await db.execute(query)).scalars().all())
+
+        rows.sort(key=lambda m: (m.created_at, m.id))
+        return split_page(rows[:limit + 1], limit)
 
     async def get_last_by_user(self, db: AsyncSession, user_id: int) -> Message | None:
         res = await db.execute(
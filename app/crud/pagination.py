@@ -0,0 +1,81 @@
+# app/crud/pagination.py
+"""
+Keyset-пагинация по (created_at, id).
+
+Вместо OFFSET страница продолжается «после последней показанной строки»:
+WHERE (created_at, id) > (:c, :id) ORDER BY created_at, id LIMIT n —
+с подходящим индексом это один range scan, цена страницы не зависит
+от того, насколько далеко пролистали.
+
+Курсор для клиента непрозрачный: base64 от [created_at, id].
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.sql import Select
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(
+        query: Select,
+        created_col,
+        id_col,
+        *,
+        cursor: Optional[str],
+        limit: int,
+        descending: bool = False,
+) -> Select:
+    """
+    Добавляет к запросу условие «после курсора», сортировку и LIMIT.
+    Берёт limit + 1 строку: лишняя означает, что есть следующая страница.
+    """
+    if cursor:
+        c_created, c_id = decode_cursor(cursor)
+        # строкой в том виде, в каком дату хранит база: server_default
+        # (CURRENT_TIMESTAMP) пишет в SQLite '2025-01-01 10:00:00' без долей
+        # секунды, а datetime-параметр ушёл бы как '...10:00:00.000000' —
+        # строки сравниваются посимвольно, и сообщения той же секунды
+        # терялись бы или повторялись. MySQL такую строку приводит к DATETIME
+        c_created = literal(c_created.isoformat(sep=" "), String)
+        # развёрнутая форма (a > x) OR (a = x AND b > y): MySQL строит
+        # по ней range scan, а сравнение кортежей — не всегда
+        if descending:
+            cond = or_(created_col < c_created, and_(created_col == c_created, id_col < c_id))
+        else:
+            cond = or_(created_col > c_created, and_(created_col == c_created, id_col > c_id))
+        query = query.where(cond)
+
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+    return query.limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Отрезает лишнюю строку и строит курсор на следующую страницу."""
+    items = list(rows[:limit])
+    if len(rows) <= limit or not items:
+        return items, None
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
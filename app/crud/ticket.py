@@ -1,10 +1,14 @@
 # app/crud/ticket.py
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Tuple
 
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.models.ticket import Ticket, TicketStatus
+from app.crud.pagination import keyset_page, split_page
+from app.models.ticket import Ticket, TicketStatus, TicketPriority
+from app.models.user import PlatformType
 from app.schemas.ticket import TicketCreate, TicketUpdate
 
 
@@ -13,6 +17,47 @@ class TicketCRUD:
         res = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
         return res.scalar_one_or_none()
 
+    async def get_with_user(self, db: AsyncSession, ticket_id: int) -> Optional[Ticket]:
+        """Тикет вместе с пользователем (без ленивой загрузки — в async её нет)."""
+        res = await db.execute(
+            select(Ticket)
+            .where(Ticket.id == ticket_id)
+            .options(selectinload(Ticket.user))
+        )
+        return res.scalar_one_or_none()
+
+    async def list_page(
+            self,
+            db: AsyncSession,
+            *,
+            status: Optional[TicketStatus] = None,
+            platform: Optional[PlatformType] = None,
+            priority: Optional[TicketPriority] = None,
+            assigned_to: Optional[int] = None,
+            cursor: Optional[str] = None,
+            limit: int = 50,
+    ) -> Tuple[List[Ticket], Optional[str]]:
+        """
+        Страница списка тикетов, новые сверху, keyset по (created_at, id).
+        Пользователь подгружается одним SELECT ... IN на страницу.
+        """
+        query = select(Ticket).options(selectinload(Ticket.user))
+        if status is not None:
+            query = query.where(Ticket.status == status)
+        if platform is not None:
+            query = query.where(Ticket.platform == platform)
+        if priority is not None:
+            query = query.where(Ticket.priority == priority)
+        if assigned_to is not None:
+            query = query.where(Ticket.assigned_to == assigned_to)
+
+        query = keyset_page(
+            query, Ticket.created_at, Ticket.id,
+            cursor=cursor, limit=limit, descending=True,
+        )
+        rows = (await db.execute(query)).scalars().all()
+        return split_page(rows, limit)
+
     async def get_last_active_for_user(
             self, db: AsyncSession, user_id: int
     ) -> Optional[Ticket]:
@@ -53,6 +98,8 @@ class TicketCRUD:
             category=obj_in.category,
             priority=obj_in.priority,
             is_escalated=obj_in.is_escalated,
+            escalated_at=datetime.utcnow() if obj_in.is_escalated else None,
+            intent=obj_in.intent,
         )
         db.add(obj)
         await db.commit()
@@ -63,6 +110,8 @@ class TicketCRUD:
             self, db: AsyncSession, db_obj: Ticket, obj_in: TicketUpdate
     ) -> Ticket:
         data = obj_in.model_dump(exclude_unset=True)
+        if data.get("is_escalated") and db_obj.escalated_at is None:
+            db_obj.escalated_at = datetime.utcnow()
         for field, value in data.items():
             setattr(db_obj, field, value)
         db.add(db_obj)
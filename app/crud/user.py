@@ -2,12 +2,17 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, func, case, and_, or_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User, PlatformType
 from app.schemas.user import UserCreate
 
+# поля профиля, которые upsert перезаписывает только при изменении
+PROFILE_FIELDS = ("username", "first_name", "last_name", "language_code")
+
 
 class UserCRUD:
     async def get(self, db: AsyncSession, user_id: int) -> Optional[User]:
@@ -29,6 +34,93 @@ class UserCRUD:
         )
         return res.scalar_one_or_none()
 
+    async def upsert(
+            self,
+            db: AsyncSession,
+            *,
+            platform: PlatformType,
+            platform_id: str,
+            username: str | None = None,
+            first_name: str | None = None,
+            last_name: str | None = None,
+            language_code: str | None = None,
+            touch: bool = True,
+    ) -> int:
+        """
+        Создать или обновить пользователя одним запросом, вернуть его id.
+
+        Держится на UNIQUE (platform, platform_id): два первых сообщения
+        одновременно не создадут дубль. Поля профиля перезаписываются только
+        если пришло новое непустое значение, отличное от сохранённого
+        (VK, например, профиль не присылает вовсе). touch — заодно обновить
+        last_active. Коммитит вызывающий.
+        """
+        now = datetime.utcnow()
+        values = {
+            "platform": platform,
+            "platform_id": platform_id,
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "language_code": language_code,
+            "is_banned": False,
+            "is_blocked": False,
+            "last_active": now if touch else None,
+        }
+        dialect = db.get_bind().dialect.name
+
+        if dialect in ("mysql", "sqlite"):
+            if dialect == "mysql":
+                stmt = mysql_insert(User).values(**values)
+                new = stmt.inserted
+            else:
+                stmt = sqlite_insert(User).values(**values)
+                new = stmt.excluded
+            cols = User.__table__.c
+
+            # пришло непустое значение, отличное от сохранённого
+            differs = {
+                col: and_(new[col].is_not(None), new[col].is_distinct_from(cols[col]))
+                for col in PROFILE_FIELDS
+            }
+            updates = [
+                # присваивания применяются слева направо — updated_at
+                # считаем до того, как поля профиля перезапишутся
+                ("updated_at", case((or_(*differs.values()), func.now()), else_=cols.updated_at)),
+            ]
+            updates += [
+                (col, case((differs[col], new[col]), else_=cols[col]))
+                for col in PROFILE_FIELDS
+            ]
+            if touch:
+                updates.append(("last_active", new.last_active))
+
+            if dialect == "mysql":
+                # id = LAST_INSERT_ID(id) отдаёт id существующей строки
+                # через lastrowid — без второго SELECT
+                updates.insert(0, ("id", func.last_insert_id(cols.id)))
+                res = await db.execute(stmt.on_duplicate_key_update(updates))
+                return res.lastrowid
+
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["platform", "platform_id"], set_=dict(updates)
+            ).returning(User.id)
+            return (await db.execute(stmt)).scalar_one()
+
+        # прочие СУБД — старый путь: SELECT, затем INSERT
+        user = await self.get_by_platform_id(db, platform=platform, platform_id=platform_id)
+        if user is None:
+            user = User(**values)
+            db.add(user)
+        else:
+            for col in PROFILE_FIELDS:
+                if values[col] is not None and getattr(user, col) != values[col]:
+                    setattr(user, col, values[col])
+            if touch:
+                user.last_active = now
+        await db.flush()
+        return user.id
+
     async def get_or_create(
             self,
             db: AsyncSession,
@@ -42,26 +134,20 @@ class UserCRUD:
     ) -> User:
         """
         Основной метод: ищем пользователя по platform + platform_id,
-        если нет — создаём.
+        если нет — создаём (через upsert, без гонки).
         """
-        user = await self.get_by_platform_id(
-            db, platform=platform, platform_id=platform_id
-        )
-        if user:
-            return user
-
-        obj = User(
+        user_id = await self.upsert(
+            db,
             platform=platform,
             platform_id=platform_id,
             username=username,
             first_name=first_name,
             last_name=last_name,
             language_code=language_code,
+            touch=False,
         )
-        db.add(obj)
         await db.commit()
-        await db.refresh(obj)
-        return obj
+        return await self.get(db, user_id)
 
     async def create_or_get(
             self,
@@ -89,13 +175,13 @@ class UserCRUD:
         )
 
     async def update_last_active(self, db: AsyncSession, user_id: int) -> None:
-        res = await db.execute(select(User).where(User.id == user_id))
-        user = res.scalar_one_or_none()
-        if not user:
-            return
-        user.last_active = datetime.utcnow()
-        db.add(user)
-        await db.commit()
+        """
+        Отмечает активность пользователя. В БД не ходит: время копится
+        в app.core.activity и пишется пачкой раз в несколько секунд.
+        """
+        from app.core.activity import activity_buffer
+
+        activity_buffer.touch(user_id)
 
     # Для совместимости со старым кодом, который вызывал get_or_create_from_platform
     async def get_or_create_from_platform(
@@ -5,14 +5,24 @@ import logging
 from typing import List
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import engine, init_models, async_session_maker
+from app.core.database import engine, read_engine, init_models, async_session_maker
 from app.core.processor import processor
 from app.core.queue import message_queue
+from app.core.metrics import metrics
 from app.api.v1.api import api_router
 
+from app.core.broadcast import broadcast_service
+from app.core.outbox import outbox_worker
+from app.core.activity import activity_buffer
+from app.core.archive import message_archiver
+from app.core.search import message_search
+from app.core.rollups import rollup_job
+from app.core.events import event_hub
+from app.core.assignment import assignment_engine
 from app.crud.agent import agent_crud
 
 logger = logging.getLogger("minecraft_support")
@@ -77,20 +87,98 @@ async def _start_processor_and_bots():
     - очередь сообщений
     - ботов
     """
+    # push-события дашборда; без Redis — только подписчики этого процесса
+    try:
+        await event_hub.start()
+    except Exception:
+        logger.exception("Push hub Redis fan-out start error")
+
     t1 = asyncio.create_task(processor.start(), name="processor.start")
     _bg_tasks.append(t1)
 
     t2 = asyncio.create_task(message_queue.process_messages(processor), name="queue.processor")
     _bg_tasks.append(t2)
 
+    # доставка ответов агентов из outbox
+    outbox_worker.start()
+
+    # пакетная запись users.last_active
+    activity_buffer.start()
+
+    # перенос старой переписки в архив
+    message_archiver.start()
+
+    # дочитка локального поискового индекса (на MySQL не нужна — там FULLTEXT)
+    message_search.start()
+
+    # пересчёт свежих часов статистики дашборда
+    rollup_job.start()
+
+    # автоназначение: сверка нагрузки, перебалансировка, неназначенные тикеты
+    assignment_engine.start()
+
     logger.info("✅ Processor and queue started.")
 
+    # незавершённые рассылки продолжаются с сохранённого курсора
+    try:
+        await broadcast_service.resume_all()
+    except Exception:
+        logger.exception("Broadcast resume error")
+
 
 async def _shutdown_bg_tasks():
     """Остановка фоновых задач и ботов."""
 
     logger.info("Shutting down background tasks...")
 
+    # push-соединения (клиенты переподключатся к живому воркеру)
+    try:
+        await event_hub.stop()
+    except Exception:
+        logger.exception("Push hub stop error")
+
+    # автоназначение (нагрузку восстановит сверка с БД)
+    try:
+        await assignment_engine.stop()
+    except Exception:
+        logger.exception("Assignment stop error")
+
+    # статистика (следующий пересчёт догонит пропущенное)
+    try:
+        await rollup_job.stop()
+    except Exception:
+        logger.exception("Rollups stop error")
+
+    # поисковый индексатор (продолжит с search_index_state.last_id)
+    try:
+        await message_search.stop()
+    except Exception:
+        logger.exception("Search indexer stop error")
+
+    # архив (прерванная пачка откатится, продолжится в следующий проход)
+    try:
+        await message_archiver.stop()
+    except Exception:
+        logger.exception("Archiver stop error")
+
+    # outbox (неотправленное останется PENDING в БД)
+    try:
+        await outbox_worker.stop()
+    except Exception:
+        logger.exception("Outbox stop error")
+
+    # last_active: дописываем накопленное, пока движок БД ещё жив
+    try:
+        await activity_buffer.stop()
+    except Exception:
+        logger.exception("last_active flush error")
+
+    # broadcasts (прогресс уже в БД, продолжатся после рестарта)
+    try:
+        await broadcast_service.stop()
+    except Exception:
+        logger.exception("Broadcast stop error")
+
     # queue
     try:
         message_queue.stop()
@@ -146,6 +234,8 @@ async def on_shutdown():
 
     try:
         await engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
     except Exception:
         pass
 
@@ -161,6 +251,11 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return metrics.render()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=settings.debug)
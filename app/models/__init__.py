@@ -4,6 +4,10 @@ from .user import User
 from .ticket import Ticket
 from .message import Message
 from .attachment import Attachment
+from .broadcast import Broadcast
+from .archive import ArchivedMessage, ArchivedAttachment
+from .search import MessageSearchTerm, SearchIndexState
+from .stats import TicketRollup
 
 __all__ = [
     "Base",
@@ -12,4 +16,10 @@ __all__ = [
     "Ticket",
     "Message",
     "Attachment",
+    "Broadcast",
+    "ArchivedMessage",
+    "ArchivedAttachment",
+    "MessageSearchTerm",
+    "SearchIndexState",
+    "TicketRollup",
 ]
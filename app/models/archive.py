@@ -0,0 +1,74 @@
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Enum, Integer, Text, String, Float, Boolean, DateTime, Index, func
+from datetime import datetime
+
+from app.models.base import Base
+from app.models.message import MessageDirection, MessageStatus
+from app.models.attachment import AttachmentType
+
+
+# Холодные копии messages / attachments для тикетов, закрытых давно
+# (переносит app.core.archive). Колонки те же, что в горячих таблицах.
+# На MySQL таблицы партиционированы по месяцу created_at, поэтому:
+#   • created_at входит в первичный ключ (требование партиционирования);
+#   • внешних ключей нет — партиционированные InnoDB-таблицы их не умеют.
+
+
+class ArchivedMessage(Base):
+    __tablename__ = "messages_archive"
+    __table_args__ = (
+        Index("ix_messages_archive_ticket_created_id", "ticket_id", "created_at", "id"),
+        Index("ix_messages_archive_user_id_id", "user_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    ticket_id: Mapped[int | None] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(Integer)
+
+    direction: Mapped[MessageDirection] = mapped_column(Enum(MessageDirection), nullable=False)
+    status: Mapped[MessageStatus | None] = mapped_column(Enum(MessageStatus), nullable=True)
+
+    content: Mapped[str | None] = mapped_column(Text)
+
+    is_ai_response: Mapped[bool] = mapped_column(Boolean, default=False)
+    confidence_score: Mapped[float | None] = mapped_column(Float)
+
+    platform_message_id: Mapped[str | None] = mapped_column(String(100))
+
+    send_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime)
+
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+
+    # relations (без FK — join описан явно, только чтение)
+    attachments = relationship(
+        "ArchivedAttachment",
+        primaryjoin="ArchivedMessage.id == foreign(ArchivedAttachment.message_id)",
+        viewonly=True,
+    )
+
+
+class ArchivedAttachment(Base):
+    __tablename__ = "attachments_archive"
+    __table_args__ = (
+        Index("ix_attachments_archive_message_id", "message_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    message_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    attachment_type: Mapped[AttachmentType] = mapped_column(Enum(AttachmentType))
+
+    file_id: Mapped[str] = mapped_column(String(500))
+    file_url: Mapped[str | None] = mapped_column(String(500))
+    file_size: Mapped[int | None] = mapped_column(Integer)
+    mime_type: Mapped[str | None] = mapped_column(String(100))
+    caption: Mapped[str | None] = mapped_column(Text)
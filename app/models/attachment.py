@@ -18,11 +18,13 @@ class AttachmentType(PyEnum):
 
 class Attachment(Base, TimestampMixin):
     __tablename__ = "attachments"
+    # id не переиспользуются после переноса в архив (миграция 0009)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     message_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=False
+        Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
     attachment_type: Mapped[AttachmentType] = mapped_column(Enum(AttachmentType))
@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Enum, Integer, Text, ForeignKey, DateTime
+from enum import Enum as PyEnum
+from datetime import datetime
+
+from app.models.base import Base, TimestampMixin
+from app.models.user import PlatformType
+
+
+class BroadcastStatus(PyEnum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    PAUSED = "PAUSED"
+    DONE = "DONE"
+    CANCELLED = "CANCELLED"
+
+
+class Broadcast(Base, TimestampMixin):
+    __tablename__ = "broadcasts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # None — все платформы
+    platform: Mapped[PlatformType | None] = mapped_column(Enum(PlatformType))
+
+    status: Mapped[BroadcastStatus] = mapped_column(
+        Enum(BroadcastStatus), default=BroadcastStatus.PENDING, nullable=False
+    )
+
+    # прогресс: получатели идут по возрастанию users.id,
+    # cursor — последний обработанный id (с него продолжаем после рестарта)
+    cursor: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    created_by: Mapped[int | None] = mapped_column(Integer, ForeignKey("agents.id"))
+
+    started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime)
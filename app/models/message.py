@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Enum, Integer, Text, String, Float, ForeignKey, Boolean
+from sqlalchemy import Enum, Integer, Text, String, Float, ForeignKey, Boolean, DateTime, Index
+from datetime import datetime
 from enum import Enum as PyEnum
 
 from app.models.base import Base, TimestampMixin
@@ -11,6 +12,7 @@ class MessageDirection(PyEnum):
 
 
 class MessageStatus(PyEnum):
+    PENDING = "PENDING"     # исходящее в outbox, ждёт отправки
     SENT = "SENT"
     DELIVERED = "DELIVERED"
     READ = "READ"
@@ -19,6 +21,20 @@ class MessageStatus(PyEnum):
 
 class Message(Base, TimestampMixin):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_ticket_id_id", "ticket_id", "id"),
+        Index("ix_messages_user_id_id", "user_id", "id"),
+        Index("ix_messages_ticket_created_id", "ticket_id", "created_at", "id"),
+        # выдача поиска «новые сверху» без сортировки всех совпадений
+        Index("ix_messages_created_id", "created_at", "id"),
+        # поиск по тексту (app.core.search); на SQLite — свой индекс message_search_terms
+        Index(
+            "ft_messages_content", "content",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+        # id не переиспользуются после переноса в архив (миграция 0009)
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -49,6 +65,10 @@ class Message(Base, TimestampMixin):
 
     platform_message_id: Mapped[str | None] = mapped_column(String(100))
 
+    # outbox: попытки отправки и время следующей (она же — аренда строки воркером)
+    send_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime)
+
     # relations
     ticket = relationship("Ticket", back_populates="messages")
     user = relationship("User", back_populates="messages")
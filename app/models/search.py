@@ -0,0 +1,25 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, String
+
+from app.models.base import Base
+
+
+# Инвертированный индекс по тексту сообщений для баз без FULLTEXT (SQLite)
+# и для архива на любой СУБД (messages_archive партиционирована, FULLTEXT
+# на ней MySQL не даёт). Заполняет app.core.search; горячие messages на
+# MySQL ищет FULLTEXT-индекс ft_messages_content.
+
+class MessageSearchTerm(Base):
+    __tablename__ = "message_search_terms"
+
+    # PK (term, message_id) — и уникальность, и индекс для поиска по префиксу
+    term: Mapped[str] = mapped_column(String(64), primary_key=True)
+    message_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+
+
+class SearchIndexState(Base):
+    __tablename__ = "search_index_state"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # последний проиндексированный messages.id
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
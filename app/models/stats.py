@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, BigInteger, String, DateTime, Index
+from datetime import datetime
+
+from app.models.base import Base
+
+
+# Предагрегированная статистика для дашборда (заполняет app.core.rollups).
+# Одна строка — бакет (час или день) × платформа × категория × интент.
+# Каждая метрика относится к бакету своего события: созданные — по
+# created_at, закрытые — по closed_at, первые ответы — по first_response_at,
+# сообщения — по времени сообщения.
+
+class TicketRollup(Base):
+    __tablename__ = "ticket_rollups"
+    __table_args__ = (
+        Index("ix_ticket_rollups_period_bucket", "period", "bucket"),
+    )
+
+    period: Mapped[str] = mapped_column(String(8), primary_key=True)     # hour / day
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # начало часа / дня
+    platform: Mapped[str] = mapped_column(String(16), primary_key=True)
+    category: Mapped[str] = mapped_column(String(16), primary_key=True)  # "" — не задана
+    intent: Mapped[str] = mapped_column(String(32), primary_key=True)    # "" — не определён
+
+    tickets_created: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tickets_escalated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tickets_closed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_responses: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # сумма секунд до первого ответа — среднее = first_response_seconds / first_responses
+    first_response_seconds: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    messages_in: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    messages_out: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Enum, Integer, String, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Enum, Integer, String, Text, Boolean, ForeignKey, DateTime, Index
 from enum import Enum as PyEnum
 from datetime import datetime
 
@@ -31,6 +31,20 @@ class TicketCategory(PyEnum):
 
 class Ticket(Base, TimestampMixin):
     __tablename__ = "tickets"
+    __table_args__ = (
+        # открытый тикет пользователя (get_last_active_for_user)
+        Index("ix_tickets_user_status_created", "user_id", "status", "created_at"),
+        # keyset-списки в админке (ticket_crud.list_page)
+        Index("ix_tickets_created_id", "created_at", "id"),
+        Index("ix_tickets_status_created_id", "status", "created_at", "id"),
+        Index("ix_tickets_assigned_created_id", "assigned_to", "created_at", "id"),
+        # кандидаты в архив (app.core.archive)
+        Index("ix_tickets_status_closed", "status", "closed_at"),
+        # пересчёт свежих бакетов статистики (app.core.rollups)
+        Index("ix_tickets_closed_at", "closed_at"),
+        Index("ix_tickets_first_response_at", "first_response_at"),
+        Index("ix_tickets_escalated_at", "escalated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -46,6 +60,8 @@ class Ticket(Base, TimestampMixin):
 
     priority: Mapped[TicketPriority | None] = mapped_column(Enum(TicketPriority))
     category: Mapped[TicketCategory | None] = mapped_column(Enum(TicketCategory))
+    # интент первого сообщения (app.bot.intents), для статистики
+    intent: Mapped[str | None] = mapped_column(String(32))
 
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
@@ -58,6 +74,8 @@ class Ticket(Base, TimestampMixin):
     closed_at: Mapped[datetime | None] = mapped_column(DateTime)
 
     is_escalated: Mapped[bool] = mapped_column(Boolean, default=False)
+    # момент первой эскалации — по нему статистика считает tickets_escalated
+    escalated_at: Mapped[datetime | None] = mapped_column(DateTime)
 
     # relations
     user = relationship("User", back_populates="tickets")
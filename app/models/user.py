@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Boolean, Enum, Integer, DateTime
+from sqlalchemy import String, Boolean, Enum, Integer, DateTime, Index
 from datetime import datetime
 from enum import Enum as PyEnum
 
@@ -14,6 +14,10 @@ class PlatformType(PyEnum):
 
 class User(Base, TimestampMixin):
     __tablename__ = "users"
+    __table_args__ = (
+        # уникальный индекс, а не констрейнт: так его создаёт миграция 0003 (онлайн на MySQL)
+        Index("uq_users_platform_platform_id", "platform", "platform_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
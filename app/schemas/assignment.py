@@ -0,0 +1,13 @@
+# app/schemas/assignment.py
+from pydantic import BaseModel
+
+from app.models.agent import AgentRole
+
+
+class AgentLoadOut(BaseModel):
+    agent_id: int
+    role: AgentRole
+    online: bool
+    open_tickets: int
+    recent_replies: int     # ответов за assign_reply_window
+    score: float            # нагрузка, по которой выбирается исполнитель
@@ -0,0 +1,40 @@
+# app/schemas/broadcast.py
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.models.broadcast import BroadcastStatus
+from app.models.user import PlatformType
+
+
+class BroadcastCreate(BaseModel):
+    text: str = Field(..., min_length=1, max_length=4096)
+    # None — Telegram и VK
+    platform: Optional[PlatformType] = None
+
+
+class BroadcastDB(BaseModel):
+    id: int
+    text: str
+    platform: Optional[PlatformType] = None
+    status: BroadcastStatus
+
+    cursor: int
+    total: int
+    sent: int
+    failed: int
+
+    created_by: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BroadcastProgress(BroadcastDB):
+    done: int = 0
+    rate: Optional[float] = None         # сообщений/сек
+    eta_seconds: Optional[int] = None
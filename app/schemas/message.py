@@ -11,6 +11,7 @@ class MessageDirection(str, Enum):
 
 
 class MessageStatus(str, Enum):
+    PENDING = "PENDING"
     SENT = "SENT"
     DELIVERED = "DELIVERED"
     READ = "READ"
@@ -74,3 +75,23 @@ class MessageDB(MessageBase):
 
     class Config:
         from_attributes = True
+
+
+class MessagePage(BaseModel):
+    items: List[MessageDB]
+    next_cursor: Optional[str] = None
+
+
+class MessageSearchHit(BaseModel):
+    id: int
+    ticket_id: Optional[int] = None
+    user_id: int
+    direction: MessageDirection
+    created_at: datetime
+    # фрагмент текста: HTML-экранирован, совпадения в <mark>
+    snippet: str
+
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchHit]
+    next_cursor: Optional[str] = None
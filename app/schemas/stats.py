@@ -0,0 +1,43 @@
+# app/schemas/stats.py
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class StatsValues(BaseModel):
+    tickets_created: int = 0
+    tickets_escalated: int = 0
+    tickets_closed: int = 0
+    first_responses: int = 0
+    messages_in: int = 0
+    messages_out: int = 0
+
+    # производные — считаются из сумм, а не усредняются по бакетам
+    # эскалации за период на тикет, созданный за период. Это не доля одной
+    # когорты: эскалацию считают по escalated_at, тикет — по created_at,
+    # поэтому значение бывает больше 1
+    escalations_per_created: Optional[float] = None
+    avg_first_response_seconds: Optional[float] = None
+
+
+class StatsPoint(StatsValues):
+    bucket: datetime
+
+
+class StatsShare(BaseModel):
+    key: str            # значение разреза ("" — не задано)
+    tickets_created: int
+
+
+class StatsSummary(BaseModel):
+    period: str         # hour / day
+    date_from: datetime
+    date_to: datetime
+
+    totals: StatsValues
+    series: List[StatsPoint]
+
+    intents: List[StatsShare]
+    platforms: List[StatsShare]
+    categories: List[StatsShare]
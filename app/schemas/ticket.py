@@ -21,6 +21,7 @@ class TicketBase(BaseModel):
 class TicketCreate(TicketBase):
     user_id: int
     platform: PlatformType  # TELEGRAM / VK / WEB
+    intent: Optional[str] = None
 
 
 class TicketUpdate(BaseModel):
@@ -36,6 +37,7 @@ class TicketDB(TicketBase):
     user_id: int
     platform: PlatformType
     status: TicketStatus
+    intent: Optional[str] = None
     assigned_to: Optional[int] = None
     first_response_at: Optional[datetime] = None
     closed_at: Optional[datetime] = None
@@ -47,3 +49,51 @@ class TicketDB(TicketBase):
 
     class Config:
         from_attributes = True
+
+
+
+# -----------------------------------------------------
+# LIST / DETAIL
+# -----------------------------------------------------
+
+class TicketUser(BaseModel):
+    id: int
+    platform: PlatformType
+    platform_id: str
+    username: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TicketListItem(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    # в БД nullable — в списке отдаём как есть
+    priority: Optional[TicketPriority] = None
+    category: Optional[TicketCategory] = None
+    is_escalated: Optional[bool] = False
+    intent: Optional[str] = None
+    user_id: int
+    platform: PlatformType
+    status: TicketStatus
+    assigned_to: Optional[int] = None
+    first_response_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+
+    created_at: datetime
+    updated_at: datetime
+
+    user: Optional[TicketUser] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TicketPage(BaseModel):
+    items: List[TicketListItem]
+    # None — дальше страниц нет
+    next_cursor: Optional[str] = None
\ No newline at end of file
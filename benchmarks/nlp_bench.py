@@ -0,0 +1,282 @@
+"""
+Офлайн-бенчмарк NLP на размеченном корпусе сообщений игроков.
+
+Считает:
+• precision / recall / F1 по каждому интенту для двух конфигураций
+  классификатора рядом (по умолчанию legacy detect_intent против пайплайна);
+• токсичность: is_toxic и toxicity_level >= порога против разметки;
+• p50 / p99 задержки и сообщений в секунду на ядро (по CPU-времени процесса);
+• mini_llm_answer: задержка и доля сообщений, на которые он ответил.
+
+Работает полностью офлайн, .env и БД не нужны:
+    python -m benchmarks.nlp_bench
+    python -m benchmarks.nlp_bench --a fuzzy --b exact,automaton,fuzzy --repeat 50
+    python -m benchmarks.nlp_bench --json bench_nlp.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.bot.classifier import build_pipeline
+from app.bot.intents import detect_intent
+from app.bot.mini_llm import mini_llm_answer
+from app.bot.moderation import is_toxic, toxicity_level
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "nlp_corpus_v1.jsonl")
+
+TOXICITY_LEVEL_THRESHOLD = 50
+
+
+# ======================================================
+#  КОРПУС
+# ======================================================
+
+def load_corpus(path: str) -> Tuple[dict, List[dict], str]:
+    """Первая строка — {"_meta": {...}}, дальше по сообщению на строку."""
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    meta: dict = {}
+    rows: List[dict] = []
+    for line in raw.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if "_meta" in item:
+            meta = item["_meta"]
+            continue
+        rows.append(item)
+
+    return meta, rows, hashlib.sha256(raw).hexdigest()[:12]
+
+
+# ======================================================
+#  МЕТРИКИ
+# ======================================================
+
+def percentile(values: Sequence[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def precision_recall(gold: Sequence[str], pred: Sequence[str]) -> Dict[str, dict]:
+    tp: Counter = Counter()
+    fp: Counter = Counter()
+    fn: Counter = Counter()
+    for g, p in zip(gold, pred):
+        if g == p:
+            tp[g] += 1
+        else:
+            fp[p] += 1
+            fn[g] += 1
+
+    out = {}
+    for label in sorted(set(gold) | set(pred)):
+        prec = tp[label] / (tp[label] + fp[label]) if tp[label] + fp[label] else 0.0
+        rec = tp[label] / (tp[label] + fn[label]) if tp[label] + fn[label] else 0.0
+        f1 = 2 * prec * rec / (prec + rec) if prec + rec else 0.0
+        out[label] = {
+            "precision": prec,
+            "recall": rec,
+            "f1": f1,
+            "support": tp[label] + fn[label],
+        }
+    return out
+
+
+def run_timed(fn: Callable[[str], object], texts: Sequence[str], repeat: int) -> Tuple[List[object], dict]:
+    """
+    Прогоняет fn по всем текстам repeat раз.
+    Предсказания берутся с первого прохода, задержки — со всех.
+    """
+    preds: List[object] = []
+    latencies: List[float] = []
+
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    for r in range(repeat):
+        for text in texts:
+            t0 = time.perf_counter()
+            res = fn(text)
+            latencies.append(time.perf_counter() - t0)
+            if r == 0:
+                preds.append(res)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+
+    calls = len(latencies)
+    perf = {
+        "calls": calls,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "mean_us": sum(latencies) / calls * 1e6 if calls else 0.0,
+        "msgs_per_sec_core": calls / cpu if cpu > 0 else float("inf"),
+        "wall_s": wall,
+    }
+    return preds, perf
+
+
+# ======================================================
+#  КОНФИГУРАЦИИ
+# ======================================================
+
+def make_classifier(spec: str) -> Tuple[Callable[[str], str], object]:
+    """'legacy' → intents.detect_intent, иначе — пайплайн из ступеней через запятую."""
+    if spec == "legacy":
+        return detect_intent, None
+    pipeline = build_pipeline(spec)
+    return pipeline.detect_intent, pipeline
+
+
+def bench_intents(spec: str, rows: List[dict], repeat: int) -> dict:
+    fn, pipeline = make_classifier(spec)
+    texts = [r["text"] for r in rows]
+    gold = [r["intent"] for r in rows]
+
+    preds, perf = run_timed(fn, texts, repeat)
+    per_intent = precision_recall(gold, preds)
+    accuracy = sum(1 for g, p in zip(gold, preds) if g == p) / len(gold) if gold else 0.0
+
+    misses = [
+        {"text": r["text"], "gold": g, "pred": p, "tags": r.get("tags", [])}
+        for r, g, p in zip(rows, gold, preds) if g != p
+    ]
+
+    by_tag: Dict[str, List[int]] = {}
+    for r, g, p in zip(rows, gold, preds):
+        for tag in r.get("tags") or ["clean"]:
+            by_tag.setdefault(tag, []).append(int(g == p))
+
+    return {
+        "config": spec,
+        "accuracy": accuracy,
+        "per_intent": per_intent,
+        "accuracy_by_tag": {t: sum(v) / len(v) for t, v in sorted(by_tag.items())},
+        "perf": perf,
+        "stages": pipeline.report() if pipeline else None,
+        "misses": misses,
+    }
+
+
+def bench_toxicity(rows: List[dict], repeat: int) -> dict:
+    texts = [r["text"] for r in rows]
+    gold = ["toxic" if r.get("toxic") else "clean" for r in rows]
+
+    out = {}
+    detectors = {
+        "is_toxic": is_toxic,
+        f"toxicity_level>={TOXICITY_LEVEL_THRESHOLD}":
+            lambda t: toxicity_level(t) >= TOXICITY_LEVEL_THRESHOLD,
+    }
+    for name, fn in detectors.items():
+        preds, perf = run_timed(fn, texts, repeat)
+        labels = ["toxic" if p else "clean" for p in preds]
+        out[name] = {"toxic": precision_recall(gold, labels).get("toxic", {}), "perf": perf}
+    return out
+
+
+def bench_mini_llm(rows: List[dict], repeat: int) -> dict:
+    # отдельный user_id на каждый вызов: личная память не должна «подсказывать»
+    counter = iter(range(10**9))
+
+    def answer(text: str):
+        return mini_llm_answer(user_id=next(counter), history=[], text=text)
+
+    texts = [r["text"] for r in rows]
+    preds, perf = run_timed(answer, texts, repeat)
+    answered = sum(1 for p in preds if p)
+    return {"answer_rate": answered / len(preds) if preds else 0.0, "perf": perf}
+
+
+# ======================================================
+#  ОТЧЁТ
+# ======================================================
+
+def _fmt_perf(perf: dict) -> str:
+    return (
+        f"p50={perf['p50_us']:.1f}µs  p99={perf['p99_us']:.1f}µs  "
+        f"{perf['msgs_per_sec_core']:.0f} msg/s/core  ({perf['calls']} calls)"
+    )
+
+
+def print_report(meta: dict, sha: str, n: int, a: dict, b: dict, tox: dict, llm: dict) -> None:
+    print(f"Corpus: {meta.get('name', '?')} v{meta.get('version', '?')} sha={sha}  messages={n}")
+    print()
+    print(f"{'intent':<16} {'support':>7}   {'A: ' + a['config']:>28}   {'B: ' + b['config']:>28}")
+    print(f"{'':<16} {'':>7}   {'P':>8} {'R':>8} {'F1':>8}     {'P':>8} {'R':>8} {'F1':>8}")
+
+    labels = sorted(set(a["per_intent"]) | set(b["per_intent"]))
+    for label in labels:
+        ra = a["per_intent"].get(label, {})
+        rb = b["per_intent"].get(label, {})
+        support = ra.get("support") or rb.get("support") or 0
+        print(
+            f"{label:<16} {support:>7}   "
+            f"{ra.get('precision', 0):>8.2f} {ra.get('recall', 0):>8.2f} {ra.get('f1', 0):>8.2f}     "
+            f"{rb.get('precision', 0):>8.2f} {rb.get('recall', 0):>8.2f} {rb.get('f1', 0):>8.2f}"
+        )
+
+    print()
+    for res in (a, b):
+        print(f"[{res['config']}] accuracy={res['accuracy']:.3f}  {_fmt_perf(res['perf'])}")
+        tags = "  ".join(f"{t}={v:.2f}" for t, v in res["accuracy_by_tag"].items())
+        print(f"    by tag: {tags}")
+        if res["stages"]:
+            for st in res["stages"]:
+                print(
+                    f"    stage {st['stage']:<10} hit_share={st['hit_share']:.2f}  "
+                    f"avg={st['avg_us']:.1f}µs  total={st['total_ms']:.1f}ms"
+                )
+
+    print()
+    for name, res in tox.items():
+        t = res["toxic"]
+        print(
+            f"[toxicity {name}] P={t.get('precision', 0):.2f} R={t.get('recall', 0):.2f}  "
+            f"{_fmt_perf(res['perf'])}"
+        )
+
+    print(f"[mini_llm_answer] answer_rate={llm['answer_rate']:.2f}  {_fmt_perf(llm['perf'])}")
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Offline NLP accuracy/throughput benchmark")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--a", default="legacy", help="'legacy' или ступени через запятую")
+    parser.add_argument("--b", default="exact,automaton,fuzzy")
+    parser.add_argument("--repeat", type=int, default=20, help="проходов по корпусу для замера скорости")
+    parser.add_argument("--json", default=None, help="куда сохранить полный отчёт")
+    args = parser.parse_args(argv)
+
+    meta, rows, sha = load_corpus(args.corpus)
+
+    res_a = bench_intents(args.a, rows, args.repeat)
+    res_b = bench_intents(args.b, rows, args.repeat)
+    tox = bench_toxicity(rows, args.repeat)
+    llm = bench_mini_llm(rows, max(1, args.repeat // 4))
+
+    print_report(meta, sha, len(rows), res_a, res_b, tox, llm)
+
+    report = {
+        "corpus": {"meta": meta, "sha": sha, "size": len(rows)},
+        "a": res_a,
+        "b": res_b,
+        "toxicity": tox,
+        "mini_llm": llm,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
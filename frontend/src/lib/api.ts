@@ -69,10 +69,23 @@ export const api = {
 
   /* ---------- TICKETS ---------- */
 
-  getTickets: () => apiRequest<any[]>("GET", "/tickets"),
+  // keyset-пагинация: следующая страница — getTickets(page.next_cursor)
+  getTickets: (cursor?: string | null) =>
+    apiRequest<{ items: any[]; next_cursor: string | null }>(
+      "GET",
+      cursor ? `/tickets?cursor=${encodeURIComponent(cursor)}` : "/tickets"
+    ),
 
   getTicket: (id: number) => apiRequest("GET", `/tickets/${id}`),
 
+  getTicketMessages: (id: number, cursor?: string | null) =>
+    apiRequest<{ items: any[]; next_cursor: string | null }>(
+      "GET",
+      cursor
+        ? `/tickets/${id}/messages?cursor=${encodeURIComponent(cursor)}`
+        : `/tickets/${id}/messages`
+    ),
+
   sendMessage: (ticketId: number, text: string) =>
     apiRequest("POST", `/tickets/${ticketId}/messages`, {
       content: text,
@@ -81,3 +94,46 @@ export const api = {
   closeTicket: (ticketId: number) =>
     apiRequest("POST", `/tickets/${ticketId}/close`),
 };
+
+/* ============================================================
+   Push-события (вместо опроса)
+============================================================ */
+
+// topics: "queue", "queue:TELEGRAM", "ticket:42"…
+// Возвращает функцию отписки. При обрыве (в т.ч. 1013 — не успевали
+// читать) переподключается; onReconnect — перечитать состояние через REST.
+export function subscribeEvents(
+  topics: string[],
+  onEvent: (event: any) => void,
+  onReconnect?: () => void
+): () => void {
+  let ws: WebSocket | null = null;
+  let stopped = false;
+  let retry = 1000;
+
+  const connect = () => {
+    const params = new URLSearchParams({ token: getToken() || "" });
+    topics.forEach((t) => params.append("topic", t));
+    ws = new WebSocket(`${API_URL.replace(/^http/, "ws")}/events/ws?${params}`);
+
+    ws.onopen = () => {
+      if (retry > 1000) onReconnect?.();
+      retry = 1000;
+    };
+    ws.onmessage = (e) => {
+      const event = JSON.parse(e.data);
+      if (event.type !== "ping" && event.type !== "subscribed") onEvent(event);
+    };
+    ws.onclose = () => {
+      if (stopped) return;
+      setTimeout(connect, retry);
+      retry = Math.min(retry * 2, 30000);
+    };
+  };
+
+  connect();
+  return () => {
+    stopped = true;
+    ws?.close();
+  };
+}
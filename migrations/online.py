@@ -0,0 +1,43 @@
+# migrations/online.py
+"""
+Онлайн-индексы для миграций.
+
+На MySQL индекс строится через ALTER TABLE ... ALGORITHM=INPLACE, LOCK=NONE —
+таблица остаётся доступной на чтение и запись. Индекс с тем же именем или
+тем же набором колонок (InnoDB сам создаёт такие под внешние ключи)
+повторно не создаётся, поэтому миграции можно катить по базам, созданным
+старым create_all.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+def existing_indexes(bind, table: str) -> dict:
+    insp = sa.inspect(bind)
+    found = {}
+    for ix in insp.get_indexes(table):
+        found[ix["name"]] = (list(ix["column_names"]), bool(ix.get("unique")))
+    for uc in insp.get_unique_constraints(table):
+        found[uc["name"]] = (list(uc["column_names"]), True)
+    return found
+
+
+def create_index(name: str, table: str, columns: list, unique: bool = False) -> None:
+    bind = op.get_bind()
+    existing = existing_indexes(bind, table)
+    if name in existing or (list(columns), unique) in existing.values():
+        return
+
+    if bind.dialect.name == "mysql":
+        cols = ", ".join(f"`{c}`" for c in columns)
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        op.execute(
+            f"ALTER TABLE `{table}` ADD {kind} `{name}` ({cols}), ALGORITHM=INPLACE, LOCK=NONE"
+        )
+    else:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def drop_index(name: str, table: str) -> None:
+    if name in existing_indexes(op.get_bind(), table):
+        op.drop_index(name, table_name=table)
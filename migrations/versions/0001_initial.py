@@ -0,0 +1,196 @@
+"""initial schema (как её создавал create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Базы, созданные старым init_models (create_all), проставляются этой
+ревизией автоматически (см. app.core.database.init_models).
+
+Неполная старая база (часть таблиц, например minecraft_bot.db из самой
+первой версии бота) доводится до этой схемы: недостающие таблицы
+создаются, в существующие добавляются недостающие колонки.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+from migrations.online import create_index
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+PLATFORM = sa.Enum("TELEGRAM", "VK", "WEB", name="platformtype")
+
+# чем заполнить в старых строках NOT NULL-колонку без server_default
+LEGACY_FILL = {
+    ("agents", "role"): "'SUPPORT'",
+    ("agents", "is_active"): "1",
+    ("users", "is_banned"): "0",
+    ("users", "is_blocked"): "0",
+    ("tickets", "platform"): "(SELECT users.platform FROM users WHERE users.id = tickets.user_id)",
+    ("tickets", "status"): "'OPEN'",
+    ("tickets", "is_escalated"): "0",
+    ("messages", "is_ai_response"): "0",
+}
+
+# первая версия бота писала значения enum строчными ('telegram', 'open')
+LEGACY_UPPERCASE = {"users": ["platform"], "tickets": ["status"]}
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    ]
+
+
+def _complete_table(name: str, columns) -> None:
+    """Существующая старая таблица: добавить недостающие колонки схемы 0001."""
+    bind = op.get_bind()
+    present = {c["name"] for c in sa.inspect(bind).get_columns(name)}
+    missing = [c for c in columns if isinstance(c, sa.Column) and c.name not in present]
+
+    legacy = [column for column in LEGACY_UPPERCASE.get(name, []) if column in present]
+    for column in legacy:
+        op.execute(f"UPDATE {name} SET {column} = UPPER({column})")
+    if not missing:
+        return
+
+    # сначала NULL-колонки, потом заполнение, потом NOT NULL:
+    # в таблице уже есть строки. Внешние ключи не переносим — у create_all
+    # они безымянные, а batch-режиму нужно имя
+    with op.batch_alter_table(name) as batch:
+        for column in missing:
+            default = column.server_default.arg if column.server_default is not None else None
+            batch.add_column(sa.Column(column.name, column.type, server_default=default))
+        # строчный DEFAULT "open" старой схемы: неверное значение, и новые
+        # SQLite не принимают его в CREATE TABLE при пересборке таблицы
+        for column in legacy:
+            batch.alter_column(column, server_default=None)
+
+    required = []
+    for column in missing:
+        if column.nullable:
+            continue
+        fill = LEGACY_FILL.get((name, column.name))
+        if fill is not None:
+            op.execute(f"UPDATE {name} SET {column.name} = {fill} WHERE {column.name} IS NULL")
+        elif column.server_default is None:
+            continue
+        required.append(column)
+
+    if required:
+        with op.batch_alter_table(name) as batch:
+            for column in required:
+                batch.alter_column(column.name, existing_type=column.type, nullable=False)
+
+
+def upgrade() -> None:
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    def create_table(name, *columns):
+        if name in existing:
+            _complete_table(name, columns)
+        else:
+            op.create_table(name, *columns)
+
+    create_table(
+        "agents",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("full_name", sa.String(150), nullable=False),
+        sa.Column("role", sa.Enum("ADMIN", "SUPPORT", "MODERATOR", name="agentrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("last_login", sa.DateTime()),
+        sa.Column("telegram_id", sa.String(100)),
+        *_timestamps(),
+    )
+
+    create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("platform", PLATFORM, nullable=False),
+        sa.Column("platform_id", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(100)),
+        sa.Column("first_name", sa.String(100)),
+        sa.Column("last_name", sa.String(100)),
+        sa.Column("language_code", sa.String(10)),
+        sa.Column("is_banned", sa.Boolean(), nullable=False),
+        sa.Column("is_blocked", sa.Boolean(), nullable=False),
+        sa.Column("last_active", sa.DateTime()),
+        *_timestamps(),
+    )
+    create_index("ix_users_platform_id", "users", ["platform_id"])
+
+    create_table(
+        "tickets",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("platform", PLATFORM, nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("OPEN", "IN_PROGRESS", "PENDING", "CLOSED", name="ticketstatus"),
+            nullable=False,
+        ),
+        sa.Column("priority", sa.Enum("LOW", "MEDIUM", "HIGH", "CRITICAL", name="ticketpriority")),
+        sa.Column(
+            "category",
+            sa.Enum("TECHNICAL", "GAMEPLAY", "PAYMENT", "COMPLAINT", "OTHER", name="ticketcategory"),
+        ),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("assigned_to", sa.Integer(), sa.ForeignKey("agents.id")),
+        sa.Column("first_response_at", sa.DateTime()),
+        sa.Column("closed_at", sa.DateTime()),
+        sa.Column("is_escalated", sa.Boolean(), nullable=False),
+        *_timestamps(),
+    )
+
+    create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id", ondelete="CASCADE")),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("direction", sa.Enum("INCOMING", "OUTGOING", name="messagedirection"), nullable=False),
+        sa.Column("status", sa.Enum("SENT", "DELIVERED", "READ", "ERROR", name="messagestatus")),
+        sa.Column("content", sa.Text()),
+        sa.Column("is_ai_response", sa.Boolean(), nullable=False),
+        sa.Column("confidence_score", sa.Float()),
+        sa.Column("platform_message_id", sa.String(100)),
+        *_timestamps(),
+    )
+
+    create_table(
+        "attachments",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "message_id", sa.Integer(), sa.ForeignKey("messages.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column(
+            "attachment_type",
+            sa.Enum(
+                "PHOTO", "VIDEO", "AUDIO", "DOCUMENT", "STICKER", "VOICE", "LOCATION", "CONTACT",
+                name="attachmenttype",
+            ),
+            nullable=False,
+        ),
+        sa.Column("file_id", sa.String(500), nullable=False),
+        sa.Column("file_url", sa.String(500)),
+        sa.Column("file_size", sa.Integer()),
+        sa.Column("mime_type", sa.String(100)),
+        sa.Column("caption", sa.Text()),
+        *_timestamps(),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("attachments")
+    op.drop_table("messages")
+    op.drop_table("tickets")
+    op.drop_index("ix_users_platform_id", table_name="users")
+    op.drop_table("users")
+    op.drop_table("agents")
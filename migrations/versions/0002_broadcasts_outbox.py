@@ -0,0 +1,78 @@
+"""broadcasts table, outbox columns on messages
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+Идемпотентна: create_all в старом init_models мог уже создать broadcasts.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+MESSAGE_STATUS_OLD = ("SENT", "DELIVERED", "READ", "ERROR")
+MESSAGE_STATUS_NEW = ("PENDING",) + MESSAGE_STATUS_OLD
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if not insp.has_table("broadcasts"):
+        op.create_table(
+            "broadcasts",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("text", sa.Text(), nullable=False),
+            sa.Column("platform", sa.Enum("TELEGRAM", "VK", "WEB", name="platformtype")),
+            sa.Column(
+                "status",
+                sa.Enum("PENDING", "RUNNING", "PAUSED", "DONE", "CANCELLED", name="broadcaststatus"),
+                nullable=False,
+            ),
+            sa.Column("cursor", sa.Integer(), nullable=False),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("sent", sa.Integer(), nullable=False),
+            sa.Column("failed", sa.Integer(), nullable=False),
+            sa.Column("created_by", sa.Integer(), sa.ForeignKey("agents.id")),
+            sa.Column("started_at", sa.DateTime()),
+            sa.Column("finished_at", sa.DateTime()),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+
+    columns = {c["name"] for c in insp.get_columns("messages")}
+    with op.batch_alter_table("messages") as batch:
+        if "send_attempts" not in columns:
+            batch.add_column(sa.Column("send_attempts", sa.Integer(), server_default="0", nullable=False))
+        if "next_attempt_at" not in columns:
+            batch.add_column(sa.Column("next_attempt_at", sa.DateTime()))
+
+    # MySQL хранит Enum как ENUM(...) — новое значение надо добавить явно
+    if bind.dialect.name == "mysql":
+        op.alter_column(
+            "messages", "status",
+            existing_type=sa.Enum(*MESSAGE_STATUS_OLD, name="messagestatus"),
+            type_=sa.Enum(*MESSAGE_STATUS_NEW, name="messagestatus"),
+            existing_nullable=True,
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.execute("UPDATE messages SET status = 'ERROR' WHERE status = 'PENDING'")
+        op.alter_column(
+            "messages", "status",
+            existing_type=sa.Enum(*MESSAGE_STATUS_NEW, name="messagestatus"),
+            type_=sa.Enum(*MESSAGE_STATUS_OLD, name="messagestatus"),
+            existing_nullable=True,
+        )
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("next_attempt_at")
+        batch.drop_column("send_attempts")
+    op.drop_table("broadcasts")
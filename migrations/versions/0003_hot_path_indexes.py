@@ -0,0 +1,77 @@
+"""hot-path indexes: users, tickets, messages, attachments
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Индексы под запросы, которые идут на каждое входящее сообщение:
+
+    users        UNIQUE (platform, platform_id)     — get_or_create пользователя
+    tickets      (user_id, status, created_at)      — открытый тикет пользователя
+    messages     (ticket_id, id), (user_id, id)     — переписка тикета / последнее сообщение
+    attachments  (message_id)                       — вложения сообщения
+
+На MySQL индексы строятся онлайн (ALGORITHM=INPLACE, LOCK=NONE): чтение и
+запись в таблицу не блокируются. Уже существующие индексы с тем же набором
+колонок (InnoDB сам создаёт их под внешние ключи) не дублируются.
+
+Перед UNIQUE на users сливаются дубли (platform, platform_id), которые могла
+наплодить гонка в get_or_create: тикеты и сообщения переезжают на самый
+старый id, лишние строки удаляются.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index, drop_index
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # (имя, таблица, колонки, unique)
+    ("uq_users_platform_platform_id", "users", ["platform", "platform_id"], True),
+    ("ix_tickets_user_status_created", "tickets", ["user_id", "status", "created_at"], False),
+    ("ix_messages_ticket_id_id", "messages", ["ticket_id", "id"], False),
+    ("ix_messages_user_id_id", "messages", ["user_id", "id"], False),
+    ("ix_attachments_message_id", "attachments", ["message_id"], False),
+]
+
+
+def _merge_duplicate_users(bind) -> None:
+    dups = bind.execute(sa.text(
+        "SELECT platform, platform_id, MIN(id) AS keep_id FROM users "
+        "GROUP BY platform, platform_id HAVING COUNT(*) > 1"
+    )).all()
+    for platform, platform_id, keep_id in dups:
+        params = {"platform": platform, "platform_id": platform_id, "keep": keep_id}
+        others = (
+            "SELECT id FROM users WHERE platform = :platform "
+            "AND platform_id = :platform_id AND id <> :keep"
+        )
+        ids = [row[0] for row in bind.execute(sa.text(others), params)]
+        for table in ("tickets", "messages"):
+            bind.execute(
+                sa.text(f"UPDATE {table} SET user_id = :keep WHERE user_id IN :ids")
+                .bindparams(sa.bindparam("ids", expanding=True)),
+                {"keep": keep_id, "ids": ids},
+            )
+        bind.execute(
+            sa.text("DELETE FROM users WHERE id IN :ids")
+            .bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": ids},
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _merge_duplicate_users(bind)
+    for name, table, columns, unique in INDEXES:
+        create_index(name, table, columns, unique)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        drop_index(name, table)
@@ -0,0 +1,39 @@
+"""keyset-pagination indexes for ticket and message listings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Списки в админке идут по (created_at, id) с курсором. Чтобы страница
+стоила одинаково на первой и на миллионной строке, сортировка должна
+читаться прямо из индекса — с фильтром впереди:
+
+    tickets   (created_at, id)                 — список без фильтров
+    tickets   (status, created_at, id)         — фильтр по статусу
+    tickets   (assigned_to, created_at, id)    — «мои тикеты»
+    messages  (ticket_id, created_at, id)      — переписка тикета
+"""
+from migrations.online import create_index, drop_index
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_tickets_created_id", "tickets", ["created_at", "id"]),
+    ("ix_tickets_status_created_id", "tickets", ["status", "created_at", "id"]),
+    ("ix_tickets_assigned_created_id", "tickets", ["assigned_to", "created_at", "id"]),
+    ("ix_messages_ticket_created_id", "messages", ["ticket_id", "created_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        drop_index(name, table)
@@ -0,0 +1,94 @@
+"""cold archive tables for messages and attachments
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+messages_archive / attachments_archive — куда app.core.archive переносит
+переписку тикетов, закрытых больше archive_after_days назад.
+
+На MySQL обе таблицы партиционируются RANGE по TO_DAYS(created_at).
+Изначально есть только pmax (MAXVALUE); помесячные партиции архиватор
+отрезает от pmax сам перед каждым переносом (REORGANIZE PARTITION pmax),
+так что новые месяцы появляются без миграций.
+
+Плюс индекс tickets (status, closed_at) — по нему архиватор ищет тикеты.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index, drop_index
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+MESSAGE_DIRECTION = ("INCOMING", "OUTGOING")
+MESSAGE_STATUS = ("PENDING", "SENT", "DELIVERED", "READ", "ERROR")
+ATTACHMENT_TYPE = ("PHOTO", "VIDEO", "AUDIO", "DOCUMENT", "STICKER", "VOICE", "LOCATION", "CONTACT")
+
+PARTITION_BY_MONTH = (
+    "ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(created_at)) "
+    "(PARTITION pmax VALUES LESS THAN MAXVALUE)"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if not insp.has_table("messages_archive"):
+        op.create_table(
+            "messages_archive",
+            sa.Column("id", sa.Integer(), nullable=False, autoincrement=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("ticket_id", sa.Integer()),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("direction", sa.Enum(*MESSAGE_DIRECTION, name="messagedirection"), nullable=False),
+            sa.Column("status", sa.Enum(*MESSAGE_STATUS, name="messagestatus")),
+            sa.Column("content", sa.Text()),
+            sa.Column("is_ai_response", sa.Boolean(), nullable=False),
+            sa.Column("confidence_score", sa.Float()),
+            sa.Column("platform_message_id", sa.String(100)),
+            sa.Column("send_attempts", sa.Integer(), server_default="0", nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime()),
+            sa.Column("archived_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.PrimaryKeyConstraint("id", "created_at"),
+        )
+        op.create_index(
+            "ix_messages_archive_ticket_created_id", "messages_archive",
+            ["ticket_id", "created_at", "id"],
+        )
+        op.create_index("ix_messages_archive_user_id_id", "messages_archive", ["user_id", "id"])
+        if bind.dialect.name == "mysql":
+            op.execute(PARTITION_BY_MONTH.format(table="messages_archive"))
+
+    if not insp.has_table("attachments_archive"):
+        op.create_table(
+            "attachments_archive",
+            sa.Column("id", sa.Integer(), nullable=False, autoincrement=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("message_id", sa.Integer(), nullable=False),
+            sa.Column("attachment_type", sa.Enum(*ATTACHMENT_TYPE, name="attachmenttype"), nullable=False),
+            sa.Column("file_id", sa.String(500), nullable=False),
+            sa.Column("file_url", sa.String(500)),
+            sa.Column("file_size", sa.Integer()),
+            sa.Column("mime_type", sa.String(100)),
+            sa.Column("caption", sa.Text()),
+            sa.PrimaryKeyConstraint("id", "created_at"),
+        )
+        op.create_index("ix_attachments_archive_message_id", "attachments_archive", ["message_id"])
+        if bind.dialect.name == "mysql":
+            op.execute(PARTITION_BY_MONTH.format(table="attachments_archive"))
+
+    create_index("ix_tickets_status_closed", "tickets", ["status", "closed_at"])
+
+
+def downgrade() -> None:
+    drop_index("ix_tickets_status_closed", "tickets")
+    op.drop_table("attachments_archive")
+    op.drop_table("messages_archive")
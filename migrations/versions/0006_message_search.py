@@ -0,0 +1,69 @@
+"""full-text search over messages.content
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+MySQL: FULLTEXT-индекс ft_messages_content с парсером ngram — стандартный
+парсер режет по пробелам и не находит части ников, почт и дат, а ngram
+индексирует 2-граммы (ngram_token_size) и одинаково работает с кириллицей.
+Построение идёт INPLACE, но LOCK=NONE для FULLTEXT MySQL не разрешает:
+на время сборки запись в messages ждёт (чтение — нет). На большой таблице
+катить в тихое окно.
+
+Остальные диалекты (SQLite): таблицы инвертированного индекса, их
+наполняет app.core.search. На MySQL они остаются пустыми.
+
+Плюс messages (created_at, id): выдача идёт «новые сверху», и при частых
+словах поиск читает сообщения с конца по этому индексу до limit совпадений.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index, drop_index, existing_indexes
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if not insp.has_table("message_search_terms"):
+        op.create_table(
+            "message_search_terms",
+            sa.Column("term", sa.String(64), nullable=False),
+            sa.Column("message_id", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("term", "message_id"),
+        )
+        op.create_index(
+            "ix_message_search_terms_message_id", "message_search_terms", ["message_id"]
+        )
+
+    if not insp.has_table("search_index_state"):
+        op.create_table(
+            "search_index_state",
+            sa.Column("name", sa.String(32), primary_key=True),
+            sa.Column("last_id", sa.Integer(), nullable=False),
+        )
+
+    create_index("ix_messages_created_id", "messages", ["created_at", "id"])
+
+    if bind.dialect.name == "mysql" and "ft_messages_content" not in existing_indexes(bind, "messages"):
+        op.execute(
+            "ALTER TABLE messages ADD FULLTEXT INDEX ft_messages_content (content) "
+            "WITH PARSER ngram, ALGORITHM=INPLACE, LOCK=SHARED"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.execute("ALTER TABLE messages DROP INDEX ft_messages_content")
+    drop_index("ix_messages_created_id", "messages")
+    op.drop_table("search_index_state")
+    op.drop_table("message_search_terms")
@@ -0,0 +1,68 @@
+"""ticket rollups for the dashboard, tickets.intent
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+ticket_rollups — почасовые и подневные агрегаты (app.core.rollups),
+дашборд читает только их.
+
+tickets.intent — интент первого сообщения, разрез статистики.
+Индексы tickets (closed_at) и (first_response_at) нужны пересчёту свежих
+бакетов: он выбирает события за последние часы по этим колонкам.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index, drop_index
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_tickets_closed_at", "tickets", ["closed_at"]),
+    ("ix_tickets_first_response_at", "tickets", ["first_response_at"]),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    columns = {c["name"] for c in insp.get_columns("tickets")}
+    if "intent" not in columns:
+        with op.batch_alter_table("tickets") as batch:
+            batch.add_column(sa.Column("intent", sa.String(32)))
+
+    for name, table, cols in INDEXES:
+        create_index(name, table, cols)
+
+    if not insp.has_table("ticket_rollups"):
+        op.create_table(
+            "ticket_rollups",
+            sa.Column("period", sa.String(8), nullable=False),
+            sa.Column("bucket", sa.DateTime(), nullable=False),
+            sa.Column("platform", sa.String(16), nullable=False),
+            sa.Column("category", sa.String(16), nullable=False),
+            sa.Column("intent", sa.String(32), nullable=False),
+            sa.Column("tickets_created", sa.Integer(), nullable=False),
+            sa.Column("tickets_escalated", sa.Integer(), nullable=False),
+            sa.Column("tickets_closed", sa.Integer(), nullable=False),
+            sa.Column("first_responses", sa.Integer(), nullable=False),
+            sa.Column("first_response_seconds", sa.BigInteger(), nullable=False),
+            sa.Column("messages_in", sa.Integer(), nullable=False),
+            sa.Column("messages_out", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("period", "bucket", "platform", "category", "intent"),
+        )
+        op.create_index("ix_ticket_rollups_period_bucket", "ticket_rollups", ["period", "bucket"])
+
+
+def downgrade() -> None:
+    op.drop_table("ticket_rollups")
+    for name, table, _ in reversed(INDEXES):
+        drop_index(name, table)
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_column("intent")
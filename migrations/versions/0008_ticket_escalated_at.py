@@ -0,0 +1,40 @@
+"""tickets.escalated_at for escalation statistics
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+Эскалация уже открытого тикета происходит позже его создания, поэтому
+tickets_escalated в ticket_rollups считается по моменту эскалации, а не
+по created_at. Для старых эскалированных тикетов момент неизвестен —
+берём created_at (так их и считала прежняя статистика).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index, drop_index
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("tickets")}
+    if "escalated_at" not in columns:
+        with op.batch_alter_table("tickets") as batch:
+            batch.add_column(sa.Column("escalated_at", sa.DateTime()))
+        op.execute(
+            "UPDATE tickets SET escalated_at = created_at "
+            "WHERE is_escalated = 1 AND escalated_at IS NULL"
+        )
+
+    create_index("ix_tickets_escalated_at", "tickets", ["escalated_at"])
+
+
+def downgrade() -> None:
+    drop_index("ix_tickets_escalated_at", "tickets")
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_column("escalated_at")
@@ -0,0 +1,57 @@
+"""SQLite: AUTOINCREMENT on messages and attachments
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+Архив (app.core.archive) переносит строки с теми же id и удаляет их из
+горячих таблиц. Без AUTOINCREMENT SQLite выдаёт новой строке max(id) + 1
+по текущему содержимому таблицы: если в архив ушли самые новые строки,
+их id достанутся новым сообщениям — и совпадут с архивными (история
+тикета, поиск). С AUTOINCREMENT счётчик хранится в sqlite_sequence и
+назад не идёт; здесь он ставится не ниже максимального id в архиве.
+
+На MySQL ревизия пустая: счётчик InnoDB AUTO_INCREMENT сохраняется между
+рестартами начиная с MySQL 8.0 (MariaDB 10.2.4). На более старых серверах
+после рестарта он снова становится MAX(id) + 1 и id архивированных строк
+переиспользуются — поэтому архиватор там не запускается
+(app.core.archive.persistent_auto_increment).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+TABLES = (("messages", "messages_archive"), ("attachments", "attachments_archive"))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+
+    for table, archive in TABLES:
+        with op.batch_alter_table(
+                table, recreate="always", table_kwargs={"sqlite_autoincrement": True}
+        ) as batch:
+            pass
+        top = bind.execute(sa.text(
+            f"SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM {table} "
+            f"UNION ALL SELECT MAX(id) FROM {archive})"
+        )).scalar()
+        if top:
+            op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+            op.execute(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('{table}', {int(top)})")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    for table, _ in TABLES:
+        with op.batch_alter_table(table, recreate="always") as batch:
+            pass
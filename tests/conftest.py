@@ -0,0 +1,86 @@
+# tests/conftest.py
+"""
+Общая обвязка тестов.
+
+Настройки приложения читаются при импорте app.core.config, поэтому
+окружение задаётся здесь, до первого импорта app. База — отдельный
+файл SQLite во временном каталоге, схема накатывается миграциями.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="support-bot-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_TMP}/test.db",
+    LOG_FILE=os.path.join(_TMP, "app.log"),
+)
+os.environ.pop("DATABASE_REPLICA_URL", None)
+for key, value in {
+    "TELEGRAM_BOT_TOKEN": "123:test",
+    "VK_GROUP_TOKEN": "test",
+    "VK_GROUP_ID": "1",
+    "MYSQL_HOST": "localhost",
+    "MYSQL_PORT": "3306",
+    "MYSQL_USER": "test",
+    "MYSQL_PASSWORD": "test",
+    "MYSQL_DATABASE": "test",
+    "REDIS_URL": "redis://localhost:6379/0",
+    "JWT_SECRET_KEY": "test",
+    "FIRST_ADMIN_EMAIL": "admin@example.com",
+    "FIRST_ADMIN_PASSWORD": "test",
+    "FIRST_ADMIN_NAME": "Admin",
+    "APP_NAME": "support-bot-tests",
+    "APP_VERSION": "test",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+def run(coro):
+    """
+    asyncio.run + закрытие соединений движка в том же цикле:
+    соединения aiosqlite привязаны к циклу, в котором открыты.
+    """
+    from app.core.database import engine
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    """Схема тестовой базы до head (один раз на прогон)."""
+    from app.core.database import init_models
+
+    run(init_models())
+
+
+async def create_ticket(platform_id: str = "1", **fields):
+    """Открытый тикет пользователя Telegram (пользователь создаётся при первом вызове)."""
+    from sqlalchemy import select
+
+    from app.core.database import async_session_maker
+    from app.models.ticket import Ticket
+    from app.models.user import PlatformType, User
+
+    async with async_session_maker() as db:
+        user = await db.scalar(
+            select(User).where(User.platform == PlatformType.TELEGRAM, User.platform_id == platform_id)
+        )
+        if user is None:
+            user = User(platform=PlatformType.TELEGRAM, platform_id=platform_id)
+            db.add(user)
+            await db.flush()
+        ticket = Ticket(user_id=user.id, platform=PlatformType.TELEGRAM, title="test", **fields)
+        db.add(ticket)
+        await db.commit()
+        return ticket
@@ -0,0 +1,99 @@
+# tests/test_activity.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.core import activity
+from app.core.activity import LastActiveBuffer
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.crud.user import user_crud
+from app.models.user import PlatformType, User
+from conftest import run
+
+LONG_AGO = datetime(2020, 1, 1)
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+async def _users(*platform_ids) -> list:
+    ids = []
+    async with async_session_maker() as db:
+        for platform_id in platform_ids:
+            ids.append(await user_crud.upsert(
+                db, platform=PlatformType.TELEGRAM, platform_id=platform_id, touch=False
+            ))
+        await db.execute(
+            update(User).where(User.id.in_(ids)).values(updated_at=LONG_AGO, last_active=None)
+        )
+        await db.commit()
+    return ids
+
+
+async def _get(user_id: int) -> User:
+    async with async_session_maker() as db:
+        return await user_crud.get(db, user_id)
+
+
+def test_touches_are_coalesced_into_one_write(migrated_db, monkeypatch):
+    monkeypatch.setattr(settings, "last_active_flush_batch", 2)
+    buffer = LastActiveBuffer()
+
+    async def main():
+        a, b, c = await _users("activity-a", "activity-b", "activity-c")
+        buffer.touch(a, NOW)
+        buffer.touch(a, NOW + timedelta(seconds=5))
+        buffer.touch(a, NOW + timedelta(seconds=1))   # опоздавшее — не откатывает время
+        buffer.touch(b, NOW)
+        buffer.touch(c, NOW + timedelta(seconds=2))
+        flushed = await buffer.flush()
+        again = await buffer.flush()
+        return flushed, again, [await _get(uid) for uid in (a, b, c)]
+
+    flushed, again, (a, b, c) = run(main())
+
+    assert (flushed, again) == (3, 0)
+    assert a.last_active == NOW + timedelta(seconds=5)
+    assert b.last_active == NOW
+    assert c.last_active == NOW + timedelta(seconds=2)
+
+
+def test_flush_does_not_touch_updated_at(migrated_db):
+    buffer = LastActiveBuffer()
+
+    async def main():
+        (user_id,) = await _users("activity-d")
+        buffer.touch(user_id, NOW)
+        await buffer.flush()
+        return await _get(user_id)
+
+    user = run(main())
+    assert user.last_active == NOW
+    assert user.updated_at == LONG_AGO
+
+
+def test_failed_flush_keeps_pending_touches(migrated_db, monkeypatch):
+    buffer = LastActiveBuffer()
+
+    class Broken:
+        async def __aenter__(self):
+            raise ConnectionError("db down")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def main():
+        (user_id,) = await _users("activity-e")
+        buffer.touch(user_id, NOW)
+        with monkeypatch.context() as m:
+            m.setattr(activity, "async_session_maker", Broken)
+            with pytest.raises(ConnectionError):
+                await buffer.flush()
+        # пока база лежала, пришло более свежее
+        buffer.touch(user_id, NOW + timedelta(minutes=1))
+        flushed = await buffer.flush()
+        return flushed, await _get(user_id)
+
+    flushed, user = run(main())
+    assert flushed == 1
+    assert user.last_active == NOW + timedelta(minutes=1)
@@ -0,0 +1,344 @@
+# tests/test_assignment.py
+import itertools
+
+import pytest
+from sqlalchemy import select, update
+
+from app.api.v1.endpoints import tickets as tickets_api
+from app.core.assignment import AssignmentEngine
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.agent import Agent, AgentRole
+from app.models.ticket import Ticket, TicketStatus
+from conftest import create_ticket, run
+
+_emails = itertools.count()
+
+
+class FakeRedis:
+    """sorted set + pipeline — ровно то, что нужно обмену присутствием."""
+
+    def __init__(self):
+        self.zsets = {}
+        self.fail = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def zadd(self, key, mapping):
+        self.ops.append(lambda z: z.setdefault(key, {}).update(mapping) or len(mapping))
+
+    def zremrangebyscore(self, key, low, high):
+        def op(z):
+            members = z.get(key, {})
+            stale = [m for m, score in members.items() if score <= high]
+            for m in stale:
+                del members[m]
+            return len(stale)
+        self.ops.append(op)
+
+    def zrange(self, key, start, end):
+        def op(z):
+            members = z.get(key, {})
+            return [m.encode() for m in sorted(members, key=members.get)]
+        self.ops.append(op)
+
+    async def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("redis down")
+        return [op(self.redis.zsets) for op in self.ops]
+
+
+@pytest.fixture
+def engine(migrated_db, monkeypatch):
+    monkeypatch.setattr(settings, "assign_enabled", True)
+    monkeypatch.setattr(settings, "push_backend", "memory")
+
+    async def clean():
+        # тикеты других тестов не должны попадать в проходы движка
+        async with async_session_maker() as db:
+            await db.execute(update(Ticket).values(status=TicketStatus.CLOSED))
+            await db.commit()
+
+    run(clean())
+    return AssignmentEngine()
+
+
+async def _agent(role=AgentRole.SUPPORT):
+    async with async_session_maker() as db:
+        agent = Agent(
+            email=f"assign-{next(_emails)}@example.com",
+            password_hash="x",
+            full_name="Agent",
+            role=role,
+        )
+        db.add(agent)
+        await db.commit()
+        return agent
+
+
+async def _assignees(ticket_ids):
+    async with async_session_maker() as db:
+        rows = await db.execute(
+            select(Ticket.id, Ticket.assigned_to).where(Ticket.id.in_(ticket_ids))
+        )
+        return dict(rows.all())
+
+
+async def _assign(engine, ticket):
+    async with async_session_maker() as db:
+        return await engine.assign(db, ticket)
+
+
+def test_new_tickets_go_to_least_loaded_agent(engine):
+    async def main():
+        a, b, c = [await _agent() for _ in range(3)]
+        for agent in (a, b, c):
+            engine.agent_connected(agent)
+
+        first = [await _assign(engine, await create_ticket("assign")) for _ in range(3)]
+        # у всех по тикету; недавний ответ делает агента загруженнее остальных
+        engine.note_reply(a.id)
+        engine.note_reply(b.id)
+        fourth = await _assign(engine, await create_ticket("assign"))
+        return (a, b, c), first, fourth
+
+    (a, b, c), first, fourth = run(main())
+
+    assert sorted(first) == sorted([a.id, b.id, c.id])
+    assert fourth == c.id
+    loads = {s["agent_id"]: s["open_tickets"] for s in engine.snapshot()}
+    assert loads == {a.id: 1, b.id: 1, c.id: 2}
+
+
+def test_escalated_ticket_prefers_moderator(engine):
+    async def main():
+        support = await _agent(AgentRole.SUPPORT)
+        moderator = await _agent(AgentRole.MODERATOR)
+        engine.agent_connected(support)
+        engine.agent_connected(moderator)
+
+        plain = await _assign(engine, await create_ticket("assign"))
+        escalated = await _assign(engine, await create_ticket("assign", is_escalated=True))
+
+        # эскалация уже назначенного тикета — переход к модератору
+        ticket = await create_ticket("assign", assigned_to=support.id)
+        ticket.is_escalated = True
+        moved = await _assign(engine, ticket)
+        return support, moderator, plain, escalated, moved
+
+    support, moderator, plain, escalated, moved = run(main())
+
+    assert plain == support.id
+    assert escalated == moderator.id
+    assert moved == moderator.id
+
+
+def test_disconnected_agent_gets_no_new_tickets(engine):
+    async def main():
+        a, b = await _agent(), await _agent()
+        engine.agent_connected(a)
+        engine.agent_connected(b)
+        engine.note_reply(b.id)
+        engine.agent_disconnected(a.id)
+        return a, b, [await _assign(engine, await create_ticket("assign")) for _ in range(3)]
+
+    a, b, assigned = run(main())
+
+    assert assigned == [b.id, b.id, b.id]
+
+
+def test_offline_agent_tickets_are_rebalanced_after_grace(engine, monkeypatch):
+    monkeypatch.setattr(settings, "assign_offline_grace", 0.0)
+
+    async def main():
+        a, b = await _agent(), await _agent()
+        engine.agent_connected(a)
+        engine.agent_connected(b)
+        tickets = [await create_ticket("assign", assigned_to=a.id) for _ in range(2)]
+        ids = [t.id for t in tickets]
+
+        await engine.tick()
+        before = await _assignees(ids)
+
+        engine.agent_disconnected(a.id)
+        await engine.tick()
+        return a, b, before, await _assignees(ids)
+
+    a, b, before, after = run(main())
+
+    assert set(before.values()) == {a.id}
+    assert set(after.values()) == {b.id}
+    loads = {s["agent_id"]: s["open_tickets"] for s in engine.snapshot()}
+    assert loads == {a.id: 0, b.id: 2}
+
+
+def test_rebalance_waits_for_grace_and_releases_without_agents(engine, monkeypatch):
+    async def main():
+        a = await _agent()
+        engine.agent_connected(a)
+        ticket = await create_ticket("assign", assigned_to=a.id)
+        await engine.tick()
+
+        engine.agent_disconnected(a.id)
+        monkeypatch.setattr(settings, "assign_offline_grace", 3600.0)
+        await engine.tick()
+        within_grace = await _assignees([ticket.id])
+
+        monkeypatch.setattr(settings, "assign_offline_grace", 0.0)
+        await engine.tick()
+        return a, ticket.id, within_grace, await _assignees([ticket.id])
+
+    a, ticket_id, within_grace, released = run(main())
+
+    assert within_grace == {ticket_id: a.id}
+    assert released == {ticket_id: None}
+
+
+def test_sweep_assigns_waiting_tickets_escalated_first(engine, monkeypatch):
+    monkeypatch.setattr(settings, "assign_sweep_batch", 2)
+
+    async def main():
+        plain = [await create_ticket("assign") for _ in range(3)]
+        escalated = await create_ticket("assign", is_escalated=True)
+        ids = [t.id for t in plain] + [escalated.id]
+
+        # никого нет — проход ничего не трогает
+        assert await engine.sweep() == 0
+
+        moderator = await _agent(AgentRole.MODERATOR)
+        engine.agent_connected(moderator)
+        first = await engine.sweep()
+        after_first = await _assignees(ids)
+        await engine.tick()
+        return moderator, escalated.id, first, after_first, await _assignees(ids)
+
+    moderator, escalated_id, first, after_first, after_tick = run(main())
+
+    assert first == 2
+    assert after_first[escalated_id] == moderator.id
+    assert set(after_tick.values()) == {moderator.id}
+
+
+def test_agent_online_on_another_worker_keeps_tickets(engine, monkeypatch):
+    monkeypatch.setattr(settings, "push_backend", "redis")
+    monkeypatch.setattr(settings, "assign_offline_grace", 0.0)
+    redis = FakeRedis()
+    other = AssignmentEngine()
+    engine._redis = other._redis = redis
+
+    async def main():
+        a = await _agent()
+        ticket = await create_ticket("assign", assigned_to=a.id)
+
+        # вкладка на этом воркере закрыта, на другом — открыта
+        engine.agent_connected(a)
+        other.agent_connected(a)
+        await other.tick()
+        engine.agent_disconnected(a.id)
+        await engine.tick()
+        kept = await _assignees([ticket.id])
+
+        # отметки истекли, второй воркер агента тоже не видит
+        other.agent_disconnected(a.id)
+        redis.zsets.clear()
+        await engine.tick()
+        return a, ticket.id, kept, await _assignees([ticket.id])
+
+    a, ticket_id, kept, released = run(main())
+
+    assert kept == {ticket_id: a.id}
+    assert released == {ticket_id: None}
+
+
+def test_agent_from_another_worker_is_eligible(engine, monkeypatch):
+    monkeypatch.setattr(settings, "push_backend", "redis")
+    redis = FakeRedis()
+    other = AssignmentEngine()
+    engine._redis = other._redis = redis
+
+    async def main():
+        moderator = await _agent(AgentRole.MODERATOR)
+        other.agent_connected(moderator)
+        await other.tick()
+        await engine.tick()
+        return moderator, await _assign(engine, await create_ticket("assign"))
+
+    moderator, assigned = run(main())
+
+    assert assigned == moderator.id
+
+
+def test_rebalance_skipped_while_presence_unknown(engine, monkeypatch):
+    monkeypatch.setattr(settings, "push_backend", "redis")
+    monkeypatch.setattr(settings, "assign_offline_grace", 0.0)
+    redis = FakeRedis()
+    engine._redis = redis
+
+    async def main():
+        a = await _agent()
+        engine.agent_connected(a)
+        ticket = await create_ticket("assign", assigned_to=a.id)
+        await engine.tick()
+
+        engine.agent_disconnected(a.id)
+        redis.zsets.clear()
+        redis.fail = True
+        await engine.tick()
+        return a, ticket.id, await _assignees([ticket.id])
+
+    a, ticket_id, after = run(main())
+
+    assert after == {ticket_id: a.id}
+
+
+def test_reply_does_not_steal_ticket_assigned_concurrently(engine, monkeypatch):
+    async def main():
+        replier, owner = await _agent(), await _agent()
+        ticket = await create_ticket("assign")
+        original_get = tickets_api.ticket_crud.get
+
+        async def get_then_assign(db, ticket_id):
+            obj = await original_get(db, ticket_id)
+            # движок назначения успел между чтением и записью ответа
+            async with async_session_maker() as other_db:
+                await other_db.execute(
+                    update(Ticket).where(Ticket.id == ticket_id).values(assigned_to=owner.id)
+                )
+                await other_db.commit()
+            return obj
+
+        monkeypatch.setattr(tickets_api.ticket_crud, "get", get_then_assign)
+        async with async_session_maker() as db:
+            result = await tickets_api.agent_reply(
+                ticket.id, tickets_api.AgentReply(text="ответ"), db=db, current_agent=replier
+            )
+        return owner, ticket.id, result, await _assignees([ticket.id])
+
+    owner, ticket_id, result, after = run(main())
+
+    assert result["assigned_to"] == owner.id
+    assert result["ticket_status"] == TicketStatus.IN_PROGRESS.value
+    assert after == {ticket_id: owner.id}
+
+
+def test_reply_claims_unassigned_ticket(engine):
+    async def main():
+        replier = await _agent()
+        ticket = await create_ticket("assign")
+        async with async_session_maker() as db:
+            result = await tickets_api.agent_reply(
+                ticket.id, tickets_api.AgentReply(text="ответ"), db=db, current_agent=replier
+            )
+        return replier, ticket.id, result, await _assignees([ticket.id])
+
+    replier, ticket_id, result, after = run(main())
+
+    assert result["assigned_to"] == replier.id
+    assert after == {ticket_id: replier.id}
@@ -0,0 +1,197 @@
+# tests/test_context_store.py
+import asyncio
+import time
+
+from app.bot.context import ContextStore, UserContext
+from app.bot.context_backend import LocalContextBackend
+
+
+class CountingBackend(LocalContextBackend):
+    def __init__(self):
+        super().__init__()
+        self.load_calls = []
+        self.save_calls = []
+
+    async def load_many(self, user_ids):
+        self.load_calls.append(list(user_ids))
+        return await super().load_many(user_ids)
+
+    async def save_many(self, items, origin):
+        self.save_calls.append(dict(items))
+        await super().save_many(items, origin)
+
+
+def test_dump_load_roundtrip():
+    ctx = UserContext()
+    ctx.state = "waiting_close_confirm"
+    ctx.last_intent = "close_ticket"
+    ctx.operator_mode = True
+    ctx.need_specialist = True
+    for i in range(25):
+        ctx.push_history(f"msg {i}")
+    ctx.data_buffer["step"] = 2
+
+    restored = UserContext.load(ctx.dump())
+
+    assert restored.state == ctx.state
+    assert restored.last_intent == ctx.last_intent
+    assert restored.operator_mode and restored.need_specialist
+    assert list(restored.history) == list(ctx.history)
+    assert len(restored.history) == 20
+    assert restored.data_buffer == {"step": 2}
+
+
+def test_shared_context_between_processes():
+    async def main():
+        backend = LocalContextBackend()
+        first, second = ContextStore(), ContextStore()
+        await first.attach(backend)
+        await second.attach(backend)
+
+        ctx = await first.load(1)
+        ctx.state = "unlink_confirm"
+        await first.save(1, ctx)
+
+        seen = await second.load(1)
+        state_before = seen.state
+
+        # запись второго процесса выбивает копию из near-cache первого
+        seen.state = "idle"
+        seen.operator_mode = True
+        await second.save(1, seen)
+        evicted = 1 not in first
+        reloaded = await first.load(1)
+
+        await first.close()
+        await second.close()
+        return state_before, evicted, reloaded
+
+    state_before, evicted, reloaded = asyncio.run(main())
+    assert state_before == "unlink_confirm"
+    assert evicted
+    assert reloaded.state == "idle" and reloaded.operator_mode
+
+
+def test_own_save_keeps_near_cache():
+    async def main():
+        store = ContextStore()
+        await store.attach(LocalContextBackend())
+        ctx = await store.load(7)
+        await store.save(7, ctx)
+        kept = store.peek(7) is ctx
+        await store.close()
+        return kept
+
+    assert asyncio.run(main())
+
+
+def test_concurrent_loads_share_one_backend_call():
+    async def main():
+        backend = CountingBackend()
+        store = ContextStore()
+        await store.attach(backend, max_batch=64, max_wait=0.01)
+        contexts = await asyncio.gather(*(store.load(uid) for uid in [1, 2, 3, 2, 1]))
+        await store.close()
+        return backend.load_calls, contexts
+
+    load_calls, contexts = asyncio.run(main())
+    assert len(load_calls) == 1
+    assert sorted(load_calls[0]) == [1, 2, 3]
+    assert contexts[0] is contexts[4] and contexts[1] is contexts[3]
+
+
+def test_saves_of_one_user_are_coalesced():
+    async def main():
+        backend = CountingBackend()
+        store = ContextStore()
+        await store.attach(backend, max_wait=0.01)
+        ctx = await store.load(5)
+        first = UserContext.load(ctx.dump())
+        ctx.state = "final"
+        await asyncio.gather(store.save(5, first), store.save(5, ctx))
+        await store.close()
+        return backend
+
+    backend = asyncio.run(main())
+    assert len(backend.save_calls) == 1
+    assert UserContext.load(backend.data[5]).state == "final"
+
+
+def test_idle_contexts_expire():
+    store = ContextStore(ttl=10.0, tick=1.0)
+    store.get(1)
+    store.get(2)
+
+    assert store.expire(time.monotonic() + 5.0) == 0
+    assert store.expire(time.monotonic() + 12.0) == 2
+    assert len(store) == 0
+
+
+def test_operator_mode_outlives_ttl():
+    store = ContextStore(ttl=10.0, operator_ttl=100.0, tick=1.0)
+    store.get(1).operator_mode = True
+    store.get(2)
+    # простой оператора считается по last_interaction: сдвигаем его вместе с часами
+    store.peek(1).last_interaction -= 12.0
+
+    assert store.expire(time.monotonic() + 12.0) == 1
+    assert 1 in store and 2 not in store
+    assert store.expire(time.monotonic() + 80.0) == 0
+    store.peek(1).last_interaction -= 90.0
+    assert store.expire(time.monotonic() + 102.0) == 1
+    assert 1 not in store
+
+
+def test_access_extends_ttl():
+    store = ContextStore(ttl=10.0, tick=1.0)
+    store.get(1)
+    store._wheel.schedule(1, time.monotonic() + 20.0)  # как будто get() через 10 с
+
+    assert store.expire(time.monotonic() + 12.0) == 0
+    assert 1 in store
+
+
+def test_max_resident_evicts_least_recent():
+    store = ContextStore(max_resident=3)
+    for uid in (1, 2, 3):
+        store.get(uid)
+    store.get(1)
+    store.get(4)
+
+    assert list(store) == [3, 1, 4]
+
+
+def test_unavailable_backend_falls_back_to_local_context():
+    class BrokenBackend(LocalContextBackend):
+        async def load_many(self, user_ids):
+            raise ConnectionError("redis down")
+
+        async def save_many(self, items, origin):
+            raise ConnectionError("redis down")
+
+    async def main():
+        store = ContextStore()
+        await store.attach(BrokenBackend())
+        ctx = await store.load(9)
+        ctx.state = "local"
+        await store.save(9, ctx)
+        result = (await store.load(9)).state
+        await store.close()
+        return result
+
+    assert asyncio.run(main()) == "local"
+
+
+def test_backend_must_implement_the_interface():
+    from app.bot.context_backend import ContextBackend
+
+    class Incomplete(ContextBackend):
+        async def load_many(self, user_ids):
+            return []
+
+    try:
+        Incomplete()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("abstract methods are not enforced")
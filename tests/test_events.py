@@ -0,0 +1,167 @@
+# tests/test_events.py
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+from app.api.v1.endpoints import events as events_api
+from app.core.config import settings
+from app.core.events import EventHub, event_hub, valid_topic
+
+
+@pytest.fixture
+def small_buffer(monkeypatch):
+    monkeypatch.setattr(settings, "push_buffer_size", 4)
+    monkeypatch.setattr(settings, "push_max_topics", 3)
+    monkeypatch.setattr(settings, "push_send_timeout", 0.2)
+    monkeypatch.setattr(settings, "push_heartbeat", 5.0)
+
+
+def test_valid_topics():
+    assert valid_topic("queue") and valid_topic("queue:TELEGRAM") and valid_topic("ticket:12")
+    assert not valid_topic("queue:ICQ") and not valid_topic("ticket:x") and not valid_topic("all")
+
+
+def test_event_reaches_each_subscriber_once(small_buffer):
+    async def main():
+        hub = EventHub()
+        everything = hub.subscribe(["queue", "queue:VK", "ticket:7"])
+        vk = hub.subscribe(["queue:VK"])
+        telegram = hub.subscribe(["queue:TELEGRAM"])
+        other = hub.subscribe(["ticket:8"])
+
+        hub.publish("message.new", ticket_id=7, platform="VK", data={"id": 1})
+        return [sub.queue.qsize() for sub in (everything, vk, telegram, other)], everything.queue.get_nowait()
+
+    sizes, payload = asyncio.run(main())
+    assert sizes == [1, 1, 0, 0]
+    event = json.loads(payload)
+    assert (event["type"], event["ticket_id"], event["platform"], event["data"]) == ("message.new", 7, "VK", {"id": 1})
+
+
+def test_topics_per_connection_are_capped(small_buffer):
+    async def main():
+        hub = EventHub()
+        sub = hub.subscribe(["ticket:1", "ticket:2", "ticket:3", "ticket:4"])
+        hub.update(sub, remove=["ticket:1"], add=["queue"])
+        return sub.topics
+
+    assert asyncio.run(main()) == {"ticket:2", "ticket:3", "queue"}
+
+
+def test_slow_consumer_is_dropped_and_buffer_released(small_buffer):
+    async def main():
+        hub = EventHub()
+        slow = hub.subscribe(["queue"])
+        fast = hub.subscribe(["queue"])
+        for i in range(6):
+            hub.publish("ticket.updated", ticket_id=i)
+            fast.queue.get_nowait()   # этот читает
+        # накопленное медленного выброшено, в очереди только «закрыто»
+        return slow.closed, slow.queue.qsize(), await slow.get(0.1), fast.closed, len(hub._subs)
+
+    assert asyncio.run(main()) == (True, 1, None, False, 1)
+
+
+class FakeWebSocket:
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.client_state = WebSocketState.CONNECTED
+        self.sent = []
+        self.closed_with = None
+        self.incoming: asyncio.Queue = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.stalled:
+            await asyncio.sleep(3600)   # клиент не читает, окно TCP забито
+        self.sent.append(json.loads(text))
+
+    async def receive_text(self):
+        item = await self.incoming.get()
+        if item is None:
+            raise WebSocketDisconnect(1000)
+        return item
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = type("Agent", (), {"id": 99, "is_active": True})()
+
+    async def authenticate(token):
+        return agent if token == "good" else None
+
+    monkeypatch.setattr(events_api, "_authenticate", authenticate)
+    monkeypatch.setattr(events_api.assignment_engine, "agent_connected", lambda a: None)
+    monkeypatch.setattr(events_api.assignment_engine, "agent_disconnected", lambda agent_id: None)
+    return agent
+
+
+def test_stalled_websocket_is_closed_with_1013(small_buffer, agent):
+    async def main():
+        ws = FakeWebSocket(stalled=True)
+        conn = asyncio.create_task(events_api.events_ws(ws, token="good", topic=["ticket:501"]))
+        await asyncio.sleep(0.05)
+        event_hub.publish("message.new", ticket_id=501)
+        await asyncio.wait_for(conn, timeout=2.0)
+        return ws.closed_with, [s for s in event_hub._subs if "ticket:501" in s.topics]
+
+    code, left = asyncio.run(main())
+    assert code == 1013
+    assert left == []
+
+
+def test_overflowing_websocket_is_closed_with_1013(small_buffer, agent, monkeypatch):
+    # отправка не виснет, но медленнее потока событий
+    monkeypatch.setattr(settings, "push_send_timeout", 5.0)
+
+    async def main():
+        ws = FakeWebSocket(stalled=True)
+        conn = asyncio.create_task(events_api.events_ws(ws, token="good", topic=["ticket:502"]))
+        await asyncio.sleep(0.05)
+        for _ in range(settings.push_buffer_size + 2):
+            event_hub.publish("message.new", ticket_id=502)
+        # буфер переполнен — подписку сняли сразу, не дожидаясь таймаута отправки
+        dropped = not [s for s in event_hub._subs if "ticket:502" in s.topics]
+        conn.cancel()
+        try:
+            await conn
+        except asyncio.CancelledError:
+            pass
+        return dropped
+
+    assert asyncio.run(main())
+
+
+def test_client_commands_and_disconnect(small_buffer, agent):
+    async def main():
+        ws = FakeWebSocket()
+        conn = asyncio.create_task(events_api.events_ws(ws, token="good", topic=["ticket:503"]))
+        await asyncio.sleep(0.05)
+        await ws.incoming.put(json.dumps({"subscribe": ["ticket:504", "bogus"], "unsubscribe": ["ticket:503"]}))
+        await asyncio.sleep(0.05)
+        event_hub.publish("message.new", ticket_id=503)
+        event_hub.publish("message.new", ticket_id=504)
+        await asyncio.sleep(0.05)
+        await ws.incoming.put(None)
+        await asyncio.wait_for(conn, timeout=2.0)
+        return ws
+
+    ws = asyncio.run(main())
+    assert ws.sent[0] == {"type": "subscribed", "topics": ["ticket:504"]}
+    assert [e["ticket_id"] for e in ws.sent[1:]] == [504]
+    # клиент ушёл сам — 1013 не шлём
+    assert ws.closed_with is None
+
+
+def test_bad_token_is_rejected(agent):
+    ws = FakeWebSocket()
+    asyncio.run(events_api.events_ws(ws, token="bad", topic=["queue"]))
+    assert ws.closed_with == 1008
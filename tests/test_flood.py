@@ -0,0 +1,100 @@
+# tests/test_flood.py
+import time
+
+from app.bot.flood import (
+    FLOOD_MUTE,
+    FLOOD_MUTED_NOW,
+    FLOOD_OK,
+    FLOOD_WARN,
+    FloodEngine,
+    FloodPolicy,
+)
+
+POLICY = FloodPolicy(rate=1.0, burst=2.0, warn_at=(2, 4), mute_after=5, mute_seconds=10.0)
+# колесо таймеров движка стартует с текущего monotonic; время тестов берём
+# с запасом впереди, чтобы движок, созданный позже импорта модуля, не оказался
+# «в будущем» относительно T0
+T0 = time.monotonic() + 3600.0
+
+
+def make_engine() -> FloodEngine:
+    engine = FloodEngine()
+    engine.set_policy("TELEGRAM", POLICY)
+    return engine
+
+
+def test_steady_rate_is_never_flagged():
+    engine = make_engine()
+    for i in range(50):
+        assert engine.hit("TELEGRAM", 1, now=T0 + i * 1.0).action == FLOOD_OK
+
+
+def test_burst_warns_then_mutes():
+    engine = make_engine()
+    # ёмкость ведра — 2 сообщения, дальше каждое — страйк
+    actions = [engine.hit("TELEGRAM", 1, now=T0).action for _ in range(7)]
+    assert actions == [
+        FLOOD_OK, FLOOD_OK,          # токены
+        FLOOD_OK, FLOOD_WARN,        # страйки 1, 2 (warn_at[0])
+        FLOOD_OK, FLOOD_WARN,        # страйки 3, 4 (warn_at[1])
+        FLOOD_MUTED_NOW,             # страйк 5 = mute_after
+    ]
+    assert engine.hit("TELEGRAM", 1, now=T0).level == 0
+
+    verdict = engine.hit("TELEGRAM", 1, now=T0 + 4.0)
+    assert verdict.action == FLOOD_MUTE
+    assert verdict.retry_after == 6.0
+
+
+def test_warning_level_follows_strikes():
+    engine = make_engine()
+    engine.set_policy("VK", FloodPolicy(rate=1.0, burst=1.0, warn_at=(1, 2, 3)))
+    levels = [engine.hit("VK", 1, now=T0) for _ in range(5)]
+    assert [v.action for v in levels] == [FLOOD_OK, FLOOD_WARN, FLOOD_WARN, FLOOD_WARN, FLOOD_WARN]
+    # после последнего порога предупреждаем на каждом страйке, уровень не растёт
+    assert [v.level for v in levels[1:]] == [0, 1, 2, 2]
+
+
+def test_pause_pays_off_the_debt():
+    engine = make_engine()
+    for _ in range(4):
+        engine.hit("TELEGRAM", 1, now=T0)
+    # ведро ушло в долг до -2: нужно 3 секунды, чтобы снова был токен
+    assert engine.hit("TELEGRAM", 1, now=T0 + 2.5).action == FLOOD_OK
+    assert engine.hit("TELEGRAM", 1, now=T0 + 2.5).action != FLOOD_MUTED_NOW
+
+
+def test_mute_expires():
+    engine = make_engine()
+    for _ in range(7):
+        engine.hit("TELEGRAM", 1, now=T0)
+    assert engine.muted_for("TELEGRAM", 1, now=T0 + 9.0) == 1.0
+    assert engine.hit("TELEGRAM", 1, now=T0 + 11.0).action == FLOOD_OK
+    assert engine.muted_for("TELEGRAM", 1, now=T0 + 11.0) == 0.0
+
+
+def test_unmute():
+    engine = make_engine()
+    for _ in range(7):
+        engine.hit("TELEGRAM", 1, now=T0)
+    assert engine.unmute("TELEGRAM", 1)
+    assert not engine.unmute("TELEGRAM", 1)
+    assert engine.hit("TELEGRAM", 1, now=T0 + 1.0).action != FLOOD_MUTE
+
+
+def test_users_and_platforms_are_independent():
+    engine = make_engine()
+    for _ in range(7):
+        engine.hit("TELEGRAM", 1, now=T0)
+    assert engine.hit("TELEGRAM", 2, now=T0).action == FLOOD_OK
+    # для VK своей политики нет — действует FloodPolicy() по умолчанию
+    assert engine.hit("VK", 1, now=T0).action == FLOOD_OK
+
+
+def test_full_buckets_are_dropped():
+    engine = make_engine()
+    for user_id in range(100):
+        engine.hit("TELEGRAM", user_id, now=T0)
+    assert len(engine) == 100
+    engine.expire(now=T0 + 5.0)
+    assert len(engine) == 0
@@ -0,0 +1,57 @@
+# tests/test_kb_index.py
+import os
+
+from app.bot import kb_index
+from app.bot.kb_index import KBDocument, KnowledgeBase, build_index, read_current_version
+
+DOCS = [
+    KBDocument("как зайти на сервер", "IP: play.example.com", "faq"),
+    KBDocument("меня забанили", "Напишите апелляцию в тикете", "faq"),
+]
+
+
+def test_builds_in_one_second_get_separate_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_index.time, "strftime", lambda fmt: "20250101120000")
+    index_dir = str(tmp_path)
+
+    first = build_index(DOCS, index_dir)
+    second = build_index(DOCS, index_dir, force=True)
+    third = build_index(DOCS, index_dir, force=True)
+
+    assert len({first, second, third}) == 3
+    assert sorted([third, first, second]) == [first, second, third]
+    assert read_current_version(index_dir) == third
+
+    kb = KnowledgeBase.from_documents(DOCS)
+    assert kb.load_latest(index_dir)
+    assert kb.version == third and len(kb) == len(DOCS)
+
+
+def test_unchanged_documents_are_not_rebuilt(tmp_path):
+    index_dir = str(tmp_path)
+    version = build_index(DOCS, index_dir)
+    assert build_index(DOCS, index_dir) == version
+
+
+def test_old_versions_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_index.time, "strftime", lambda fmt: "20250101120000")
+    index_dir = str(tmp_path)
+    versions = [build_index(DOCS, index_dir, force=True) for _ in range(5)]
+
+    kept = sorted(p for p in os.listdir(index_dir) if p.startswith("v"))
+    assert kept == versions[-kb_index.KEEP_VERSIONS:]
+
+
+def test_failed_build_leaves_no_directory(tmp_path, monkeypatch):
+    index_dir = str(tmp_path)
+
+    def broken(index, path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(kb_index.faiss, "write_index", broken)
+    try:
+        build_index(DOCS, index_dir)
+    except OSError:
+        pass
+    assert [p for p in os.listdir(index_dir) if p.startswith("v")] == []
+    assert read_current_version(index_dir) is None
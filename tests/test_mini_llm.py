@@ -0,0 +1,50 @@
+# tests/test_mini_llm.py
+import numpy as np
+
+from app.bot.embeddings import embed
+from app.bot.mini_llm import UserMemory, _memory_top1
+
+
+def memory(*texts) -> UserMemory:
+    mem = UserMemory()
+    for text in texts:
+        mem.add(text)
+    return mem
+
+
+def test_memory_grows_without_losing_vectors():
+    texts = [f"сообщение номер {i}" for i in range(37)]
+    mem = memory(*texts)
+
+    assert mem.matrix().shape == (37, len(embed("x")))
+    assert np.allclose(mem.matrix(), np.stack([embed(t) for t in texts]))
+    assert mem.search("сообщение номер 5", top_k=1)[0][0] == "сообщение номер 5"
+
+
+def test_top1_per_user_matches_individual_search():
+    alice = memory("не могу зайти на сервер", "меня забанили")
+    bob = memory("пропали вещи после вайпа")
+    empty = UserMemory()
+    texts = ["меня забанили за что", "вещи пропали", "привет", "не заходит на сервер"]
+    mems = [alice, bob, empty, alice]
+    queries = np.stack([embed(t) for t in texts])
+
+    hits = _memory_top1(mems, queries)
+
+    assert hits[2] == (None, 0.0)
+    for (text, score), mem, query in zip(hits, [alice, bob, None, alice], texts):
+        if mem is None:
+            continue
+        expected_text, expected_score = mem.search(query, top_k=1)[0]
+        assert text == expected_text
+        assert abs(score - expected_score) < 1e-6
+
+
+def test_queries_only_see_their_own_memory():
+    alice = memory("ключевое слово альфа")
+    bob = memory("совсем другое")
+
+    hits = _memory_top1([bob], np.stack([embed("ключевое слово альфа")]))
+
+    assert hits[0][0] == "совсем другое"
+    assert alice.texts  # память Алисы в поиск Боба не попала
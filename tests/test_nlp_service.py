@@ -0,0 +1,84 @@
+# tests/test_nlp_service.py
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.bot.nlp_service import NLPService
+
+
+class FakeShard:
+    """Однопроцессный пул, который уже сломан или ломается на вызовах."""
+
+    def __init__(self, broken_on_submit=False):
+        self.broken_on_submit = broken_on_submit
+        self.futures = []
+        self.shutdown_calls = []
+
+    def submit(self, fn, *args):
+        if self.broken_on_submit:
+            raise BrokenProcessPool("worker died while idle")
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_calls.append((wait, cancel_futures))
+
+
+def make_service(shard):
+    service = NLPService(workers=1, timeout=1.0)
+    service._shards = [shard]
+    fresh = []
+
+    def new_shard():
+        fresh.append(FakeShard())
+        return fresh[-1]
+
+    service._new_shard = new_shard
+    return service, fresh
+
+
+def test_shard_broken_while_idle_is_restarted():
+    broken = FakeShard(broken_on_submit=True)
+    service, fresh = make_service(broken)
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(service._call("classify", 0, len, "x"))
+
+    assert service._shards == fresh and len(fresh) == 1
+    assert broken.shutdown_calls == [(False, True)]
+
+
+def test_calls_failing_together_restart_the_shard_once():
+    shard = FakeShard()
+    service, fresh = make_service(shard)
+
+    async def main():
+        calls = [asyncio.create_task(service._call("answer", 0, len, "x")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for future in shard.futures:
+            future.set_exception(BrokenProcessPool("worker died"))
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, BrokenProcessPool) for r in results)
+    assert len(fresh) == 1 and service._shards == fresh
+    assert shard.shutdown_calls == [(False, True)]
+
+
+def test_next_call_uses_the_new_shard():
+    broken = FakeShard(broken_on_submit=True)
+    service, fresh = make_service(broken)
+
+    async def main():
+        with pytest.raises(BrokenProcessPool):
+            await service._call("classify", 0, len, "x")
+        call = asyncio.create_task(service._call("classify", 0, len, "x"))
+        await asyncio.sleep(0.01)
+        fresh[0].futures[0].set_result(("ok", 0.0, 0.0))
+        return await call
+
+    assert asyncio.run(main()) == "ok"
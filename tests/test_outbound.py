@@ -0,0 +1,208 @@
+# tests/test_outbound.py
+import asyncio
+import time
+
+from app.bot.outbound import (
+    PRIORITY_AUTO,
+    PRIORITY_BULK,
+    PRIORITY_OPERATOR,
+    OutboundScheduler,
+    RetryAfter,
+)
+
+
+def make_scheduler(**kwargs) -> OutboundScheduler:
+    opts = dict(rate=1000.0, burst=1000.0, per_chat_interval=0.0, max_retries=3)
+    opts.update(kwargs)
+    return OutboundScheduler("test", **opts)
+
+
+def job(log, value, delay=0.0):
+    async def fn():
+        if delay:
+            await asyncio.sleep(delay)
+        log.append(value)
+        return value
+    return fn
+
+
+def test_keeps_order_within_a_chat():
+    async def main():
+        scheduler = make_scheduler()
+        log = []
+        results = await asyncio.gather(*(
+            scheduler.send(1, job(log, i, delay=0.001 * (5 - i))) for i in range(5)
+        ))
+        await scheduler.stop()
+        return log, results
+
+    log, results = asyncio.run(main())
+    # следующее сообщение в чат — только после того, как ушло предыдущее
+    assert log == [0, 1, 2, 3, 4]
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_operator_reply_overtakes_queued_bulk():
+    async def main():
+        scheduler = make_scheduler(per_chat_interval=0.05)
+        log = []
+        sends = [asyncio.create_task(scheduler.send(1, job(log, f"bulk{i}"), PRIORITY_BULK)) for i in range(3)]
+        await asyncio.sleep(0)
+        sends.append(asyncio.create_task(scheduler.send(1, job(log, "auto"), PRIORITY_AUTO)))
+        sends.append(asyncio.create_task(scheduler.send(1, job(log, "operator"), PRIORITY_OPERATOR)))
+        await asyncio.gather(*sends)
+        await scheduler.stop()
+        return log
+
+    log = asyncio.run(main())
+    # bulk0 уже ушёл, остальное — по приоритету
+    assert log == ["bulk0", "operator", "auto", "bulk1", "bulk2"]
+
+
+def test_per_chat_interval_spaces_messages():
+    async def main():
+        scheduler = make_scheduler(per_chat_interval=0.05)
+        stamps = []
+
+        async def fn():
+            stamps.append(time.monotonic())
+
+        await asyncio.gather(*(scheduler.send(1, fn) for _ in range(3)))
+        await scheduler.stop()
+        return stamps
+
+    stamps = asyncio.run(main())
+    assert all(b - a >= 0.045 for a, b in zip(stamps, stamps[1:]))
+
+
+def test_global_rate_limit():
+    async def main():
+        scheduler = make_scheduler(rate=50.0, burst=1.0)
+        started = time.monotonic()
+        await asyncio.gather(*(scheduler.send(chat, job([], chat)) for chat in range(11)))
+        await scheduler.stop()
+        return time.monotonic() - started
+
+    # первый — из ведра, остальные 10 — по 1/50 с
+    assert asyncio.run(main()) >= 0.19
+
+
+def test_retry_after_pauses_the_whole_bot():
+    async def main():
+        scheduler = make_scheduler()
+        done = {}
+        attempts = []
+
+        async def limited():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryAfter(0.2)
+            done["limited"] = time.monotonic()
+
+        async def other():
+            done["other"] = time.monotonic()
+
+        started = time.monotonic()
+        first = asyncio.create_task(scheduler.send(1, limited))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(first, scheduler.send(2, other))
+        await scheduler.stop()
+        return started, attempts, done
+
+    started, attempts, done = asyncio.run(main())
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.19
+    # 429 общий на бота: другой чат тоже ждал конца паузы
+    assert done["other"] - started >= 0.19
+
+
+def test_chat_only_retry_does_not_block_other_chats():
+    async def main():
+        scheduler = make_scheduler()
+        done = {}
+        calls = []
+
+        async def limited():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RetryAfter(0.2, whole_bot=False)
+            done["limited"] = time.monotonic()
+
+        async def other():
+            done["other"] = time.monotonic()
+
+        started = time.monotonic()
+        first = asyncio.create_task(scheduler.send(1, limited))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(first, scheduler.send(2, other))
+        await scheduler.stop()
+        return started, done
+
+    started, done = asyncio.run(main())
+    assert done["other"] - started < 0.1
+    assert done["limited"] - started >= 0.19
+
+
+def test_gives_up_after_max_retries():
+    async def main():
+        scheduler = make_scheduler(max_retries=2)
+        calls = []
+
+        async def always_limited():
+            calls.append(1)
+            raise RetryAfter(0.0, whole_bot=False)
+
+        try:
+            await scheduler.send(1, always_limited)
+        except RetryAfter:
+            pass
+        else:
+            raise AssertionError("RetryAfter expected")
+        await scheduler.stop()
+        return len(calls)
+
+    assert asyncio.run(main()) == 3
+
+
+def test_errors_reach_the_caller():
+    async def main():
+        scheduler = make_scheduler()
+
+        async def broken():
+            raise ValueError("boom")
+
+        try:
+            await scheduler.send(1, broken)
+        except ValueError as e:
+            message = str(e)
+        # очередь после ошибки не встаёт
+        result = await scheduler.send(1, job([], "next"))
+        await scheduler.stop()
+        return message, result
+
+    assert asyncio.run(main()) == ("boom", "next")
+
+
+def test_telegram_send_message_goes_through_the_scheduler_once():
+    """Задача планировщика зовёт aiogram Bot.send_message, а не TelegramBot.send_message."""
+    from app.bot.telegram_bot import TelegramBot, send_scheduler
+
+    class FakeBot:
+        def __init__(self):
+            self.sent = []
+
+        async def send_message(self, chat_id, text, **kwargs):
+            self.sent.append((chat_id, text))
+            return type("Sent", (), {"message_id": len(self.sent)})()
+
+    async def main():
+        bot = TelegramBot()
+        bot.bot = FakeBot()
+        try:
+            return await asyncio.wait_for(bot.send_message("42", "hello"), timeout=2.0), bot.bot.sent
+        finally:
+            await send_scheduler.stop()
+
+    result, sent = asyncio.run(main())
+    assert result == {"success": True, "message_id": 1}
+    assert sent == [(42, "hello")]
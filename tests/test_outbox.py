@@ -0,0 +1,134 @@
+# tests/test_outbox.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.outbox import outbox_worker
+from app.core.processor import processor
+from app.crud.message import message_crud
+from app.models.message import Message, MessageDirection, MessageStatus
+from conftest import create_ticket, run
+
+
+class FakeBot:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    async def send_message(self, user_id, text, **kwargs):
+        self.sent.append((user_id, text))
+        if self.fail:
+            return {"success": False, "error": "chat not found"}
+        return {"success": True, "message_id": 100 + len(self.sent)}
+
+
+@pytest.fixture
+def bot(migrated_db, monkeypatch):
+    bot = FakeBot()
+    monkeypatch.setattr(processor, "telegram_bot", bot)
+
+    async def clean():
+        async with async_session_maker() as db:
+            await db.execute(delete(Message).where(Message.direction == MessageDirection.OUTGOING))
+            await db.commit()
+
+    run(clean())
+    return bot
+
+
+async def _reply(*texts):
+    ticket = await create_ticket("outbox")
+    async with async_session_maker() as db:
+        msgs = [message_crud.add_outgoing(db, ticket=ticket, text=t) for t in texts]
+        await db.commit()
+        return [m.id for m in msgs]
+
+
+async def _load(ids):
+    async with async_session_maker() as db:
+        rows = (await db.execute(select(Message).where(Message.id.in_(ids)).order_by(Message.id))).scalars()
+        return list(rows)
+
+
+def test_delivers_pending_replies(bot):
+    async def main():
+        ids = await _reply("первый", "второй")
+        delivered = await outbox_worker.deliver_batch()
+        return delivered, await _load(ids)
+
+    delivered, msgs = run(main())
+
+    assert delivered == 2
+    assert [m.status for m in msgs] == [MessageStatus.SENT, MessageStatus.SENT]
+    assert [m.platform_message_id for m in msgs] == ["101", "102"]
+    assert all(m.send_attempts == 1 and m.next_attempt_at is None for m in msgs)
+    assert [text for _, text in bot.sent] == ["первый", "второй"]
+
+
+def test_failed_send_is_retried_with_backoff(bot):
+    bot.fail = True
+
+    async def main():
+        (msg_id,) = await _reply("не дойдёт")
+        before = datetime.utcnow()
+        first = await outbox_worker.deliver_batch()
+        # пауза ещё не прошла — повторно не берём
+        second = await outbox_worker.deliver_batch()
+        return first, second, before, (await _load([msg_id]))[0]
+
+    first, second, before, msg = run(main())
+
+    assert (first, second) == (1, 0)
+    assert msg.status == MessageStatus.PENDING and msg.send_attempts == 1
+    assert msg.next_attempt_at >= before + timedelta(seconds=settings.outbox_retry_base)
+
+
+def test_gives_up_after_max_attempts(bot):
+    bot.fail = True
+
+    async def main():
+        (msg_id,) = await _reply("не дойдёт никогда")
+        for _ in range(settings.outbox_max_attempts):
+            async with async_session_maker() as db:
+                # повтор «наступил»
+                await db.execute(update(Message).where(Message.id == msg_id).values(next_attempt_at=None))
+                await db.commit()
+            await outbox_worker.deliver_batch()
+        return (await _load([msg_id]))[0]
+
+    msg = run(main())
+
+    assert msg.status == MessageStatus.ERROR
+    assert msg.send_attempts == settings.outbox_max_attempts
+    assert len(bot.sent) == settings.outbox_max_attempts
+
+
+def test_claimed_rows_are_leased(bot):
+    async def main():
+        (msg_id,) = await _reply("в аренде")
+        async with async_session_maker() as db:
+            claimed = await outbox_worker._claim(db)
+        async with async_session_maker() as db:
+            # другой воркер (или этот после падения) до конца аренды строку не видит
+            again = await outbox_worker._claim(db)
+        leased_until = (await _load([msg_id]))[0].next_attempt_at
+
+        async with async_session_maker() as db:
+            await db.execute(
+                update(Message).where(Message.id == msg_id)
+                .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+        # аренда истекла — строку подбирают и отправляют
+        delivered = await outbox_worker.deliver_batch()
+        return msg_id, claimed, again, leased_until, delivered, (await _load([msg_id]))[0]
+
+    msg_id, claimed, again, leased_until, delivered, msg = run(main())
+
+    assert [r.id for r in claimed] == [msg_id]
+    assert again == []
+    assert leased_until > datetime.utcnow() + timedelta(seconds=settings.outbox_lease - 5)
+    assert delivered == 1 and msg.status == MessageStatus.SENT
@@ -0,0 +1,104 @@
+# tests/test_read_session.py
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.config import settings
+from conftest import run
+
+WHICH_DB = text("SELECT file FROM pragma_database_list WHERE name = 'main'")
+
+
+@pytest.fixture
+def use_replica(monkeypatch, tmp_path):
+    """Подменяет реплику на движок с заданным URL; проверка состояния — на каждую сессию."""
+    monkeypatch.setattr(settings, "replica_check_interval", 0.0)
+    monkeypatch.setattr(settings, "replica_check_timeout", 2.0)
+    monkeypatch.setattr(settings, "replica_max_lag", 30.0)
+
+    def install(url=None):
+        url = url or f"sqlite+aiosqlite:///{tmp_path}/replica.db"
+        read_engine = create_async_engine(url)
+        router = database.ReplicaRouter(read_engine)
+        monkeypatch.setattr(database, "replica", router)
+        monkeypatch.setattr(
+            database,
+            "read_session_maker",
+            async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False),
+        )
+        return router
+
+    return install
+
+
+async def _which_db() -> str:
+    try:
+        async with database.read_session() as session:
+            return os.path.basename((await session.execute(WHICH_DB)).scalar_one())
+    finally:
+        if database.replica.engine is not None:
+            await database.replica.engine.dispose()
+
+
+def test_healthy_replica_serves_reads(use_replica):
+    router = use_replica()
+    assert run(_which_db()) == "replica.db"
+    assert router.lag == 0.0
+
+
+def test_unreachable_replica_falls_back_to_primary(use_replica, tmp_path):
+    router = use_replica(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    assert run(_which_db()) == "test.db"
+    assert router.lag is None
+
+
+def test_lagging_replica_falls_back_to_primary(use_replica, monkeypatch):
+    router = use_replica()
+
+    async def lagging():
+        return 120.0
+
+    monkeypatch.setattr(router, "_measure_lag", lagging)
+    assert run(_which_db()) == "test.db"
+    assert router.lag == 120.0
+
+
+def test_replica_check_is_cached(use_replica, monkeypatch):
+    router = use_replica()
+    monkeypatch.setattr(settings, "replica_check_interval", 60.0)
+    calls = []
+
+    async def measure():
+        calls.append(1)
+        return 0.0
+
+    monkeypatch.setattr(router, "_measure_lag", measure)
+
+    async def main():
+        return [await router.is_usable() for _ in range(3)]
+
+    assert run(main()) == [True, True, True]
+    assert len(calls) == 1
+
+
+def test_error_on_replica_marks_it_down(use_replica, monkeypatch):
+    router = use_replica()
+    monkeypatch.setattr(settings, "replica_check_interval", 60.0)
+
+    async def main():
+        try:
+            async with database.read_session() as session:
+                await session.execute(text("SELECT * FROM no_such_table"))
+        except DBAPIError:
+            pass
+        else:
+            raise AssertionError("DBAPIError expected")
+        # следующая сессия идёт в primary, не дожидаясь новой проверки
+        return await _which_db()
+
+    assert run(main()) == "test.db"
+    assert router.lag is None
@@ -0,0 +1,107 @@
+# tests/test_rollups.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.endpoints.stats import SUMS, _values
+from app.core.database import async_session_maker
+from app.core.rollups import PERIOD_DAY, PERIOD_HOUR, rollup_job
+from app.models.message import Message, MessageDirection
+from app.models.stats import TicketRollup
+from conftest import create_ticket, run
+
+INTENT = "rollup_test"
+DAY = datetime(2021, 3, 1)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return DAY + timedelta(hours=hour, minutes=minute)
+
+
+async def _hours():
+    async with async_session_maker() as db:
+        rows = (await db.execute(
+            select(TicketRollup).where(TicketRollup.intent == INTENT).order_by(TicketRollup.bucket)
+        )).scalars().all()
+    return {
+        (r.period, r.bucket): {
+            "created": r.tickets_created, "escalated": r.tickets_escalated,
+            "closed": r.tickets_closed, "first_responses": r.first_responses,
+            "response_seconds": r.first_response_seconds,
+            "in": r.messages_in, "out": r.messages_out,
+        }
+        for r in rows
+    }
+
+
+@pytest.fixture(scope="module")
+def history(migrated_db):
+    async def main():
+        # создан в 10:05, эскалирован в 13:30, ответ через 90 с, закрыт в 15:00
+        first = await create_ticket(
+            "rollups", intent=INTENT, created_at=at(10, 5),
+            is_escalated=True, escalated_at=at(13, 30),
+            first_response_at=at(10, 5) + timedelta(seconds=90), closed_at=at(15),
+        )
+        # создан и эскалирован в 10:40
+        await create_ticket(
+            "rollups", intent=INTENT, created_at=at(10, 40),
+            is_escalated=True, escalated_at=at(10, 40),
+        )
+        async with async_session_maker() as db:
+            db.add_all([
+                Message(ticket_id=first.id, user_id=first.user_id, created_at=at(10, 5),
+                        direction=MessageDirection.INCOMING, content="помогите"),
+                Message(ticket_id=first.id, user_id=first.user_id, created_at=at(10, 7),
+                        direction=MessageDirection.OUTGOING, content="уже смотрим"),
+            ])
+            await db.commit()
+        await rollup_job.rebuild(DAY, DAY + timedelta(days=1))
+        return await _hours()
+
+    return run(main())
+
+
+def test_events_land_in_their_own_hours(history):
+    assert history[(PERIOD_HOUR, at(10))] == {
+        "created": 2, "escalated": 1, "closed": 0, "first_responses": 1,
+        "response_seconds": 90, "in": 1, "out": 1,
+    }
+    # эскалация первого тикета — в час эскалации, а не создания
+    assert history[(PERIOD_HOUR, at(13))]["escalated"] == 1
+    assert history[(PERIOD_HOUR, at(13))]["created"] == 0
+    assert history[(PERIOD_HOUR, at(15))]["closed"] == 1
+
+
+def test_day_is_the_sum_of_its_hours(history):
+    day = history[(PERIOD_DAY, DAY)]
+    assert day == {
+        "created": 2, "escalated": 2, "closed": 1, "first_responses": 1,
+        "response_seconds": 90, "in": 1, "out": 1,
+    }
+
+
+def test_rebuild_is_idempotent(history):
+    async def main():
+        # тот же день ещё раз, и окно, частично перекрывающее его
+        await rollup_job.rebuild(DAY, DAY + timedelta(days=1))
+        await rollup_job.rebuild(at(12), at(16))
+        return await _hours()
+
+    assert run(main()) == history
+
+
+def test_escalations_per_created_is_a_ratio_of_events():
+    row = type("Row", (), {
+        "tickets_created": 1, "tickets_escalated": 2, "tickets_closed": 0,
+        "first_responses": 2, "first_response_seconds": 90,
+        "messages_in": 0, "messages_out": 0,
+    })()
+    values = _values(row)
+    # эскалации старых тикетов за период — отношение может быть больше 1
+    assert values["escalations_per_created"] == 2.0
+    assert values["avg_first_response_seconds"] == 45.0
+
+    empty = type("Row", (), dict.fromkeys(SUMS))()
+    assert _values(empty)["escalations_per_created"] is None
@@ -0,0 +1,153 @@
+# tests/test_search.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core import search
+from app.core.archive import message_archiver
+from app.core.database import async_session_maker
+from app.core.search import make_snippet, message_search, tokenize
+from app.models.archive import ArchivedMessage
+from app.models.message import Message, MessageDirection
+from app.models.search import MessageSearchTerm
+from app.models.ticket import Ticket, TicketStatus
+from conftest import create_ticket, run
+
+
+async def _add(ticket, *texts):
+    async with async_session_maker() as db:
+        db.add_all(
+            Message(ticket_id=ticket.id, user_id=ticket.user_id,
+                    direction=MessageDirection.INCOMING, content=text)
+            for text in texts
+        )
+        await db.commit()
+
+
+async def _index_all():
+    while await message_search.index_pending():
+        pass
+
+
+async def _find(query, ticket_id, limit=50):
+    async with async_session_maker() as db:
+        hits, _ = await message_search.search(db, query, ticket_id=ticket_id, limit=limit)
+    return hits
+
+
+def test_tokenize():
+    assert tokenize("Steve_2010@mail.ru, 12.03.2025 — Крипер! крипер") == [
+        "steve_2010", "mail", "ru", "12", "03", "2025", "крипер",
+    ]
+    assert tokenize("я и ты") == ["ты"]
+    assert tokenize(None) == []
+
+
+def test_snippet_marks_matches_and_escapes_html():
+    snippet = make_snippet("<b>Крипер</b> взорвал дом", ["крипер"])
+    assert snippet == "&lt;b&gt;<mark>Крипер</mark>&lt;/b&gt; взорвал дом"
+
+
+@pytest.fixture(scope="module")
+def ticket(migrated_db):
+    async def main():
+        ticket = await create_ticket("search")
+        await _add(
+            ticket,
+            "крипер взорвал мой дом",
+            "эндермен украл блок",
+            "крипер и эндермен на спавне",
+        )
+        await _index_all()
+        return ticket
+
+    return run(main())
+
+
+def test_words_match_by_prefix(ticket):
+    hits = run(_find("крип", ticket.id))
+    assert [h["snippet"] for h in hits] == [
+        "<mark>крип</mark>ер и эндермен на спавне",
+        "<mark>крип</mark>ер взорвал мой дом",
+    ]
+
+
+def test_all_words_are_required(ticket):
+    hits = run(_find("крипер эндермен", ticket.id))
+    assert len(hits) == 1 and "спавне" in hits[0]["snippet"]
+    assert run(_find("крипер зомби", ticket.id)) == []
+
+
+def test_frequent_words_take_the_scan_path(ticket, monkeypatch):
+    # самое редкое слово «частое» — без IN по его списку, только EXISTS
+    expected = [h["id"] for h in run(_find("крипер эндермен", ticket.id))]
+    monkeypatch.setattr(search, "DRIVER_MAX_POSTINGS", 0)
+    assert [h["id"] for h in run(_find("крипер эндермен", ticket.id))] == expected
+
+
+def test_indexing_is_incremental(ticket):
+    async def main():
+        async with async_session_maker() as db:
+            before = await db.scalar(select(func.count()).select_from(MessageSearchTerm))
+        indexed = await message_search.index_pending()
+        async with async_session_maker() as db:
+            after = await db.scalar(select(func.count()).select_from(MessageSearchTerm))
+        return indexed, before, after
+
+    indexed, before, after = run(main())
+    assert indexed == 0 and before == after
+
+
+def _archive(ticket_id):
+    async def main():
+        async with async_session_maker() as db:
+            await db.execute(
+                update(Ticket).where(Ticket.id == ticket_id)
+                .values(status=TicketStatus.CLOSED, closed_at=datetime(2020, 1, 1))
+            )
+            await db.commit()
+        return await message_archiver.run_once()
+
+    return main()
+
+
+def test_archived_before_indexing_is_still_found(migrated_db):
+    async def main():
+        ticket = await create_ticket("search-archive")
+        await _add(ticket, "гаст сжёг портал", "гаст в аду")
+        # индексатор до них не дошёл — термины пишет перенос в архив
+        await _archive(ticket.id)
+        async with async_session_maker() as db:
+            archived = await db.scalar(
+                select(func.count()).select_from(ArchivedMessage)
+                .where(ArchivedMessage.ticket_id == ticket.id)
+            )
+        await _index_all()
+        return archived, await _find("гаст", ticket.id), await _find("гаст портал", ticket.id)
+
+    archived, hits, both = run(main())
+    assert archived == 2
+    assert len(hits) == 2
+    assert len(both) == 1
+
+
+def test_archiving_indexed_messages_keeps_their_terms(ticket):
+    async def main():
+        async with async_session_maker() as db:
+            ids = (await db.execute(select(Message.id).where(Message.ticket_id == ticket.id))).scalars().all()
+            terms = await db.scalar(
+                select(func.count()).select_from(MessageSearchTerm)
+                .where(MessageSearchTerm.message_id.in_(ids))
+            )
+        await _archive(ticket.id)
+        async with async_session_maker() as db:
+            terms_after = await db.scalar(
+                select(func.count()).select_from(MessageSearchTerm)
+                .where(MessageSearchTerm.message_id.in_(ids))
+            )
+        return terms, terms_after, await _find("крипер", ticket.id)
+
+    terms, terms_after, hits = run(main())
+    assert terms_after == terms
+    assert len(hits) == 2
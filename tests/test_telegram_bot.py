@@ -0,0 +1,70 @@
+# tests/test_telegram_bot.py
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+
+from app.bot import telegram_bot
+from app.core.queue import MessageQueue
+
+
+class StuckBot:
+    """Telegram отвечает 429 на всё — отправка автоответа висит в паузах."""
+
+    def __init__(self):
+        self.attempts = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.attempts += 1
+        raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Too Many Requests", 30)
+
+
+def incoming(text: str, user_id: int) -> Message:
+    msg = Message.model_validate({
+        "message_id": 1,
+        "date": 1700000000,
+        "from": {"id": user_id, "is_bot": False, "first_name": "Steve"},
+        "chat": {"id": user_id, "type": "private"},
+        "text": text,
+    })
+    return msg.as_(StuckBot())
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = MessageQueue()
+    monkeypatch.setattr(telegram_bot, "message_queue", queue)
+    return queue
+
+
+async def _handle(msg: Message):
+    try:
+        await asyncio.wait_for(telegram_bot.handle_all(msg), timeout=1.0)
+        await asyncio.sleep(0.05)
+        return msg.bot.attempts
+    finally:
+        await telegram_bot.send_scheduler.stop()
+
+
+def test_message_is_queued_while_auto_reply_is_rate_limited(queue):
+    attempts = asyncio.run(_handle(incoming("привет", 9001)))
+
+    platform, data = queue.queue.get_nowait()
+    assert platform == "telegram" and data["text"] == "привет"
+    # автоответ пытались отправить, но сохранение сообщения его не ждало
+    assert attempts >= 1
+
+
+def test_close_confirmation_is_queued_while_reply_is_rate_limited(queue):
+    async def main():
+        ctx = await telegram_bot.get_ctx(9002)
+        ctx.state = "waiting_close_confirm"
+        ctx.operator_mode = True
+        return await _handle(incoming("Подтвердить", 9002))
+
+    asyncio.run(main())
+
+    _, data = queue.queue.get_nowait()
+    assert data["close_ticket"] is True
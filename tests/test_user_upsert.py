@@ -0,0 +1,119 @@
+# tests/test_user_upsert.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import mysql
+
+from app.core.database import async_session_maker
+from app.crud.user import user_crud
+from app.models.user import PlatformType, User
+from conftest import run
+
+LONG_AGO = datetime(2020, 1, 1)
+
+
+async def _upsert(platform_id: str, **fields) -> int:
+    async with async_session_maker() as db:
+        user_id = await user_crud.upsert(
+            db, platform=PlatformType.TELEGRAM, platform_id=platform_id, **fields
+        )
+        await db.commit()
+        return user_id
+
+
+async def _age(user_id: int) -> None:
+    """Сдвигаем updated_at / last_active в прошлое, чтобы увидеть, трогал ли их upsert."""
+    async with async_session_maker() as db:
+        await db.execute(
+            update(User).where(User.id == user_id)
+            .values(updated_at=LONG_AGO, last_active=LONG_AGO)
+        )
+        await db.commit()
+
+
+async def _get(user_id: int) -> User:
+    async with async_session_maker() as db:
+        return await user_crud.get(db, user_id)
+
+
+def test_creates_once_and_returns_the_same_id(migrated_db):
+    async def main():
+        first = await _upsert("upsert-1", username="steve", first_name="Steve")
+        second = await _upsert("upsert-1", username="steve", first_name="Steve")
+        return first, second, await _get(first)
+
+    first, second, user = run(main())
+    assert first == second
+    assert (user.username, user.first_name) == ("steve", "Steve")
+
+
+def test_unchanged_profile_keeps_updated_at(migrated_db):
+    async def main():
+        user_id = await _upsert("upsert-2", username="alex")
+        await _age(user_id)
+        await _upsert("upsert-2", username="alex", touch=False)
+        return await _get(user_id)
+
+    user = run(main())
+    assert user.updated_at == LONG_AGO
+    assert user.last_active == LONG_AGO
+
+
+def test_empty_values_do_not_erase_the_profile(migrated_db):
+    async def main():
+        user_id = await _upsert("upsert-3", username="herobrine", language_code="ru")
+        await _age(user_id)
+        # VK профиль не присылает
+        await _upsert("upsert-3")
+        return await _get(user_id)
+
+    user = run(main())
+    assert (user.username, user.language_code) == ("herobrine", "ru")
+    assert user.updated_at == LONG_AGO
+    # touch=True по умолчанию — активность отмечена
+    assert user.last_active > LONG_AGO
+
+
+def test_changed_profile_bumps_updated_at(migrated_db):
+    async def main():
+        user_id = await _upsert("upsert-4", username="old_nick", first_name="Notch")
+        await _age(user_id)
+        await _upsert("upsert-4", username="new_nick", touch=False)
+        return await _get(user_id)
+
+    user = run(main())
+    assert (user.username, user.first_name) == ("new_nick", "Notch")
+    assert user.updated_at > LONG_AGO
+    assert user.last_active == LONG_AGO
+
+
+class MySQLSession:
+    """Ловит запрос вместо MySQL: проверяем, какой SQL уходит на этом диалекте."""
+
+    def __init__(self):
+        self.statements = []
+
+    def get_bind(self):
+        return type("Bind", (), {"dialect": mysql.dialect()})()
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return type("Result", (), {"lastrowid": 42})()
+
+
+@pytest.mark.parametrize("touch", [True, False])
+def test_mysql_upsert_is_one_statement(touch):
+    db = MySQLSession()
+    user_id = run(user_crud.upsert(
+        db, platform=PlatformType.VK, platform_id="1", username="steve", touch=touch
+    ))
+
+    assert user_id == 42 and len(db.statements) == 1
+    sql = str(db.statements[0].compile(dialect=mysql.dialect()))
+    head, _, updates = sql.partition("ON DUPLICATE KEY UPDATE")
+    assert head.startswith("INSERT INTO users")
+    assert updates.strip().lower().startswith("id = last_insert_id(users.id)")
+    # updated_at считается до перезаписи полей профиля
+    assert updates.index("updated_at =") < updates.index("username =")
+    assert ("last_active = VALUES(last_active)" in updates) is touch